@@ -1,27 +1,12 @@
 import os
 import sys
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from models import User, Base
 
-# Construct an absolute path to the project root
-# __file__ is backend/add_tokens.py, so we go up two directories
-project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-sys.path.append(project_root)
+# Make the backend importable when run as a script (this file lives in backend/)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-# Construct an absolute path to the database file
-db_path = os.path.join(project_root, "backend", "database", "saas_chatbot.db")
-DATABASE_URL = f"sqlite:///{db_path}"
-
-# Ensure the models are loaded (if they are in a different structure)
-# This might not be necessary if imports are correct
-sys.path.append(os.path.join(project_root, "backend"))
-
-
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
-Base.metadata.bind = engine
+from models import User
+# Same engine, URL and SQLite tuning as the app (settings.DATABASE_URL)
+from utils.database import db_session as SessionLocal
 
 def add_tokens(email: str, amount: int):
     db = SessionLocal()
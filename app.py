@@ -1,21 +1,38 @@
+import time
 import uvicorn
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from routes import auth, chat, product, token, stripe_webhook, business, payment, binance_webhook, leads, upload, integrations
 from config import settings
 from utils.database import engine, Base, init_db
+from utils.async_database import close_async_engine
+from openrouter_api import init_http_client, close_http_client
+from utils.request_logging import access_log, request_id_for, REQUEST_ID_HEADER
+from utils.traffic_capture import traffic_capture, TrafficCaptureMiddleware
+from utils.metrics import registry, HTTP_REQUEST_SECONDS
 import models  # Force model registration
 
 app = FastAPI(redirect_slashes=False)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    # Access log entries are written by a background listener thread
+    access_log.start()
+    # Opt-in sampled request capture for replay_traffic.py
+    traffic_capture.start()
     # Create database tables on startup
     init_db()
+    # Shared keep-alive client for OpenRouter calls
+    await init_http_client()
     yield
     # Clean up resources if needed
+    await close_http_client()
+    await close_async_engine()
+    access_log.stop()
+    traffic_capture.stop()
 
 app = FastAPI(title="SaaS Chatbot Platform", version="1.0", lifespan=lifespan)
 
@@ -41,15 +58,34 @@ app.add_middleware(
 # Add request logging middleware
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
-    print(f"\n{'='*50}")
-    print(f"Request: {request.method} {request.url}")
-    print(f"Headers: {dict(request.headers)}")
-    
-    response = await call_next(request)
-    
-    print(f"Response: {response.status_code}")
-    print(f"{'='*50}\n")
-    return response
+    start_ns = time.perf_counter_ns()
+    request_id = request_id_for(request)
+    request.state.request_id = request_id
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        response.headers[REQUEST_ID_HEADER] = request_id
+        return response
+    finally:
+        access_log.record(request, request_id, status_code, start_ns)
+        # Route template, not the raw path, to keep label cardinality bounded
+        route = request.scope.get("route")
+        HTTP_REQUEST_SECONDS.observe(
+            (time.perf_counter_ns() - start_ns) / 1e9,
+            route.path if route is not None else "unmatched",
+            request.method,
+            str(status_code)
+        )
+
+# Outermost, so captured responses carry the request id set above
+if settings.TRAFFIC_CAPTURE_ENABLED:
+    app.add_middleware(TrafficCaptureMiddleware)
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus scrape endpoint"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
 
 app.include_router(auth.router, prefix="/api/auth", tags=["Auth"])
 app.include_router(chat.router, prefix="/api/chat", tags=["Chat"])
@@ -0,0 +1,123 @@
+import asyncio
+import functools
+import logging
+import os
+from sqlalchemy.orm import sessionmaker
+from utils.database import DATABASE_URL, engine, engine_options, configure_engine
+from utils.pipeline import DB_EXECUTOR
+
+logger = logging.getLogger(__name__)
+
+def to_async_url(url: str):
+    """Swap the sync driver in a database URL for its asyncio driver"""
+    if url.startswith("sqlite:"):
+        return "sqlite+aiosqlite:" + url[len("sqlite:"):]
+    for prefix in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    return url
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", to_async_url(DATABASE_URL))
+
+class ThreadedAsyncSession:
+    """
+    AsyncSession stand-in used when no asyncio driver is installed. Wraps a
+    sync session and runs each blocking call on the DB pool, covering the
+    part of the AsyncSession API the async paths use.
+    """
+
+    def __init__(self, session):
+        self.sync_session = session
+
+    async def _run(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(DB_EXECUTOR, functools.partial(fn, *args, **kwargs))
+
+    def _execute_buffered(self, statement, *args, **kwargs):
+        # Fetch rows on the worker thread so the caller never touches the cursor
+        result = self.sync_session.execute(statement, *args, **kwargs)
+        # ORM results (e.g. UPDATE ... RETURNING) always carry rows
+        return result.freeze()() if getattr(result, "returns_rows", True) else result
+
+    def add(self, instance):
+        self.sync_session.add(instance)
+
+    def add_all(self, instances):
+        self.sync_session.add_all(instances)
+
+    async def execute(self, statement, *args, **kwargs):
+        return await self._run(self._execute_buffered, statement, *args, **kwargs)
+
+    async def merge(self, instance, load=True):
+        return await self._run(self.sync_session.merge, instance, load=load)
+
+    async def get(self, entity, ident, **kwargs):
+        return await self._run(self.sync_session.get, entity, ident, **kwargs)
+
+    async def delete(self, instance):
+        await self._run(self.sync_session.delete, instance)
+
+    async def flush(self):
+        await self._run(self.sync_session.flush)
+
+    async def commit(self):
+        await self._run(self.sync_session.commit)
+
+    async def rollback(self):
+        await self._run(self.sync_session.rollback)
+
+    async def close(self):
+        await self._run(self.sync_session.close)
+
+def create_async_session_factory():
+    """async_sessionmaker on the asyncio driver, or the threaded fallback"""
+    try:
+        # SQLAlchemy's asyncio layer imports fine without greenlet and only
+        # fails (ValueError or ImportError) on the first query, so probe now
+        import greenlet  # noqa: F401
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+        options = engine_options(ASYNC_DATABASE_URL)
+        options.pop("connect_args", None)  # check_same_thread is pysqlite-only
+        async_engine = configure_engine(create_async_engine(ASYNC_DATABASE_URL, **options), ASYNC_DATABASE_URL)
+    except (ImportError, ValueError) as e:
+        logger.warning(f"Async database driver unavailable ({e}); async sessions fall back to the DB thread pool")
+        fallback = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+        return None, lambda: ThreadedAsyncSession(fallback())
+    # Loaded objects outlive the commit, like detached snapshots
+    return async_engine, async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+_async_engine = None
+_async_session_factory = None
+
+def async_session():
+    """New session on the async engine (created on first use)"""
+    global _async_engine, _async_session_factory
+    if _async_session_factory is None:
+        _async_engine, _async_session_factory = create_async_session_factory()
+    return _async_session_factory()
+
+async def close_async_engine():
+    global _async_engine, _async_session_factory
+    if _async_engine is not None:
+        await _async_engine.dispose()
+    _async_engine = None
+    _async_session_factory = None
+
+async def get_async_db():
+    """FastAPI dependency: one async session per request"""
+    db = async_session()
+    try:
+        yield db
+    finally:
+        await db.close()
+
+async def run_async_db(fn, *args, **kwargs):
+    """
+    Await fn(db, *args, **kwargs) on its own async session. Concurrent
+    pipeline stages each get one, as sessions are not safe to share.
+    """
+    db = async_session()
+    try:
+        return await fn(db, *args, **kwargs)
+    finally:
+        await db.close()
@@ -2,6 +2,7 @@ from fastapi import APIRouter, Request, HTTPException, Depends
 from sqlalchemy.orm import Session
 from models import User, TokenTransaction
 from utils.token_logic import get_db
+from utils.user_cache import authenticated_users
 from config import settings
 import json
 
@@ -38,6 +39,7 @@ async def binance_webhook(request: Request, db: Session = Depends(get_db)):
                 )
                 db.add(tx)
                 db.commit()
+                authenticated_users.invalidate_user(user.id)
 
         return {"returnCode": "SUCCESS"}
     except Exception as e:
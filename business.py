@@ -2,6 +2,9 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from models import Business, User
 from utils.token_logic import get_db, get_current_user
+from utils.product_index import product_indexes
+from utils.business_cache import business_configs
+from utils.user_cache import authenticated_users
 import schemas
 from typing import List
 
@@ -17,10 +20,12 @@ def create_business(
     db.add(db_business)
     db.commit()
     db.refresh(db_business)
+    business_configs.invalidate(db_business.id)
     
     # Link the business to the user who created it
     current_user.business_id = db_business.id
     db.commit()
+    authenticated_users.invalidate_user(current_user.id)
     
     return db_business
 
@@ -55,6 +60,10 @@ def update_business(
     
     db.commit()
     db.refresh(db_business)
+    business_configs.invalidate(db_business.id)
+    authenticated_users.invalidate_business(db_business.id)
+    # The config catalog feeds product matching when there are no DB products
+    product_indexes.invalidate(db_business.id)
     return db_business
 
 @router.get("/config", response_model=schemas.BusinessConfig)
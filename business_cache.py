@@ -0,0 +1,137 @@
+import json
+import logging
+import threading
+import time
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from config import settings
+from models import Business
+from business_config import BUSINESS_PRODUCTS
+from utils.prompt_templates import CompiledSystemPrompt
+
+logger = logging.getLogger(__name__)
+
+def _load_business_tiers():
+    try:
+        return {str(k): v for k, v in json.loads(settings.BUSINESS_TIERS or "{}").items()}
+    except (json.JSONDecodeError, AttributeError):
+        logger.warning("BUSINESS_TIERS is not a valid JSON object; every business uses the default tier")
+        return {}
+
+BUSINESS_TIERS = _load_business_tiers()
+
+def business_tier(business_id):
+    """Operator-assigned tier of a business, used for metrics and scheduling"""
+    return BUSINESS_TIERS.get(str(business_id), settings.DEFAULT_BUSINESS_TIER)
+
+def default_business_config():
+    """Config used when a business has none (or an unparsable one)"""
+    return {
+        "name": "Your Business",
+        "whatsapp": "+1234567890",
+        "phone": "+1234567890",
+        "products": BUSINESS_PRODUCTS,
+        "description": "We sell quality products",
+        "enable_lead_capture": True
+    }
+
+def render_product_block(products):
+    """Product list appended to the system prompt (first 5 products)"""
+    if not products:
+        return ""
+    product_list = "\n".join([
+        f"- {p.get('name')}: {p.get('description')} (${p.get('price', 'N/A')})"
+        for p in products[:5]  # Limit to 5 products in context
+    ])
+    return f"\n\nAvailable products:\n{product_list}"
+
+class CachedBusinessConfig:
+    """Parsed config of one business plus everything derived from it"""
+
+    def __init__(self, business_id: int, version: int, raw_config):
+        self.business_id = business_id
+        self.version = version
+        self.loaded_at = time.monotonic()
+        parsed = None
+        if raw_config:
+            try:
+                parsed = json.loads(raw_config)
+            except json.JSONDecodeError:
+                parsed = None
+        # Parsed business config as stored, or None
+        self.parsed = parsed
+        # Config for the chat, with the default fallback applied
+        self.config = parsed if parsed is not None else default_business_config()
+        # Valid products from the stored config, for catalog fallbacks
+        self.products = [p for p in (parsed or {}).get("products", []) if p.get("name")]
+        self.product_block = render_product_block(self.config.get("products", []))
+        self._system_prompt = None
+
+    @property
+    def system_prompt(self):
+        """System prompt template compiled once per config version"""
+        if self._system_prompt is None:
+            self._system_prompt = CompiledSystemPrompt(self.config, self.product_block)
+        return self._system_prompt
+
+class BusinessConfigCache:
+    """
+    Process-wide cache of parsed business configs keyed by business id.
+
+    Writes bump a per-business version counter, which invalidates the
+    cached entry in this process. A TTL bounds staleness for writes made by
+    other worker processes. Cached entries are shared, treat them read-only.
+    """
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._entries = {}
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def peek(self, business_id: int):
+        """Return the cached entry if it is current, without touching the DB"""
+        with self._lock:
+            version = self._versions.get(business_id, 0)
+            entry = self._entries.get(business_id)
+        if entry is not None and entry.version == version and time.monotonic() - entry.loaded_at < self.ttl_seconds:
+            return entry
+        return None
+
+    def get(self, db: Session, business_id: int) -> CachedBusinessConfig:
+        entry = self.peek(business_id)
+        if entry is not None:
+            return entry
+
+        with self._lock:
+            version = self._versions.get(business_id, 0)
+        row = db.query(Business.config).filter(Business.id == business_id).first()
+        return self._store(business_id, version, row.config if row else None)
+
+    async def get_async(self, db, business_id: int) -> CachedBusinessConfig:
+        """get() on an async session"""
+        entry = self.peek(business_id)
+        if entry is not None:
+            return entry
+
+        with self._lock:
+            version = self._versions.get(business_id, 0)
+        result = await db.execute(select(Business.config).where(Business.id == business_id))
+        row = result.first()
+        return self._store(business_id, version, row.config if row else None)
+
+    def _store(self, business_id: int, version: int, raw_config):
+        entry = CachedBusinessConfig(business_id, version, raw_config)
+        with self._lock:
+            # Don't overwrite with a stale load if the config changed meanwhile
+            if self._versions.get(business_id, 0) == version:
+                self._entries[business_id] = entry
+        return entry
+
+    def invalidate(self, business_id: int):
+        """Call after writing a business's config"""
+        with self._lock:
+            self._versions[business_id] = self._versions.get(business_id, 0) + 1
+            self._entries.pop(business_id, None)
+
+business_configs = BusinessConfigCache(ttl_seconds=settings.BUSINESS_CONFIG_CACHE_TTL)
@@ -0,0 +1,76 @@
+import math
+
+DEFAULT_PAGE_SIZE = 8
+MAX_PAGE_SIZE = 50
+
+# Opening line per tone, from determine_tone in routes/chat.py
+CATALOG_OPENERS = {
+    "enthusiastic": "Oh, you're going to love this! Here's what we have at {business_name}:",
+    "empathetic": "No worries, let me make this easy. Here's what {business_name} offers:",
+    "patient": "Sure, here's a simple overview of what {business_name} offers:",
+    "lighthearted": "Ha, glad you asked! Here's the lineup at {business_name}:",
+    "casual": "Hey! Here's what we've got at {business_name}:",
+    "formal": "Thank you for your interest. {business_name} currently offers the following products:",
+    "neutral": "Here's what we have at {business_name}:",
+}
+
+CATALOG_CLOSERS = {
+    "enthusiastic": "Which one caught your eye?",
+    "empathetic": "Tell me what you need and I'll help you pick the right one.",
+    "patient": "Take your time, and ask me about any of these.",
+    "lighthearted": "Pick your favourite, I won't judge!",
+    "casual": "Anything you like?",
+    "formal": "Please let me know if you would like more details on any item.",
+    "neutral": "Would you like more details on any of these?",
+}
+
+def format_price(price):
+    if price in (None, "", 0):
+        return ""
+    try:
+        return f" (${float(price):.2f})"
+    except (TypeError, ValueError):
+        return f" ({price})"
+
+def clamp_page_size(value, default=DEFAULT_PAGE_SIZE):
+    """Page size from a business config; missing, invalid or non-positive values use default"""
+    try:
+        size = int(value)
+    except (TypeError, ValueError, OverflowError):
+        return default
+    if size < 1:
+        return default
+    return min(size, MAX_PAGE_SIZE)
+
+def render_catalog_answer(products, business_name, tone, page=1, page_size=DEFAULT_PAGE_SIZE):
+    """
+    Catalog reply rendered locally for "what do you sell" questions, one page
+    of `page_size` products at a time. Returns (text, page, page_count).
+    """
+    tone = tone if tone in CATALOG_OPENERS else "neutral"
+    page_size = clamp_page_size(page_size)
+    page_count = max(math.ceil(len(products) / page_size), 1)
+    page = min(max(int(page or 1), 1), page_count)
+
+    if not products:
+        return (
+            f"We're updating our catalog at {business_name} right now. "
+            "Tell me what you're looking for and I'll help you find it!",
+            page,
+            page_count,
+        )
+
+    start = (page - 1) * page_size
+    lines = [CATALOG_OPENERS[tone].format(business_name=business_name), ""]
+    for p in products[start:start + page_size]:
+        line = f"• {p.get('name')}{format_price(p.get('price'))}"
+        description = (p.get("description") or "").strip()
+        if description:
+            line += f" - {description}"
+        lines.append(line)
+
+    lines.append("")
+    if page_count > 1:
+        lines.append(f"Showing {start + 1}-{min(start + page_size, len(products))} of {len(products)} products.")
+    lines.append(CATALOG_CLOSERS[tone])
+    return "\n".join(lines), page, page_count
@@ -1,25 +1,36 @@
-from fastapi import APIRouter, Depends, Request, HTTPException
-from sqlalchemy.orm import Session
-from models import User, Chat, Lead, Business, Product
-from utils.token_logic import get_db, get_current_user, deduct_tokens
-from openrouter_api import query_openrouter
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from models import User, Chat
+from sqlalchemy import select, delete
+from utils.token_logic import get_current_user_async
+from utils.unit_of_work import ChatTurnUnitOfWork
+from utils.async_database import get_async_db, async_session, run_async_db
+from utils.pipeline import run_cpu, StageTimer
+from openrouter_api import query_openrouter, stream_openrouter, OPENROUTER_MODEL
+from utils.llm_scheduler import llm_scheduler, SchedulerRejected
+from utils.prompt_builder import assemble_prompt, budget_for_model
 from utils.emotion_engine import detect_sales_emotion
-from utils.product_matcher import smart_product_match, get_all_products_for_listing, check_general_product_inquiry
-from utils.chat_memory_manager import get_chat_memory_with_cleanup, format_memory_for_ai
-from utils.lead_capture import save_lead
-from business_config import SYSTEM_PROMPT, BUSINESS_PRODUCTS
+from utils.product_matcher import smart_product_match_async, get_all_products_for_listing_async, check_general_product_inquiry
+from utils.chat_memory_manager import get_memory_context_async, conversation_memory
+from utils.business_cache import business_configs, render_product_block, business_tier
+from utils.product_index import product_indexes
+from utils.metrics import observe_stage_timings
+from utils.prompt_templates import CompiledSystemPrompt
+from utils.response_cache import llm_responses, prompt_key
+from utils.catalog_answer import render_catalog_answer, clamp_page_size
+from config import settings
+from business_config import BUSINESS_PRODUCTS
 import schemas
+import asyncio
 import json
 import re
+import time
 import logging
-from pydantic import BaseModel
-from typing import List
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-class ChatRequest(BaseModel):
-    messages: List[dict]
+CHAT_TOKEN_COST = 5  # Tokens charged per non-demo chat message
 
 def extract_lead_info(message):
     """Extract lead information from user message"""
@@ -48,240 +59,315 @@ def extract_lead_info(message):
         "phone": phone[0] if phone else None
     }
 
-def get_business_config(db: Session, business_id: int):
-    """Get business configuration with products and settings"""
-    business = db.query(Business).filter(Business.id == business_id).first()
+def format_system_prompt(config, user_name, emotion_data, tone, product_block=None):
+    """Format the system prompt with actual data"""
+    if product_block is None:
+        product_block = render_product_block(config.get("products", []))
+    return CompiledSystemPrompt(config, product_block).render(user_name, emotion_data, tone)
+
+def determine_tone(emotion_data):
+    """Map the detected emotion onto the tone the assistant should use"""
+    tone = emotion_data.get("tone", "neutral")
+    if emotion_data.get("primary") == "frustrated":
+        tone = "empathetic"
+    elif emotion_data.get("primary") == "excited":
+        tone = "enthusiastic"
+    elif emotion_data.get("primary") == "confused":
+        tone = "patient"
+    elif emotion_data.get("primary") == "sarcasm":
+        tone = "lighthearted"
+    return tone
+
+DEMO_BUSINESS_CONFIG = {
+    "name": "DemoShop",
+    "whatsapp": "+1234567890", 
+    "phone": "+15551234567",
+    "products": BUSINESS_PRODUCTS,
+    "description": "Your AI-powered sales assistant",
+    "enable_lead_capture": False
+}
+
+DEMO_SYSTEM_PROMPT = CompiledSystemPrompt(DEMO_BUSINESS_CONFIG, render_product_block(BUSINESS_PRODUCTS))
+
+async def _load_business_config(business_id: int):
+    """Cached config and compiled system prompt; only misses query the database"""
+    entry = business_configs.peek(business_id)
+    if entry is None:
+        entry = await run_async_db(business_configs.get_async, business_id)
+    return entry.config, entry.system_prompt
+
+async def _load_products(message: str, business_id: int):
+    """Product listing for general inquiries, otherwise the best single match"""
+    if check_general_product_inquiry(message):
+        return await run_async_db(get_all_products_for_listing_async, business_id), None
+    return None, await run_async_db(smart_product_match_async, message, business_id)
+
+async def prepare_chat_turn(current_user, message: str, demo_mode: bool):
+    """
+    Run everything that happens before the LLM call: business config, emotion
+    detection, product matching, memory and prompt assembly.
+
+    The independent stages run concurrently; each DB stage awaits its own
+    async session and emotion detection runs on the CPU pool, so the event
+    loop is never blocked.
+    """
+    timer = StageTimer()
+    pipeline_start = time.perf_counter()
+
+    if demo_mode:
+        # In demo mode, use a default business config
+        business_id = 1  # Default business ID for demo
+        user_name = "Friend"
+        config_stage = asyncio.sleep(0, result=(DEMO_BUSINESS_CONFIG, DEMO_SYSTEM_PROMPT))
+    else:
+        # Production mode - get actual business config
+        business_id = current_user.business_id
+        user_name = current_user.fullname.split()[0] if current_user.fullname else "Friend"
+        config_stage = _load_business_config(business_id)
+
+    # Read before the products are, so a concurrent edit can't be cached as current
+    catalog_version = product_indexes.version(business_id)
+
+    # 1-3. BUSINESS CONFIG, EMOTION DETECTION, PRODUCT MATCHING AND CHAT MEMORY
+    (business_config, compiled_prompt), emotion_data, (products, matched_product), (memory_window, cleanup_performed) = await asyncio.gather(
+        timer.run("business_config", config_stage),
+        timer.run("emotion", run_cpu(detect_sales_emotion, message)),
+        timer.run("product_match", _load_products(message, business_id)),
+        timer.run("memory", run_async_db(get_memory_context_async, business_id, current_user, limit=10)),
+    )
+    logger.info(f"Detected emotion: {emotion_data}")
+
+    visual_url = None
+    show_contact = False
+    contact_info = None
+
+    if products is not None and not products:
+        products = business_config.get("products", [])
+
+    if matched_product:
+        visual_url = matched_product.get("image_url") or matched_product.get("video_url")
+        
+        # Show contact info if strong buying intent
+        if emotion_data.get("buying_intent_score", 0) > 5 or \
+           emotion_data.get("primary") in ["ready_to_buy", "buying_interest"]:
+            show_contact = True
+            contact_info = {
+                "whatsapp": business_config.get("whatsapp"),
+                "phone": business_config.get("phone")
+            }
+
+    # 4. DETERMINE TONE
+    tone = determine_tone(emotion_data)
     
-    if business and business.config:
-        try:
-            return json.loads(business.config)
-        except json.JSONDecodeError:
-            pass
+    # A customer's opening message carries no conversation memory, so the
+    # same opener to the same business assembles the same prompt
+    cacheable = settings.RESPONSE_CACHE_ENABLED and not (memory_window and memory_window.entries)
+    if cacheable:
+        # A shared answer must not greet one customer by another's name
+        user_name = "Friend"
+
+    # 5. FILL THE DYNAMIC SLOTS OF THE PRECOMPILED SYSTEM PROMPT
+    system_prompt = compiled_prompt.render(user_name, emotion_data, tone)
+    
+    # 6. BUILD CONTEXT FOR AI
+    product_context = ""
     
-    # Fallback to default config
+    # Add current product context if matched
+    if matched_product:
+        product_context += f"\nUser is interested in: {matched_product['name']} - {matched_product['description']} (${matched_product.get('price', 'N/A')})\n"
+        if visual_url:
+            product_context += f"Product visual available: {visual_url}\n"
+    
+    # Add buying intent context
+    intent_context = ""
+    if emotion_data.get("buying_intent_score", 0) > 5:
+        intent_context = "\n[USER SHOWS STRONG BUYING INTENT - Provide contact details and guide to purchase]\n"
+    
+    # 7. PREPARE MESSAGES FOR AI WITHIN THE MODEL'S TOKEN BUDGET
+    messages, prompt_report = assemble_prompt(
+        system_prompt,
+        message,
+        memory_window,
+        [product_context, intent_context],
+        budget_for_model(OPENROUTER_MODEL)
+    )
+    logger.info(f"Prompt assembled: {prompt_report}")
+    timer.record("pre_llm_total", pipeline_start)
+    logger.debug(f"Pre-LLM stage timings (ms): {timer.timings}")
+
     return {
-        "name": "Your Business",
-        "whatsapp": "+1234567890",
-        "phone": "+1234567890",
-        "products": BUSINESS_PRODUCTS,
-        "description": "We sell quality products",
-        "enable_lead_capture": True
+        "business_id": business_id,
+        "tier": "demo" if demo_mode else business_tier(business_id),
+        "business_config": business_config,
+        "emotion_data": emotion_data,
+        "tone": tone,
+        "matched_product": matched_product,
+        "products": products,
+        "visual_url": visual_url,
+        "show_contact": show_contact,
+        "contact_info": contact_info,
+        "cleanup_performed": cleanup_performed,
+        "messages": messages,
+        "prompt_tokens": prompt_report["prompt_tokens"],
+        "cache_key": prompt_key(business_id, catalog_version, OPENROUTER_MODEL, messages) if cacheable else None,
+        "timer": timer,
     }
 
-def format_system_prompt(config, user_name, emotion_data, tone):
-    """Format the system prompt with actual data"""
-    prompt = SYSTEM_PROMPT.format(
-        business_name=config.get("name", "Business"),
-        user_name=user_name or "valued customer",
-        emotion_primary=emotion_data.get("primary", "neutral"),
-        emotion_all=", ".join(emotion_data.get("all_emotions", [])) or "neutral",
-        tone=tone or "neutral",
-        business_whatsapp=config.get("whatsapp", ""),
-        business_phone=config.get("phone", "")
-    )
+def append_contact_info(ai_response: str, turn: dict):
+    """Ensure contact info is in the response if buying intent was detected"""
+    contact_info = turn["contact_info"]
+    if turn["show_contact"] and contact_info:
+        if contact_info["whatsapp"] and contact_info["whatsapp"] not in ai_response:
+            ai_response += f"\n\n📱 Order on WhatsApp: {contact_info['whatsapp']}"
+        if contact_info["phone"] and contact_info["phone"] not in ai_response:
+            ai_response += f"\n☎️ Call us: {contact_info['phone']}"
+    return ai_response
+
+def fallback_response(turn: dict):
+    """Canned reply used when the AI query fails"""
+    matched_product = turn["matched_product"]
+    ai_response = "I'm here to help you find the perfect product! What are you looking for today?"
     
-    # Add product context
-    products = config.get("products", [])
-    if products:
-        product_list = "\n".join([
-            f"- {p['name']}: {p['description']} (${p.get('price', 'N/A')})"
-            for p in products[:5]  # Limit to 5 products in context
-        ])
-        prompt += f"\n\nAvailable products:\n{product_list}"
+    if matched_product:
+        ai_response = f"Great choice! {matched_product['name']} is {matched_product['description']}. "
+        if matched_product.get('price'):
+            ai_response += f"It's available for ${matched_product['price']}. "
+        ai_response += "Would you like to know more about it?"
+    return ai_response
+
+def stage_chat_turn(uow: ChatTurnUnitOfWork, message: str, ai_response: str, turn: dict):
+    """Queue the chat record and a lead captured from the message, if enabled"""
+    emotion_data = turn["emotion_data"]
+    business_id = turn["business_id"]
+    uow.add(Chat(
+        user_id=uow.user.id,
+        business_id=business_id,
+        message=message,
+        response=ai_response,
+        emotion=emotion_data.get("primary", "neutral"),
+        sales_stage=determine_sales_stage(emotion_data, turn["matched_product"]),
+        is_sale=emotion_data.get("primary") == "ready_to_buy"
+    ))
     
-    return prompt
+    # 10. LEAD CAPTURE
+    if turn["business_config"].get("enable_lead_capture"):
+        lead_info = extract_lead_info(message)
+        if lead_info.get("email") or lead_info.get("phone"):
+            uow.capture_lead(
+                business_id,
+                lead_info.get("name", "Unknown"),
+                lead_info.get("email", ""),
+                lead_info.get("phone", ""),
+                message
+            )
+
+def catalog_fast_path_answer(turn: dict, page: int):
+    """
+    Render the catalog reply locally when the business opted into the fast
+    path and the message is a general product inquiry; None otherwise.
+    """
+    business_config = turn["business_config"]
+    if turn["products"] is None or not business_config.get("catalog_fast_path"):
+        return None
+    text, page, page_count = render_catalog_answer(
+        turn["products"],
+        business_config.get("name", "our store"),
+        turn["tone"],
+        page=page,
+        page_size=clamp_page_size(business_config.get("catalog_page_size"), settings.CATALOG_PAGE_SIZE)
+    )
+    turn["catalog_page"] = page
+    turn["catalog_pages"] = page_count
+    return text
+
+def build_chat_response(ai_response: str, turn: dict, tokens_remaining=None):
+    contact_info = turn["contact_info"]
+    return schemas.ChatResponse(
+        response=ai_response,
+        emotion=turn["emotion_data"].get("primary", "neutral"),
+        visual_url=turn["visual_url"],
+        show_contact=turn["show_contact"],
+        contact_whatsapp=contact_info.get("whatsapp") if contact_info else None,
+        contact_phone=contact_info.get("phone") if contact_info else None,
+        cleanup_performed=turn["cleanup_performed"],
+        tokens_remaining=tokens_remaining,
+        prompt_tokens=turn["prompt_tokens"],
+        timings=turn["timer"].timings,
+        catalog_page=turn.get("catalog_page"),
+        catalog_pages=turn.get("catalog_pages")
+    )
 
 @router.post("/")
 async def chat_endpoint(
-    chat_request: ChatRequest,
-    request: Request,
-    db: Session = Depends(get_db),
+    chat_request: schemas.ChatRequest,
+    db=Depends(get_async_db),
     business_id: int = ...,
-    current_user=Depends(get_current_user)
+    current_user=Depends(get_current_user_async)
 ):
     """
     Main chat endpoint with emotion detection, product matching, and sales logic
     """
     try:
-        # Handle demo mode
-        if request.json().get("demo_mode"):
-            # In demo mode, use a default business config
-            business_config = {
-                "name": "DemoShop",
-                "whatsapp": "+1234567890", 
-                "phone": "+15551234567",
-                "products": BUSINESS_PRODUCTS,
-                "description": "Your AI-powered sales assistant",
-                "enable_lead_capture": False
-            }
-            business_id = 1  # Default business ID for demo
-            user_name = "Friend"
+        message = chat_request.message
+        demo_mode = chat_request.demo_mode
+
+        uow = ChatTurnUnitOfWork(db, current_user)
+        # Cheap pre-check against the cheapest path, before any work is done
+        if not demo_mode and current_user.tokens < min(CHAT_TOKEN_COST, settings.CATALOG_FAST_PATH_TOKEN_COST):
+            raise HTTPException(status_code=402, detail="Insufficient tokens")
+
+        turn = await prepare_chat_turn(current_user, message, demo_mode)
+
+        # 8a. CATALOG FAST PATH: ANSWER LOCALLY, CHARGED AT THE REDUCED RATE
+        fast_start = time.perf_counter()
+        ai_response = catalog_fast_path_answer(turn, chat_request.catalog_page)
+        # Now that the path is known, check against its cost; the
+        # authoritative conditional debit still runs at commit
+        cost = settings.CATALOG_FAST_PATH_TOKEN_COST if ai_response is not None else CHAT_TOKEN_COST
+        if not demo_mode and current_user.tokens < cost:
+            raise HTTPException(status_code=402, detail="Insufficient tokens")
+        if ai_response is not None:
+            turn["timer"].record("catalog_fast_path", fast_start)
+            if not demo_mode and settings.CATALOG_FAST_PATH_TOKEN_COST > 0:
+                uow.debit(settings.CATALOG_FAST_PATH_TOKEN_COST, "chat", f"Catalog answer: {message[:50]}")
         else:
-            # Production mode - get actual business config
-            business_id = current_user.business_id
-            business_config = get_business_config(db, business_id)
-            user_name = current_user.fullname.split()[0] if current_user.fullname else "Friend"
-            
-            # Deduct tokens for non-demo users
+            if not demo_mode:
+                uow.debit(CHAT_TOKEN_COST, "chat", f"Chat message: {message[:50]}")
+
+            # 8b. QUERY AI WITH CUSTOM PROMPT
             try:
-                deduct_tokens(db, current_user, 5, "chat", f"Chat message: {request.json().get('message')[:50]}")
-            except HTTPException as e:
-                if e.status_code == 402:
-                    raise HTTPException(status_code=402, detail="Insufficient tokens")
-                raise
+                ai_response = await turn["timer"].run(
+                    "llm", query_openrouter(
+                        turn["messages"], business_id=turn["business_id"], tier=turn["tier"], cache_key=turn["cache_key"]
+                    )
+                )
 
-        # 1. EMOTION DETECTION
-        emotion_data = detect_sales_emotion(request.json().get("message"))
-        logger.info(f"Detected emotion: {emotion_data}")
-        
-        # 2. PRODUCT MATCHING
-        matched_product = None
-        visual_url = None
-        show_contact = False
-        contact_info = None
-        
-        # Check for general product inquiry
-        if check_general_product_inquiry(request.json().get("message")):
-            products = get_all_products_for_listing(db, business_id)
-            if not products:
-                products = business_config.get("products", [])
-        else:
-            # Try to match specific product
-            matched_product = smart_product_match(db, request.json().get("message"), business_id)
-            
-            if matched_product:
-                visual_url = matched_product.get("image_url") or matched_product.get("video_url")
-                
-                # Show contact info if strong buying intent
-                if emotion_data.get("buying_intent_score", 0) > 5 or \
-                   emotion_data.get("primary") in ["ready_to_buy", "buying_interest"]:
-                    show_contact = True
-                    contact_info = {
-                        "whatsapp": business_config.get("whatsapp"),
-                        "phone": business_config.get("phone")
-                    }
-
-        # 3. GET CHAT MEMORY
-        memory_entries, cleanup_performed = get_chat_memory_with_cleanup(db, business_id, limit=10)
-        memory_context = format_memory_for_ai(memory_entries)
-        
-        # 4. DETERMINE TONE
-        tone = emotion_data.get("tone", "neutral")
-        if emotion_data.get("primary") == "frustrated":
-            tone = "empathetic"
-        elif emotion_data.get("primary") == "excited":
-            tone = "enthusiastic"
-        elif emotion_data.get("primary") == "confused":
-            tone = "patient"
-        elif emotion_data.get("primary") == "sarcasm":
-            tone = "lighthearted"
-        
-        # 5. FORMAT SYSTEM PROMPT WITH ACTUAL DATA
-        system_prompt = format_system_prompt(
-            business_config,
-            user_name,
-            emotion_data,
-            tone
-        )
-        
-        # 6. BUILD CONTEXT FOR AI
-        context = ""
-        
-        # Add memory context
-        if memory_context:
-            context += memory_context + "\n"
-        
-        # Add current product context if matched
-        if matched_product:
-            context += f"\nUser is interested in: {matched_product['name']} - {matched_product['description']} (${matched_product.get('price', 'N/A')})\n"
-            if visual_url:
-                context += f"Product visual available: {visual_url}\n"
-        
-        # Add buying intent context
-        if emotion_data.get("buying_intent_score", 0) > 5:
-            context += "\n[USER SHOWS STRONG BUYING INTENT - Provide contact details and guide to purchase]\n"
-        
-        # 7. PREPARE MESSAGES FOR AI
-        messages = [
-            {"role": "system", "content": system_prompt},
-        ]
-        
-        # Add context as assistant message if exists
-        if context:
-            messages.append({"role": "assistant", "content": f"[Context: {context}]"})
-        
-        # Add the actual user message
-        messages.append({"role": "user", "content": request.json().get("message")})
-        
-        # 8. QUERY AI WITH CUSTOM PROMPT
-        try:
-            ai_response = await query_openrouter(messages)
-            
-            # Post-process AI response to ensure it follows instructions
-            if show_contact and contact_info:
-                # Ensure contact info is in response if buying intent detected
-                if contact_info["whatsapp"] and contact_info["whatsapp"] not in ai_response:
-                    ai_response += f"\n\n📱 Order on WhatsApp: {contact_info['whatsapp']}"
-                if contact_info["phone"] and contact_info["phone"] not in ai_response:
-                    ai_response += f"\n☎️ Call us: {contact_info['phone']}"
-            
-        except Exception as e:
-            logger.error(f"AI query failed: {str(e)}")
-            # Fallback response
-            ai_response = "I'm here to help you find the perfect product! What are you looking for today?"
-            
-            if matched_product:
-                ai_response = f"Great choice! {matched_product['name']} is {matched_product['description']}. "
-                if matched_product.get('price'):
-                    ai_response += f"It's available for ${matched_product['price']}. "
-                ai_response += "Would you like to know more about it?"
-
-        # 9. SAVE CHAT TO DATABASE
-        if not request.json().get("demo_mode"):
-            chat_record = Chat(
-                user_id=current_user.id,
-                business_id=business_id,
-                message=request.json().get("message"),
-                response=ai_response,
-                emotion=emotion_data.get("primary", "neutral"),
-                sales_stage=determine_sales_stage(emotion_data, matched_product),
-                is_sale=emotion_data.get("primary") == "ready_to_buy"
-            )
-            db.add(chat_record)
-            
-            # 10. LEAD CAPTURE
-            if business_config.get("enable_lead_capture"):
-                lead_info = extract_lead_info(request.json().get("message"))
-                if lead_info.get("email") or lead_info.get("phone"):
-                    try:
-                        save_lead(
-                            db, 
-                            current_user.id,
-                            business_id,
-                            lead_info.get("name", "Unknown"),
-                            lead_info.get("email", ""),
-                            lead_info.get("phone", ""),
-                            request.json().get("message"),
-                            True
-                        )
-                    except Exception as e:
-                        logger.error(f"Lead capture failed: {str(e)}")
-            
-            db.commit()
+                # Post-process AI response to ensure it follows instructions
+                ai_response = append_contact_info(ai_response, turn)
+
+            except SchedulerRejected as e:
+                # Nothing is committed, so the queued debit is dropped
+                raise overloaded_error(e)
+            except Exception as e:
+                logger.error(f"AI query failed: {str(e)}")
+                # Fallback response, not charged
+                ai_response = fallback_response(turn)
+                uow.compensate()
+
+        # 9. SAVE TOKEN DEBIT, LEAD AND CHAT IN ONE TRANSACTION
+        tokens_remaining = None
+        if not demo_mode:
+            persist_start = time.perf_counter()
+            stage_chat_turn(uow, message, ai_response, turn)
+            tokens_remaining = await uow.commit_async()
+            turn["timer"].record("persist", persist_start)
+            if tokens_remaining is None:
+                # Nothing was debited, so the loaded balance is still current
+                tokens_remaining = current_user.tokens
 
         # 11. PREPARE RESPONSE
-        response = schemas.ChatResponse(
-            response=ai_response,
-            emotion=emotion_data.get("primary", "neutral"),
-            visual_url=visual_url,
-            show_contact=show_contact,
-            contact_whatsapp=contact_info.get("whatsapp") if contact_info else None,
-            contact_phone=contact_info.get("phone") if contact_info else None,
-            cleanup_performed=cleanup_performed,
-            tokens_remaining=current_user.tokens if not request.json().get("demo_mode") else None
-        )
-        
-        return response
+        observe_stage_timings(turn["timer"].timings, "chat", turn["tier"])
+        return build_chat_response(ai_response, turn, tokens_remaining=tokens_remaining)
         
     except HTTPException:
         raise
@@ -289,6 +375,109 @@ async def chat_endpoint(
         logger.error(f"Chat endpoint error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Chat processing failed: {str(e)}")
 
+def overloaded_error(e: SchedulerRejected):
+    """503 for a call the LLM scheduler would not queue"""
+    return HTTPException(
+        status_code=503,
+        detail="The assistant is busy, please retry shortly",
+        headers={"Retry-After": str(int(e.retry_after))}
+    )
+
+def sse_event(event: str, data):
+    """Encode a single Server-Sent Event frame"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@router.post("/stream")
+async def chat_stream_endpoint(
+    chat_request: schemas.ChatRequest,
+    current_user=Depends(get_current_user_async)
+):
+    """
+    Streaming variant of the chat endpoint. Relays the model's tokens as
+    Server-Sent Events and settles tokens, chat history and leads once the
+    stream completes.
+    """
+    message = chat_request.message
+    demo_mode = chat_request.demo_mode
+
+    if not demo_mode and current_user.tokens < CHAT_TOKEN_COST:
+        raise HTTPException(status_code=402, detail="Insufficient tokens")
+
+    try:
+        turn = await prepare_chat_turn(current_user, message, demo_mode)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Chat stream setup error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Chat processing failed: {str(e)}")
+
+    # Reject before the 200 goes out when this business's queue is already full
+    try:
+        llm_scheduler.check_admission(turn["business_id"], turn["tier"])
+    except SchedulerRejected as e:
+        raise overloaded_error(e)
+
+    user_id = current_user.id
+
+    async def event_stream():
+        parts = []
+        llm_failed = False
+        llm_start = time.perf_counter()
+        try:
+            async for delta in stream_openrouter(turn["messages"], business_id=turn["business_id"], tier=turn["tier"]):
+                parts.append(delta)
+                yield sse_event("token", {"delta": delta})
+        except SchedulerRejected as e:
+            # Queued past the wait limit; nothing is charged or saved
+            yield sse_event("error", {"status_code": 503, "detail": overloaded_error(e).detail})
+            return
+        except Exception as e:
+            logger.error(f"AI stream failed: {str(e)}")
+            if not parts:
+                llm_failed = True
+                fallback = fallback_response(turn)
+                parts.append(fallback)
+                yield sse_event("token", {"delta": fallback})
+
+        turn["timer"].record("llm", llm_start)
+        streamed = "".join(parts)
+        ai_response = append_contact_info(streamed, turn)
+        if len(ai_response) > len(streamed):
+            yield sse_event("token", {"delta": ai_response[len(streamed):]})
+
+        tokens_remaining = None
+        if not demo_mode:
+            # The request-scoped session may already be closed once the
+            # response starts streaming, so settle the turn on a fresh one.
+            stream_db = async_session()
+            try:
+                uow = ChatTurnUnitOfWork(stream_db, await stream_db.get(User, user_id))
+                if not llm_failed:
+                    uow.debit(CHAT_TOKEN_COST, "chat", f"Chat message: {message[:50]}")
+                stage_chat_turn(uow, message, ai_response, turn)
+                tokens_remaining = await uow.commit_async()
+                if tokens_remaining is None:
+                    tokens_remaining = uow.user.tokens
+            except HTTPException as e:
+                yield sse_event("error", {"status_code": e.status_code, "detail": e.detail})
+                return
+            except Exception as e:
+                logger.error(f"Chat stream persistence failed: {str(e)}")
+                yield sse_event("error", {"status_code": 500, "detail": "Chat processing failed"})
+                return
+            finally:
+                await stream_db.close()
+
+        observe_stage_timings(turn["timer"].timings, "chat_stream", turn["tier"])
+        response = build_chat_response(ai_response, turn, tokens_remaining=tokens_remaining)
+        yield sse_event("done", response.dict())
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 def determine_sales_stage(emotion_data, matched_product):
     """Determine the current sales stage based on emotion and context"""
     primary = emotion_data.get("primary", "neutral")
@@ -306,27 +495,32 @@ def determine_sales_stage(emotion_data, matched_product):
     else:
         return "rapport_building"
 
+@router.get("/cache-stats")
+async def get_response_cache_stats(current_user: User = Depends(get_current_user_async)):
+    """Hit/miss counters and size of this worker's LLM response cache"""
+    return llm_responses.stats()
+
 @router.get("/history", response_model=list[schemas.Chat])
 async def get_chat_history(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db=Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
 ):
     """Get chat history for the current user's business"""
-    chats = db.query(Chat).filter(
-        Chat.business_id == current_user.business_id
-    ).order_by(Chat.created_at.desc()).limit(50).all()
+    result = await db.execute(
+        select(Chat).where(Chat.business_id == current_user.business_id)
+        .order_by(Chat.created_at.desc()).limit(50)
+    )
     
-    return chats
+    return result.scalars().all()
 
 @router.delete("/clear")
 async def clear_chat_history(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db=Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
 ):
     """Clear chat history for the current user's business"""
-    db.query(Chat).filter(
-        Chat.business_id == current_user.business_id
-    ).delete()
-    db.commit()
+    await db.execute(delete(Chat).where(Chat.business_id == current_user.business_id))
+    await db.commit()
+    conversation_memory.invalidate(current_user.business_id)
     
     return {"message": "Chat history cleared successfully"}
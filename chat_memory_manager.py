@@ -1,6 +1,12 @@
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from models import Chat
+from config import settings
+from utils.prompt_builder import estimate_tokens
+from collections import OrderedDict, deque
 import sys
+import threading
+import time
 from fastapi import HTTPException
 import logging
 from .auth import get_current_user
@@ -12,68 +18,249 @@ def get_memory_size_bytes(text):
     """Calculate memory size of text in bytes"""
     return sys.getsizeof(text)
 
-def get_chat_memory_with_cleanup(
-    db: Session, 
-    business_id: int, 
-    current_user,
-    limit: int = 20
-):
+class MemoryWindow:
+    """Rendered memory block with its entries and per-entry token estimates"""
+
+    def __init__(self, block, entries, entry_tokens):
+        self.block = block
+        self.entries = entries
+        self.entry_tokens = entry_tokens
+        self.header_tokens = max(estimate_tokens(block) - sum(entry_tokens), 0)
+
+    def render(self, entries):
+        return render_memory(entries)
+
+class ConversationMemory:
     """
-    Get chat memory with automatic cleanup if too large
+    Ring buffer of the most recent chats of one business, kept as
+    pre-formatted "Customer:/You:" lines with a running size in bytes.
     """
-    if not current_user:
-        raise HTTPException(status_code=401, detail="Authentication required")
 
-    # Get recent chats
-    recent_chats = db.query(Chat).filter(
-        Chat.business_id == business_id
-    ).order_by(Chat.created_at.desc()).limit(limit * 2).all()  # Get more to check size
-    
-    if not recent_chats:
-        return [], False
-    
-    # Calculate total memory size
-    total_size = 0
-    memory_entries = []
+    def __init__(self, capacity: int):
+        self.turns = deque(maxlen=capacity)
+        self.size_bytes = 0
+        self.seeded_at = time.monotonic()
+        # Bumped on every append; a rendered window is only cached for the version it was built from
+        self.version = 0
+        self._formatted = {}
+        self._lock = threading.Lock()
+
+    def append(self, message, response):
+        lines = [f"Customer: {message}"]
+        if response:
+            lines.append(f"You: {response}")
+        size = get_memory_size_bytes(message) + get_memory_size_bytes(response or "")
+        # Token estimates are computed once here so prompt budgeting is cheap
+        line_tokens = [estimate_tokens(line) for line in lines]
+        with self._lock:
+            if len(self.turns) == self.turns.maxlen:
+                self.size_bytes -= self.turns[0][1]
+            self.turns.append((lines, size, line_tokens))
+            self.size_bytes += size
+            self.version += 1
+            self._formatted = {}
+
+    def recent(self, turns: int):
+        """Size in bytes and memory lines of the last `turns` chats"""
+        with self._lock:
+            window = list(self.turns)[-turns:]
+        return sum(turn[1] for turn in window), [line for turn in window for line in turn[0]]
+
+    def formatted(self, turns: int):
+        """Memory window for the AI prompt, rendered once per buffer change"""
+        with self._lock:
+            memory_window = self._formatted.get(turns)
+            if memory_window is None:
+                version = self.version
+                window = list(self.turns)[-turns:]
+        if memory_window is None:
+            entries = [line for turn in window for line in turn[0]][-20:]
+            entry_tokens = [tokens for turn in window for tokens in turn[2]][-20:]
+            memory_window = MemoryWindow(render_memory(entries), entries, entry_tokens)
+            with self._lock:
+                # An append during rendering makes this window stale; use it once, don't cache it
+                if self.version == version:
+                    self._formatted[turns] = memory_window
+        return memory_window
+
+class ConversationMemoryStore:
+    """
+    Conversation buffers keyed by (business id, customer id), seeded from
+    the DB on first use, appended to as chats are written and evicted LRU
+    when idle. Customers of one business never see each other's chats.
+    """
+
+    def __init__(self, capacity: int, max_conversations: int, max_age_seconds: float):
+        self.capacity = capacity
+        self.max_conversations = max_conversations
+        # Bounds staleness when other worker processes write chats
+        self.max_age_seconds = max_age_seconds
+        self._memories = OrderedDict()
+        self._lock = threading.Lock()
+
+    def cached(self, business_id: int, user_id: int):
+        key = (business_id, user_id)
+        with self._lock:
+            memory = self._memories.get(key)
+            if memory is not None and time.monotonic() - memory.seeded_at < self.max_age_seconds:
+                self._memories.move_to_end(key)
+                return memory
+        return None
+
+    def get(self, db: Session, business_id: int, user_id: int):
+        memory = self.cached(business_id, user_id)
+        if memory is not None:
+            return memory
+
+        recent_chats = db.query(Chat).filter(
+            Chat.business_id == business_id, Chat.user_id == user_id
+        ).order_by(Chat.created_at.desc()).limit(self.capacity).all()
+        return self._seed((business_id, user_id), recent_chats)
+
+    async def get_async(self, db, business_id: int, user_id: int):
+        """get() on an async session"""
+        memory = self.cached(business_id, user_id)
+        if memory is not None:
+            return memory
+
+        result = await db.execute(
+            select(Chat).where(Chat.business_id == business_id, Chat.user_id == user_id)
+            .order_by(Chat.created_at.desc()).limit(self.capacity)
+        )
+        return self._seed((business_id, user_id), result.scalars().all())
+
+    def _seed(self, key, recent_chats):
+        memory = ConversationMemory(self.capacity)
+        for chat in reversed(recent_chats):  # Reverse to chronological order
+            memory.append(chat.message, chat.response)
+
+        with self._lock:
+            self._memories[key] = memory
+            self._memories.move_to_end(key)
+            while len(self._memories) > self.max_conversations:
+                self._memories.popitem(last=False)
+        return memory
+
+    def record(self, business_id: int, user_id: int, message, response):
+        """Append a newly written chat; unseeded conversations load it on first use"""
+        with self._lock:
+            memory = self._memories.get((business_id, user_id))
+        if memory is not None:
+            memory.append(message, response)
+
+    def invalidate(self, business_id: int, user_id=None):
+        """Drop one customer's conversation, or all of the business's"""
+        with self._lock:
+            if user_id is not None:
+                self._memories.pop((business_id, user_id), None)
+                return
+            for key in [key for key in self._memories if key[0] == business_id]:
+                del self._memories[key]
+
+conversation_memory = ConversationMemoryStore(
+    capacity=settings.MEMORY_BUFFER_TURNS,
+    max_conversations=settings.MEMORY_CACHE_MAX_CONVERSATIONS,
+    max_age_seconds=settings.MEMORY_CACHE_MAX_AGE
+)
+
+def _cleanup_memory(db: Session, business_id: int, user_id: int):
+    """Clear old chats of the conversation, keep only the 10 most recent ones"""
+    old_chats = db.query(Chat).filter(
+        Chat.business_id == business_id, Chat.user_id == user_id
+    ).order_by(Chat.created_at.desc()).offset(10).all()  # Keep last 10 chats
     
-    for chat in reversed(recent_chats):  # Reverse to chronological order
-        chat_size = get_memory_size_bytes(chat.message) + get_memory_size_bytes(chat.response or "")
-        total_size += chat_size
-        
-        memory_entries.append(f"Customer: {chat.message}")
-        if chat.response:
-            memory_entries.append(f"You: {chat.response}")
+    for old_chat in old_chats:
+        db.delete(old_chat)
     
+    db.commit()
+    conversation_memory.invalidate(business_id, user_id)
+
+async def _cleanup_memory_async(db, business_id: int, user_id: int):
+    result = await db.execute(
+        select(Chat).where(Chat.business_id == business_id, Chat.user_id == user_id)
+        .order_by(Chat.created_at.desc()).offset(10)
+    )
+    for old_chat in result.scalars().all():
+        await db.delete(old_chat)
+
+    await db.commit()
+    conversation_memory.invalidate(business_id, user_id)
+
+def _load_memory(db: Session, business_id: int, current_user, limit: int):
+    if not current_user:
+        raise HTTPException(status_code=401, detail="Authentication required")
+
+    memory = conversation_memory.get(db, business_id, current_user.id)
+    total_size, _ = memory.recent(limit * 2)
+
     # Check if cleanup needed
-    size_mb = total_size / BYTES_PER_MB
     cleanup_performed = False
-    
-    if size_mb > MAX_MEMORY_SIZE_MB:
-        # Clear old chats, keep only recent ones
-        old_chats = db.query(Chat).filter(
-            Chat.business_id == business_id
-        ).order_by(Chat.created_at.desc()).offset(10).all()  # Keep last 10 chats
-        
-        for old_chat in old_chats:
-            db.delete(old_chat)
-        
-        db.commit()
+    if total_size / BYTES_PER_MB > MAX_MEMORY_SIZE_MB:
+        _cleanup_memory(db, business_id, current_user.id)
         cleanup_performed = True
-        
         # Get fresh memory after cleanup
-        recent_chats = db.query(Chat).filter(
-            Chat.business_id == business_id
-        ).order_by(Chat.created_at.desc()).limit(10).all()
-        
-        memory_entries = []
-        for chat in reversed(recent_chats):
-            memory_entries.append(f"Customer: {chat.message}")
-            if chat.response:
-                memory_entries.append(f"You: {chat.response}")
+        memory = conversation_memory.get(db, business_id, current_user.id)
+        return memory, 10, cleanup_performed
+
+    return memory, limit * 2, cleanup_performed
+
+async def _load_memory_async(db, business_id: int, current_user, limit: int):
+    if not current_user:
+        raise HTTPException(status_code=401, detail="Authentication required")
+
+    memory = await conversation_memory.get_async(db, business_id, current_user.id)
+    total_size, _ = memory.recent(limit * 2)
+
+    if total_size / BYTES_PER_MB > MAX_MEMORY_SIZE_MB:
+        await _cleanup_memory_async(db, business_id, current_user.id)
+        memory = await conversation_memory.get_async(db, business_id, current_user.id)
+        return memory, 10, True
+
+    return memory, limit * 2, False
+
+def get_chat_memory_with_cleanup(
+    db: Session, 
+    business_id: int, 
+    current_user,
+    limit: int = 20
+):
+    """
+    Get chat memory with automatic cleanup if too large
+    """
+    memory, turns, cleanup_performed = _load_memory(db, business_id, current_user, limit)
+    _, memory_entries = memory.recent(turns)
     
     # Return last 20 exchanges max for context
     return memory_entries[-20:], cleanup_performed
 
+def get_memory_context(
+    db: Session,
+    business_id: int,
+    current_user,
+    limit: int = 20
+):
+    """
+    Memory window for the AI prompt, served from the in-process buffer,
+    plus whether a cleanup was performed
+    """
+    memory, turns, cleanup_performed = _load_memory(db, business_id, current_user, limit)
+    return memory.formatted(turns), cleanup_performed
+
+async def get_memory_context_async(
+    db,
+    business_id: int,
+    current_user,
+    limit: int = 20
+):
+    """get_memory_context on an async session"""
+    memory, turns, cleanup_performed = await _load_memory_async(db, business_id, current_user, limit)
+    return memory.formatted(turns), cleanup_performed
+
+def render_memory(memory_entries):
+    if not memory_entries:
+        return ""
+    return "Previous conversation:\n" + "\n".join(memory_entries) + "\n\n"
+
 def format_memory_for_ai(
     memory_entries, 
     current_user
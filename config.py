@@ -1,11 +1,16 @@
 import os
+from pathlib import Path
 from dotenv import load_dotenv
 
 load_dotenv()
 
+BACKEND_DIR = Path(__file__).resolve().parent
+
 class Settings:
-    DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///../backend/database/saas_chatbot.db")
+    DATABASE_URL = os.getenv("DATABASE_URL", f"sqlite:///{BACKEND_DIR / 'database' / 'saas_chatbot.db'}")
     OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
+    # Point at mock_llm_server.py for load tests
+    OPENROUTER_URL = os.getenv("OPENROUTER_URL", "https://openrouter.ai/api/v1/chat/completions")
     STRIPE_SECRET_KEY = os.getenv("STRIPE_SECRET_KEY")
     STRIPE_WEBHOOK_SECRET = os.getenv("STRIPE_WEBHOOK_SECRET")
     EMAIL_SENDER = os.getenv("EMAIL_SENDER", "[email protected]")
@@ -21,5 +26,72 @@ class Settings:
     SMTP_USERNAME = os.getenv("SMTP_USERNAME")
     SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
     SMTP_USE_TLS = bool(os.getenv("SMTP_USE_TLS", True))
+    DB_THREADPOOL_SIZE = int(os.getenv("DB_THREADPOOL_SIZE", 8))
+    CPU_THREADPOOL_SIZE = int(os.getenv("CPU_THREADPOOL_SIZE", 2))
+    OPENROUTER_HTTP2 = os.getenv("OPENROUTER_HTTP2", "false").lower() in ("1", "true", "yes")
+    OPENROUTER_MAX_CONNECTIONS = int(os.getenv("OPENROUTER_MAX_CONNECTIONS", 100))
+    OPENROUTER_MAX_KEEPALIVE = int(os.getenv("OPENROUTER_MAX_KEEPALIVE", 20))
+    OPENROUTER_KEEPALIVE_EXPIRY = float(os.getenv("OPENROUTER_KEEPALIVE_EXPIRY", 30))
+    OPENROUTER_CONNECT_TIMEOUT = float(os.getenv("OPENROUTER_CONNECT_TIMEOUT", 5))
+    OPENROUTER_READ_TIMEOUT = float(os.getenv("OPENROUTER_READ_TIMEOUT", 30))
+    OPENROUTER_WRITE_TIMEOUT = float(os.getenv("OPENROUTER_WRITE_TIMEOUT", 10))
+    OPENROUTER_POOL_TIMEOUT = float(os.getenv("OPENROUTER_POOL_TIMEOUT", 5))
+    PRODUCT_INDEX_MAX_AGE = float(os.getenv("PRODUCT_INDEX_MAX_AGE", 300))
+    MEMORY_BUFFER_TURNS = int(os.getenv("MEMORY_BUFFER_TURNS", 20))
+    MEMORY_CACHE_MAX_CONVERSATIONS = int(os.getenv("MEMORY_CACHE_MAX_CONVERSATIONS", 10000))
+    MEMORY_CACHE_MAX_AGE = float(os.getenv("MEMORY_CACHE_MAX_AGE", 60))
+    BUSINESS_CONFIG_CACHE_TTL = float(os.getenv("BUSINESS_CONFIG_CACHE_TTL", 30))
+    PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", 3000))
+    PROMPT_TOKEN_BUDGETS = os.getenv("PROMPT_TOKEN_BUDGETS", "{}")  # JSON: {"model": budget}
+    RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+    RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", 60))
+    RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", 8 * 1024 * 1024))
+    CATALOG_FAST_PATH_TOKEN_COST = int(os.getenv("CATALOG_FAST_PATH_TOKEN_COST", 1))
+    CATALOG_PAGE_SIZE = int(os.getenv("CATALOG_PAGE_SIZE", 8))
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 20))
+    DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 10))
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+    DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+    SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+    SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000))
+    SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", 64 * 1024))
+    SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))
+    AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", 5))
+    AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", 10000))
+    BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+    ACCESS_LOG_SAMPLE_RATE = float(os.getenv("ACCESS_LOG_SAMPLE_RATE", 1.0))
+    ACCESS_LOG_INCLUDE_HEADERS = os.getenv("ACCESS_LOG_INCLUDE_HEADERS", "false").lower() in ("1", "true", "yes")
+    ACCESS_LOG_REDACT_HEADERS = os.getenv("ACCESS_LOG_REDACT_HEADERS", "authorization,cookie,set-cookie,x-api-key,stripe-signature")
+    ACCESS_LOG_REDACT_QUERY = os.getenv(
+        "ACCESS_LOG_REDACT_QUERY", "code,state,token,access_token,refresh_token,id_token,password,secret,signature,api_key"
+    )
+    TRAFFIC_CAPTURE_ENABLED = os.getenv("TRAFFIC_CAPTURE_ENABLED", "false").lower() in ("1", "true", "yes")
+    TRAFFIC_CAPTURE_SAMPLE_RATE = float(os.getenv("TRAFFIC_CAPTURE_SAMPLE_RATE", 0.05))
+    TRAFFIC_CAPTURE_ROUTES = os.getenv("TRAFFIC_CAPTURE_ROUTES", "/api/chat/,/api/chat/stream")
+    TRAFFIC_CAPTURE_PATH = os.getenv("TRAFFIC_CAPTURE_PATH", str(BACKEND_DIR / "captures" / "requests.jsonl"))
+    TRAFFIC_CAPTURE_MAX_BYTES = int(os.getenv("TRAFFIC_CAPTURE_MAX_BYTES", 50 * 1024 * 1024))
+    TRAFFIC_CAPTURE_BACKUPS = int(os.getenv("TRAFFIC_CAPTURE_BACKUPS", 10))
+    TRAFFIC_CAPTURE_MAX_BODY = int(os.getenv("TRAFFIC_CAPTURE_MAX_BODY", 64 * 1024))
+    BUSINESS_TIERS = os.getenv("BUSINESS_TIERS", "{}")  # JSON: {"business_id": "tier"}
+    DEFAULT_BUSINESS_TIER = os.getenv("DEFAULT_BUSINESS_TIER", "free")
+    # Ordered fallback list; the first model is the primary
+    OPENROUTER_MODELS = os.getenv("OPENROUTER_MODELS", "deepseek/deepseek-chat-v3-0324:free")
+    LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 2))
+    LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", 0.25))
+    LLM_RETRY_MAX_DELAY = float(os.getenv("LLM_RETRY_MAX_DELAY", 4))
+    LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "false").lower() in ("1", "true", "yes")
+    LLM_HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY", 2))
+    LLM_SLOW_MODEL_SECONDS = float(os.getenv("LLM_SLOW_MODEL_SECONDS", 15))
+    LLM_LATENCY_WINDOW = int(os.getenv("LLM_LATENCY_WINDOW", 100))
+    LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", 5))
+    LLM_BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", 30))
+    LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 32))
+    LLM_MAX_QUEUE_PER_BUSINESS = int(os.getenv("LLM_MAX_QUEUE_PER_BUSINESS", 20))
+    LLM_MAX_QUEUE_TOTAL = int(os.getenv("LLM_MAX_QUEUE_TOTAL", 500))
+    LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", 20))
+    LLM_TIER_WEIGHTS = os.getenv("LLM_TIER_WEIGHTS", '{"free": 1, "demo": 1, "paid": 4}')  # JSON: {"tier": weight}
 
 settings = Settings()
\ No newline at end of file
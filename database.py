@@ -1,22 +1,83 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, declarative_base, scoped_session
-import os
-from dotenv import load_dotenv
 import pathlib
+import time
+from config import settings
+from utils.migrations import run_migrations
+from utils.metrics import DB_QUERY_SECONDS
 
-load_dotenv()
+# Defaults to database/saas_chatbot.db next to the backend, for every entry point
+DATABASE_URL = settings.DATABASE_URL
 
-# Create database folder if it doesn't exist
-database_folder = pathlib.Path("database")
-database_folder.mkdir(exist_ok=True)
+def is_sqlite(url):
+    return make_url(url).get_backend_name() == "sqlite"
 
-# Database will be created in database/saas_chatbot.db
-DATABASE_URL = os.getenv("DATABASE_URL", f"sqlite:///{database_folder}/saas_chatbot.db")
+def sqlite_pragmas():
+    """Pragmas applied to every new SQLite connection"""
+    return {
+        # WAL lets readers run alongside the single writer
+        "journal_mode": settings.SQLITE_JOURNAL_MODE,
+        # Durable at checkpoints, with far fewer fsyncs in WAL mode
+        "synchronous": settings.SQLITE_SYNCHRONOUS,
+        # Wait for the write lock instead of failing with "database is locked"
+        "busy_timeout": settings.SQLITE_BUSY_TIMEOUT_MS,
+        "cache_size": -settings.SQLITE_CACHE_SIZE_KB,
+        "mmap_size": settings.SQLITE_MMAP_SIZE,
+        "temp_store": "MEMORY",
+    }
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False}
-)
+def apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in sqlite_pragmas().items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+def engine_options(url):
+    """create_engine keyword arguments for the given database URL"""
+    if is_sqlite(url):
+        return {"connect_args": {"check_same_thread": False}}
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+def _query_started(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._query_started = time.perf_counter()
+
+def _query_finished(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_query_started", None)
+    if started is None:
+        return
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+    DB_QUERY_SECONDS.observe(time.perf_counter() - started, operation)
+
+def configure_engine(engine, url):
+    """Register the SQLite tuning profile and query timing on a (sync or async) engine"""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    if is_sqlite(url):
+        event.listen(sync_engine, "connect", apply_sqlite_pragmas)
+    event.listen(sync_engine, "before_cursor_execute", _query_started)
+    event.listen(sync_engine, "after_cursor_execute", _query_finished)
+    return engine
+
+def create_db_engine(url=None):
+    """Engine factory shared by the app, async sessions and CLI scripts"""
+    url = url or DATABASE_URL
+    if is_sqlite(url):
+        database = make_url(url).database
+        if database and database != ":memory:":
+            # Create database folder if it doesn't exist
+            pathlib.Path(database).parent.mkdir(parents=True, exist_ok=True)
+    return configure_engine(create_engine(url, **engine_options(url)), url)
+
+engine = create_db_engine()
 
 # Use scoped_session for thread-safe session management
 db_session = scoped_session(sessionmaker(autocommit=False, autoflush=False, bind=engine))
@@ -31,6 +92,11 @@ def init_db():
     print("Creating database tables...")
     Base.metadata.create_all(bind=engine)
     print("Database tables created")
+
+    # Existing databases only gain new indexes through migrations
+    applied = run_migrations(engine)
+    if applied:
+        print(f"Applied migrations: {applied}")
     
     # Create default business if none exists
     db = db_session()
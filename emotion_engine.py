@@ -1,4 +1,77 @@
 import re
+from collections import deque
+
+WORD = "word"
+SUBSTRING = "substring"
+
+def _is_word_char(ch):
+    return ch.isalnum() or ch == "_"
+
+def _is_boundary(text, i):
+    """Same semantics as the regex \\b assertion at position i"""
+    before = i > 0 and _is_word_char(text[i - 1])
+    after = i < len(text) and _is_word_char(text[i])
+    return before != after
+
+class PhraseLexicon:
+    """
+    Every phrase of a set of keyword tables compiled into one Aho-Corasick
+    automaton, so a single pass over the text finds all labels present.
+
+    Phrases match either between word boundaries (like r'\\b' + phrase + r'\\b')
+    or as plain substrings. Each automaton state carries the outputs of its
+    whole failure chain, so overlapping phrases are all reported.
+    """
+
+    def __init__(self, entries):
+        # entries: iterable of (phrase, mode, label)
+        self._goto = [{}]
+        outputs = [{}]
+        for phrase, mode, label in entries:
+            state = 0
+            for ch in phrase:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    outputs.append({})
+                state = nxt
+            outputs[state].setdefault((len(phrase), mode), set()).add(label)
+
+        # Breadth-first failure links, merging outputs along the chain
+        self._fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                for key, labels in outputs[self._fail[nxt]].items():
+                    outputs[nxt].setdefault(key, set()).update(labels)
+
+        self._out = [
+            tuple((length, mode == WORD, frozenset(labels)) for (length, mode), labels in out.items())
+            for out in outputs
+        ]
+
+    def scan(self, text):
+        """Return the set of labels whose phrases occur in text"""
+        found = set()
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for length, word_bounded, labels in out[state]:
+                if word_bounded and not (_is_boundary(text, i - length + 1) and _is_boundary(text, i + 1)):
+                    continue
+                found |= labels
+        return found
 
 EMOTION_KEYWORDS = {
     "excited": [
@@ -65,103 +138,93 @@ OBJECTION_PATTERNS = [
     r"maybe (later|another time)"
 ]
 
+
+# Tone and style markers used by detect_emotion
+FORMAL_MARKERS = [
+    "please", "thank you", "could you", "would you", "may i", "appreciate",
+    "grateful", "kindly", "sir", "madam", "mr", "ms", "mrs"
+]
+
+FORMAL_GREETINGS = ["good morning", "good afternoon", "good evening"]
+
+INFORMAL_MARKERS = [
+    "idk", "lol", "omg", "wtf", "gonna", "wanna", "ain't", "nah", "yep", "yup",
+    "gimme", "dunno", "lemme", "bro", "dude", "sup", "hey",
+    "i'm", "you're", "it's", "they're", "we're", "can't", "won't", "don't",
+    "shouldn't", "couldn't", "wouldn't",
+    "yeah", "ok", "cool", "nice", "sweet", "tight", "sick", "fire", "lit", "bet", "facts"
+]
+
+FILLERS = ["like", "just", "well", "actually", "literally", "seriously", "basically", "kinda", "sorta"]
+
+URGENCY_KEYWORDS = ["asap", "quickly", "fast", "urgent", "soon", "right now", "immediately", "today"]
+
+EMOTION_PRIORITY = [
+    "buying_interest", "strong_objection", "strong_interest", "price_conscious",
+    "sarcasm", "confused", "mood_swing", "frustrated", "hesitant", "excited",
+    "curious", "social_proof_seeking"
+]
+
+def _emotion_lexicon_entries():
+    for emotion, phrases in EMOTION_KEYWORDS.items():
+        for phrase in phrases:
+            yield phrase, WORD, "emotion:" + emotion
+    for phrase in BUYING_INTENT_PHRASES:
+        yield phrase, SUBSTRING, "buying_phrase"
+    for phrase in FORMAL_MARKERS:
+        yield phrase, WORD, "tone:formal"
+    for phrase in FORMAL_GREETINGS:
+        yield phrase, SUBSTRING, "tone:formal"
+    for phrase in INFORMAL_MARKERS:
+        yield phrase, WORD, "tone:informal"
+    for phrase in FILLERS:
+        # Scanned against the space-padded text, so this is a whole-token match
+        yield f" {phrase} ", SUBSTRING, "filler"
+    for phrase in URGENCY_KEYWORDS:
+        yield phrase, SUBSTRING, "urgency"
+
+EMOTION_LEXICON = PhraseLexicon(_emotion_lexicon_entries())
+OBJECTION_REGEX = re.compile("|".join(f"(?:{p})" for p in OBJECTION_PATTERNS))
+
 def detect_emotion(text):
     """Enhanced emotion detection for sales conversations"""
     t = text.lower().strip()
+    hits = EMOTION_LEXICON.scan(f" {t} ")
     found_emotions = []
     
     # Check for buying intent first (highest priority)
     buying_intent_score = 0
-    for phrase in BUYING_INTENT_PHRASES:
-        if phrase in t:
-            buying_intent_score += 5
-            found_emotions.append("buying_interest")
-            break
+    if "buying_phrase" in hits:
+        buying_intent_score += 5
+        found_emotions.append("buying_interest")
     
     # Check for objection patterns
-    for pattern in OBJECTION_PATTERNS:
-        if re.search(pattern, t):
-            found_emotions.append("strong_objection")
-            break
+    if OBJECTION_REGEX.search(t):
+        found_emotions.append("strong_objection")
 
     # Check for each emotion category
-    for emotion, phrases in EMOTION_KEYWORDS.items():
-        for phrase in phrases:
-            # Use word boundaries for better matching
-            if re.search(r'\b' + re.escape(phrase) + r'\b', t):
-                found_emotions.append(emotion)
-                break
+    for emotion in EMOTION_KEYWORDS:
+        if "emotion:" + emotion in hits:
+            found_emotions.append(emotion)
 
     # Advanced emotion prioritization for sales
-    if "buying_interest" in found_emotions:
-        primary = "buying_interest"
-    elif "strong_objection" in found_emotions:
-        primary = "strong_objection"
-    elif "strong_interest" in found_emotions:
-        primary = "strong_interest"
-    elif "price_conscious" in found_emotions:
-        primary = "price_conscious"
-    elif "sarcasm" in found_emotions:
-        primary = "sarcasm"
-    elif "confused" in found_emotions:
-        primary = "confused"
-    elif "mood_swing" in found_emotions:
-        primary = "mood_swing"
-    elif "frustrated" in found_emotions:
-        primary = "frustrated"
-    elif "hesitant" in found_emotions:
-        primary = "hesitant"
-    elif "excited" in found_emotions:
-        primary = "excited"
-    elif "curious" in found_emotions:
-        primary = "curious"
-    elif "social_proof_seeking" in found_emotions:
-        primary = "social_proof_seeking"
-    else:
-        primary = "neutral"
-
-    # Tone detection (more sophisticated)
-    informal_patterns = [
-        r"\b(idk|lol|omg|wtf|gonna|wanna|ain't|nah|yep|yup|gimme|dunno|lemme|bro|dude|sup|hey)\b",
-        r"\b(i'm|you're|it's|they're|we're|can't|won't|don't|shouldn't|couldn't|wouldn't)\b",
-        r"\b(yeah|ok|cool|nice|sweet|tight|sick|fire|lit|bet|facts)\b"
-    ]
-    
-    formal_indicators = [
-        r"\b(please|thank you|could you|would you|may i|appreciate|grateful|kindly)\b",
-        r"(good morning|good afternoon|good evening)",
-        r"\b(sir|madam|mr|ms|mrs)\b"
-    ]
-    
-    tone = "neutral"
-    
-    # Check for formal language first
-    for pattern in formal_indicators:
-        if re.search(pattern, t):
-            tone = "formal"
-            break
-    
-    # Override with informal if found
-    for pattern in informal_patterns:
-        if re.search(pattern, t):
-            tone = "informal"
-            break
+    primary = next((e for e in EMOTION_PRIORITY if e in found_emotions), "neutral")
 
-    # Detect filler/casual usage
-    fillers = ["like", "just", "well", "actually", "literally", "seriously", "basically", "kinda", "sorta"]
-    uses_filler = any(f" {f} " in f" {t} " for f in fillers)
-
-    # Urgency detection
-    urgency_keywords = ["asap", "quickly", "fast", "urgent", "soon", "right now", "immediately", "today"]
-    has_urgency = any(kw in t for kw in urgency_keywords)
+    # Tone detection: informal markers override formal ones
+    if "tone:informal" in hits:
+        tone = "informal"
+    elif "tone:formal" in hits:
+        tone = "formal"
+    else:
+        tone = "neutral"
 
     return {
         "primary": primary,
         "all": found_emotions,
         "tone": tone,
-        "uses_filler": uses_filler,
+        "uses_filler": "filler" in hits,
         "buying_intent_score": buying_intent_score,
-        "has_urgency": has_urgency
+        "has_urgency": "urgency" in hits
     }
 
 # Updated emotion keywords for sales contexts
@@ -215,79 +278,71 @@ BUYING_INTENT_PATTERNS = [
     r"(add to cart|checkout|place order|make purchase)"
 ]
 
+
+# Tone markers used by detect_sales_emotion
+SALES_FORMAL_MARKERS = ["please", "thank you", "could you", "would you", "may i", "sir", "madam"]
+
+SALES_CASUAL_MARKERS = [
+    "hey", "hi", "sup", "yo", "yeah", "yep", "nah", "ok", "cool", "awesome", "lol", "omg",
+    "gonna", "wanna", "gotta", "kinda", "sorta", "dunno"
+]
+
+SALES_EMOTION_PRIORITY = [
+    "price_shopping", "objection", "excited_interest", "comparing", "trust_building",
+    "urgency", "confused", "hesitant", "casual_browsing"
+]
+
+def _sales_lexicon_entries():
+    for emotion, phrases in SALES_EMOTION_KEYWORDS.items():
+        for phrase in phrases:
+            yield phrase, WORD, "emotion:" + emotion
+    for phrase in SALES_FORMAL_MARKERS:
+        yield phrase, WORD, "tone:formal"
+    for phrase in FORMAL_GREETINGS:
+        yield phrase, SUBSTRING, "tone:formal"
+    for phrase in SALES_CASUAL_MARKERS:
+        yield phrase, WORD, "tone:casual"
+
+SALES_LEXICON = PhraseLexicon(_sales_lexicon_entries())
+BUYING_INTENT_REGEX = re.compile("|".join(f"(?:{p})" for p in BUYING_INTENT_PATTERNS))
+
 def detect_sales_emotion(text):
     """
     Enhanced emotion detection specifically for sales conversations
     """
     t = text.lower().strip()
+    hits = SALES_LEXICON.scan(t)
     found_emotions = []
     confidence_scores = {}
     
     # Check for buying intent patterns first (highest priority)
     buying_intent_score = 0
-    for pattern in BUYING_INTENT_PATTERNS:
-        if re.search(pattern, t):
-            buying_intent_score += 10
-            found_emotions.append("ready_to_buy")
-            break
+    if BUYING_INTENT_REGEX.search(t):
+        buying_intent_score += 10
+        found_emotions.append("ready_to_buy")
     
     # Check each emotion category
-    for emotion, phrases in SALES_EMOTION_KEYWORDS.items():
+    for emotion in SALES_EMOTION_KEYWORDS:
         score = 0
-        for phrase in phrases:
-            # Use word boundaries for better matching
-            if re.search(r'\b' + re.escape(phrase) + r'\b', t):
-                score += 5
-                if emotion not in found_emotions:
-                    found_emotions.append(emotion)
-                break
+        if "emotion:" + emotion in hits:
+            score += 5
+            if emotion not in found_emotions:
+                found_emotions.append(emotion)
         confidence_scores[emotion] = score
     
     # Advanced prioritization for sales context
     if "ready_to_buy" in found_emotions or buying_intent_score > 0:
         primary = "ready_to_buy"
-    elif "price_shopping" in found_emotions:
-        primary = "price_shopping"
-    elif "objection" in found_emotions:
-        primary = "objection"
-    elif "excited_interest" in found_emotions:
-        primary = "excited_interest"
-    elif "comparing" in found_emotions:
-        primary = "comparing"
-    elif "trust_building" in found_emotions:
-        primary = "trust_building"
-    elif "urgency" in found_emotions:
-        primary = "urgency"
-    elif "confused" in found_emotions:
-        primary = "confused"
-    elif "hesitant" in found_emotions:
-        primary = "hesitant"
-    elif "casual_browsing" in found_emotions:
-        primary = "casual_browsing"
     else:
-        primary = "neutral"
+        primary = next((e for e in SALES_EMOTION_PRIORITY if e in found_emotions), "neutral")
 
-    # Detect conversation tone
-    formal_indicators = [
-        r"\b(please|thank you|could you|would you|may i|sir|madam)\b",
-        r"(good morning|good afternoon|good evening)"
-    ]
-    
-    casual_indicators = [
-        r"\b(hey|hi|sup|yo|yeah|yep|nah|ok|cool|awesome|lol|omg)\b",
-        r"\b(gonna|wanna|gotta|kinda|sorta|dunno)\b"
-    ]
-    
-    tone = "neutral"
-    for pattern in formal_indicators:
-        if re.search(pattern, t):
-            tone = "formal"
-            break
-    
-    for pattern in casual_indicators:
-        if re.search(pattern, t):
-            tone = "casual"
-            break
+    # Detect conversation tone: casual markers override formal ones
+    if "tone:casual" in hits:
+        tone = "casual"
+    elif "tone:formal" in hits:
+        tone = "formal"
+    else:
+        tone = "neutral"
 
     return {
         "primary": primary,
@@ -296,4 +351,4 @@ def detect_sales_emotion(text):
         "buying_intent_score": buying_intent_score,
         "confidence_scores": confidence_scores,
         "message_length": len(text.split())
-    }
\ No newline at end of file
+    }
@@ -1,39 +1,69 @@
 from models import Lead, User, TokenTransaction
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from utils.token_logic import debit_tokens, debit_tokens_async
 
 LEAD_CAPTURE_COST = 15 # Cost in tokens to save one lead
 
-def save_lead(db: Session, user_id: int, business_id: int, name: str, email: str, phone: str, message: str, lead_capture_enabled: bool):
+def save_lead(db: Session, user_id: int, business_id: int, name: str, email: str, phone: str, message: str, lead_capture_enabled: bool, commit: bool = True):
     """
     Saves a new lead to the database and deducts tokens from the user.
+    With commit=False the writes are left for the caller's transaction.
     """
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        # This should ideally not happen if the user is authenticated
-        raise ValueError("User not found.")
+    lead, _ = stage_lead(db, user_id, business_id, name, email, phone, message, lead_capture_enabled)
+    # 3. Commit the debit, transaction record and lead together
+    if lead is not None and commit:
+        db.commit()
+        db.refresh(lead)
+    return lead
 
+def stage_lead(db: Session, user_id: int, business_id: int, name: str, email: str, phone: str, message: str, lead_capture_enabled: bool):
+    """Debit and add a lead without committing; returns (lead, balance after the debit)"""
     if not lead_capture_enabled:
-        return None # Do not save lead if the feature is disabled
+        return None, None # Do not save lead if the feature is disabled
 
-    if user.tokens < LEAD_CAPTURE_COST:
+    # 1. Deduct tokens and record the transaction in one conditional UPDATE
+    new_balance = debit_tokens(db, user_id, LEAD_CAPTURE_COST, "lead_capture", f"Captured lead: {name}", commit=False)
+    if new_balance is None:
+        if not db.query(User.id).filter(User.id == user_id).first():
+            # This should ideally not happen if the user is authenticated
+            raise ValueError("User not found.")
         # In a real application, you might want to notify the user
         # or prevent the lead from being saved if they have insufficient tokens.
         # For now, we'll just raise an error.
         raise ValueError("Insufficient tokens to capture lead.")
 
-    # 1. Deduct tokens from the user
-    user.tokens -= LEAD_CAPTURE_COST
-
-    # 2. Create a token transaction record
-    transaction = TokenTransaction(
-        user_id=user.id,
-        amount=-LEAD_CAPTURE_COST,
-        type="lead_capture",
-        detail=f"Captured lead: {name}"
+    # 2. Create and save the new lead
+    lead = Lead(
+        user_id=user_id,
+        business_id=business_id,
+        name=name,
+        email=email,
+        phone=phone,
+        message=message
     )
-    db.add(transaction)
+    db.add(lead)
+    return lead, new_balance
+
+async def save_lead_async(db, user_id: int, business_id: int, name: str, email: str, phone: str, message: str, lead_capture_enabled: bool, commit: bool = True):
+    """save_lead on an async session"""
+    lead, _ = await stage_lead_async(db, user_id, business_id, name, email, phone, message, lead_capture_enabled)
+    if lead is not None and commit:
+        await db.commit()
+    return lead
+
+async def stage_lead_async(db, user_id: int, business_id: int, name: str, email: str, phone: str, message: str, lead_capture_enabled: bool):
+    """stage_lead on an async session"""
+    if not lead_capture_enabled:
+        return None, None
+
+    new_balance = await debit_tokens_async(db, user_id, LEAD_CAPTURE_COST, "lead_capture", f"Captured lead: {name}", commit=False)
+    if new_balance is None:
+        result = await db.execute(select(User.id).where(User.id == user_id))
+        if result.first() is None:
+            raise ValueError("User not found.")
+        raise ValueError("Insufficient tokens to capture lead.")
 
-    # 3. Create and save the new lead
     lead = Lead(
         user_id=user_id,
         business_id=business_id,
@@ -43,9 +73,4 @@ def save_lead(db: Session, user_id: int, business_id: int, name: str, email: str
         message=message
     )
     db.add(lead)
-    
-    # 4. Commit all changes to the database
-    db.commit()
-    db.refresh(lead)
-    
-    return lead
+    return lead, new_balance
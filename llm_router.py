@@ -0,0 +1,266 @@
+import asyncio
+import random
+import time
+from collections import deque
+import httpx
+from config import settings
+from utils.metrics import registry
+
+LLM_ATTEMPTS = registry.counter(
+    "llm_attempts_total", "Upstream LLM attempts by model and outcome", ("model", "outcome")
+)
+LLM_HEDGES = registry.counter(
+    "llm_hedged_requests_total", "Hedge requests started after the hedge delay", ("model",)
+)
+
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+class UpstreamUnavailable(Exception):
+    """Every candidate model is failing or has an open circuit"""
+
+def is_retryable(error):
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in RETRYABLE_STATUS
+    return isinstance(error, (httpx.TransportError, asyncio.TimeoutError))
+
+def retry_after_seconds(error):
+    """Server-requested wait from a Retry-After header, if any"""
+    if isinstance(error, httpx.HTTPStatusError):
+        value = error.response.headers.get("retry-after")
+        try:
+            return float(value) if value is not None else None
+        except ValueError:
+            return None
+    return None
+
+def outcome_of(error):
+    if error is None:
+        return "ok"
+    if isinstance(error, httpx.HTTPStatusError):
+        return str(error.response.status_code)
+    return type(error).__name__
+
+class ModelHealth:
+    """Recent latencies and a consecutive-failure circuit breaker for one model"""
+
+    def __init__(self, model: str, window: int, failure_threshold: int, reset_seconds: float):
+        self.model = model
+        self.latencies = deque(maxlen=window)
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    def percentile(self, q: float):
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+    def available(self):
+        """Closed, or open long enough to let one half-open trial through"""
+        if self.opened_at is None:
+            return True
+        return not self.trial_in_flight and time.monotonic() - self.opened_at >= self.reset_seconds
+
+    def acquire(self):
+        if self.opened_at is not None:
+            self.trial_in_flight = True
+
+    def success(self, seconds=None):
+        if seconds is not None:
+            self.latencies.append(seconds)
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    def failure(self):
+        self.consecutive_failures += 1
+        self.trial_in_flight = False
+        if self.opened_at is not None or self.consecutive_failures >= self.failure_threshold:
+            # A failed half-open trial re-opens the circuit for another period
+            self.opened_at = time.monotonic()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if self.available() else "open"
+
+class LLMRouter:
+    """
+    Picks a model for each upstream attempt and retries, hedges and falls
+    back across the configured model list.
+
+    Models are tried in configured order, except that a model whose recent
+    p95 exceeds slow_seconds is moved behind the fast ones, and models with
+    an open circuit are skipped. Retryable failures (429, 5xx, timeouts)
+    back off with full jitter and move on to the next model.
+    """
+
+    def __init__(self, models, max_retries: int, base_delay: float, max_delay: float,
+                 hedge: bool, hedge_min_delay: float, slow_seconds: float,
+                 window: int, failure_threshold: int, reset_seconds: float):
+        self.models = list(models)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge = hedge
+        self.hedge_min_delay = hedge_min_delay
+        self.slow_seconds = slow_seconds
+        self.health = {m: ModelHealth(m, window, failure_threshold, reset_seconds) for m in self.models}
+
+    @property
+    def primary(self):
+        return self.models[0]
+
+    def candidates(self):
+        """Available models, fast ones first in configured order"""
+        fast, slow = [], []
+        for model in self.models:
+            health = self.health[model]
+            if not health.available():
+                continue
+            p95 = health.percentile(0.95)
+            (slow if p95 is not None and p95 > self.slow_seconds else fast).append((p95 or 0, model))
+        slow.sort()
+        return [m for _, m in fast] + [m for _, m in slow]
+
+    def backoff(self, attempt: int, error):
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        requested = retry_after_seconds(error)
+        if requested is not None:
+            delay = max(delay, min(requested, self.max_delay))
+        return delay
+
+    def hedge_delay(self, model: str):
+        p95 = self.health[model].percentile(0.95)
+        return max(self.hedge_min_delay, p95 or 0)
+
+    async def _attempt(self, model: str, send):
+        """One attempt on model; the caller has already claimed any half-open trial"""
+        health = self.health[model]
+        start = time.perf_counter()
+        try:
+            result = await send(model)
+        except asyncio.CancelledError:
+            # Lost a hedge race: not a failure, but the elapsed time is a
+            # lower bound on its latency, so a slow model still gets demoted
+            health.latencies.append(time.perf_counter() - start)
+            health.trial_in_flight = False
+            raise
+        except Exception as e:
+            if is_retryable(e):
+                health.failure()
+            else:
+                health.trial_in_flight = False
+            LLM_ATTEMPTS.inc(model, outcome_of(e))
+            raise
+        health.success(time.perf_counter() - start)
+        LLM_ATTEMPTS.inc(model, "ok")
+        return result
+
+    def _spawn(self, model: str, send):
+        """Start an attempt as a task, claiming a half-open trial before it runs"""
+        health = self.health[model]
+        health.acquire()
+        started = False
+
+        async def run():
+            nonlocal started
+            started = True
+            return await self._attempt(model, send)
+
+        def settle(task):
+            # Cancelled before it ever ran, so _attempt couldn't free the trial
+            if task.cancelled() and not started:
+                health.trial_in_flight = False
+
+        task = asyncio.ensure_future(run())
+        task.add_done_callback(settle)
+        return task
+
+    async def _hedged(self, model: str, backup: str, send):
+        """Run model; if it is slower than its p95, race a copy on backup"""
+        pending = {self._spawn(model, send)}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=self.hedge_delay(model))
+            if not done and self.health[backup].available():
+                LLM_HEDGES.inc(backup)
+                pending.add(self._spawn(backup, send))
+            error = None
+            while True:
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+                if not pending:
+                    raise error
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            # Also runs when the caller is cancelled, so no attempt is orphaned
+            for task in pending:
+                task.cancel()
+
+    async def call(self, send):
+        """
+        Await send(model) -> result with retries, hedging and fallback.
+        Non-retryable errors (e.g. 400/401) are raised immediately.
+        """
+        error = None
+        for attempt in range(self.max_retries + 1):
+            candidates = self.candidates()
+            if not candidates:
+                raise UpstreamUnavailable("All LLM models have an open circuit") from error
+            model = candidates[attempt % len(candidates)]
+            backup = candidates[(attempt + 1) % len(candidates)]
+            try:
+                if self.hedge and backup != model:
+                    return await self._hedged(model, backup, send)
+                self.health[model].acquire()
+                return await self._attempt(model, send)
+            except Exception as e:
+                if not is_retryable(e):
+                    raise
+                error = e
+            if attempt < self.max_retries:
+                await asyncio.sleep(self.backoff(attempt, error))
+        raise error
+
+    def open_stream_models(self):
+        """Models to try, in order, for a streaming request (no hedging)"""
+        return self.candidates()[:self.max_retries + 1]
+
+    def stats(self):
+        return {
+            model: {
+                "state": health.state,
+                "consecutive_failures": health.consecutive_failures,
+                "p50": health.percentile(0.5),
+                "p95": health.percentile(0.95),
+            }
+            for model, health in self.health.items()
+        }
+
+def configured_models():
+    models = [m.strip() for m in settings.OPENROUTER_MODELS.split(",") if m.strip()]
+    return models or ["deepseek/deepseek-chat-v3-0324:free"]
+
+llm_router = LLMRouter(
+    configured_models(),
+    max_retries=settings.LLM_MAX_RETRIES,
+    base_delay=settings.LLM_RETRY_BASE_DELAY,
+    max_delay=settings.LLM_RETRY_MAX_DELAY,
+    hedge=settings.LLM_HEDGE_ENABLED,
+    hedge_min_delay=settings.LLM_HEDGE_MIN_DELAY,
+    slow_seconds=settings.LLM_SLOW_MODEL_SECONDS,
+    window=settings.LLM_LATENCY_WINDOW,
+    failure_threshold=settings.LLM_BREAKER_FAILURES,
+    reset_seconds=settings.LLM_BREAKER_RESET_SECONDS
+)
+
+registry.callback(
+    "llm_circuit_open", "1 when the model's circuit breaker is open or half-open", ("model",),
+    lambda: {(m,): int(h.opened_at is not None) for m, h in llm_router.health.items()}
+)
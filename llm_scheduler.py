@@ -0,0 +1,174 @@
+import asyncio
+import heapq
+import itertools
+import json
+import logging
+import time
+from contextlib import asynccontextmanager
+from config import settings
+from utils.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+QUEUE_WAIT_SECONDS = registry.histogram(
+    "llm_queue_wait_seconds", "Time LLM calls waited for a scheduler slot", ("tier",)
+)
+REJECTIONS = registry.counter(
+    "llm_scheduler_rejections_total", "LLM calls rejected by the scheduler", ("reason", "tier")
+)
+
+class SchedulerRejected(Exception):
+    """The LLM queue is full or the wait timed out; answer 503"""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(f"LLM capacity exhausted ({reason})")
+        self.reason = reason
+        self.retry_after = retry_after
+
+class FairScheduler:
+    """
+    Global cap on concurrent upstream LLM calls with weighted fair queueing
+    per business.
+
+    Each queued call gets a virtual finish tag of
+    max(virtual time, the business's previous tag) + 1 / tier weight, and
+    free slots go to the smallest tag. A busy business therefore only
+    delays its own later calls, and higher-weight (paid) tiers get a larger
+    share when everyone is queued. Queues are bounded per business and in
+    total; over the limit a call is rejected immediately. Lives on the
+    event loop, so no locking.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue_per_business: int, max_queue_total: int,
+                 queue_timeout: float, tier_weights: dict):
+        self.max_concurrency = max_concurrency
+        self.max_queue_per_business = max_queue_per_business
+        self.max_queue_total = max_queue_total
+        self.queue_timeout = queue_timeout
+        self.tier_weights = tier_weights
+        self.active = 0
+        self._heap = []
+        self._queued = {}
+        self._queued_total = 0
+        self._finish_tags = {}
+        self._virtual_time = 0.0
+        self._seq = itertools.count()
+
+    def weight(self, tier):
+        return max(float(self.tier_weights.get(tier, 1)), 0.01)
+
+    def _tags(self, business_id, tier):
+        start = max(self._virtual_time, self._finish_tags.get(business_id, 0.0))
+        finish = start + 1.0 / self.weight(tier)
+        self._finish_tags[business_id] = finish
+        if len(self._finish_tags) > 10000:
+            # Tags at or behind virtual time carry no history; drop them
+            self._finish_tags = {b: t for b, t in self._finish_tags.items() if t > self._virtual_time}
+        return start, finish
+
+    @property
+    def queued(self):
+        return self._queued_total
+
+    def _reject(self, reason, tier):
+        REJECTIONS.inc(reason, tier)
+        raise SchedulerRejected(reason, retry_after=max(1.0, self.queue_timeout / 2))
+
+    def check_admission(self, business_id, tier):
+        """Raise SchedulerRejected if a call for this business could not even queue"""
+        if self.active < self.max_concurrency and not self._heap:
+            return
+        if self._queued_total >= self.max_queue_total:
+            self._reject("queue_full", tier)
+        if self._queued.get(business_id, 0) >= self.max_queue_per_business:
+            self._reject("business_queue_full", tier)
+
+    async def acquire(self, business_id, tier):
+        enqueued = time.perf_counter()
+        if self.active < self.max_concurrency and not self._heap:
+            start, _ = self._tags(business_id, tier)
+            self._virtual_time = max(self._virtual_time, start)
+            self.active += 1
+            QUEUE_WAIT_SECONDS.observe(0.0, tier)
+            return
+
+        self.check_admission(business_id, tier)
+
+        start, finish = self._tags(business_id, tier)
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._heap, (finish, next(self._seq), start, business_id, future))
+        self._queued[business_id] = self._queued.get(business_id, 0) + 1
+        self._queued_total += 1
+        try:
+            await asyncio.wait_for(future, self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._abandon(business_id, future)
+            self._reject("queue_timeout", tier)
+        except asyncio.CancelledError:
+            self._abandon(business_id, future)
+            raise
+        QUEUE_WAIT_SECONDS.observe(time.perf_counter() - enqueued, tier)
+
+    def _abandon(self, business_id, future):
+        """Give up a queued call; a slot granted just before is handed back"""
+        if future.done() and not future.cancelled():
+            # release() already took it off the queue counts
+            self.release()
+        else:
+            future.cancel()
+            self._dequeued(business_id)
+
+    def _dequeued(self, business_id):
+        self._queued_total -= 1
+        remaining = self._queued.get(business_id, 1) - 1
+        if remaining:
+            self._queued[business_id] = remaining
+        else:
+            self._queued.pop(business_id, None)
+
+    def release(self):
+        self.active -= 1
+        while self.active < self.max_concurrency and self._heap:
+            _, _, start, business_id, future = heapq.heappop(self._heap)
+            if future.done():
+                continue  # Timed out or cancelled; already dequeued
+            self._dequeued(business_id)
+            self._virtual_time = max(self._virtual_time, start)
+            self.active += 1
+            future.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, business_id, tier):
+        await self.acquire(business_id, tier)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self):
+        return {
+            "active": self.active,
+            "queued": self._queued_total,
+            "max_concurrency": self.max_concurrency,
+            "busiest_queues": sorted(self._queued.items(), key=lambda item: -item[1])[:10],
+        }
+
+def _load_tier_weights():
+    try:
+        return json.loads(settings.LLM_TIER_WEIGHTS or "{}")
+    except json.JSONDecodeError:
+        logger.warning("LLM_TIER_WEIGHTS is not valid JSON; all tiers get weight 1")
+        return {}
+
+llm_scheduler = FairScheduler(
+    max_concurrency=settings.LLM_MAX_CONCURRENCY,
+    max_queue_per_business=settings.LLM_MAX_QUEUE_PER_BUSINESS,
+    max_queue_total=settings.LLM_MAX_QUEUE_TOTAL,
+    queue_timeout=settings.LLM_QUEUE_TIMEOUT,
+    tier_weights=_load_tier_weights()
+)
+
+registry.callback(
+    "llm_scheduler_slots", "Upstream LLM calls in flight and waiting", ("state",),
+    lambda: {("active",): llm_scheduler.active, ("queued",): llm_scheduler.queued}
+)
@@ -0,0 +1,220 @@
+"""
+Drive the chat API at a fixed request rate and report latency and errors as JSON.
+
+    python mock_llm_server.py &
+    OPENROUTER_URL=http://127.0.0.1:9000/api/v1/chat/completions python app.py &
+    python load_test.py --rps 20 --duration 60 --email owner@example.com --business-id 1
+
+Arrivals are open-loop (Poisson by default), so a slow server shows up as
+rising latency instead of a silently lower request rate.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from collections import Counter
+import httpx
+
+# Make the backend importable when run as a script (this file lives in backend/)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# Shopper messages spread across the intents the chat pipeline branches on:
+# catalog listings, specific product questions, price, emotion and contact
+DEFAULT_CORPUS = [
+    "Hi! What products do you have?",
+    "Show me everything in your catalog",
+    "Do you have any running shoes in size 42?",
+    "How much is the leather jacket?",
+    "Is the black hoodie still in stock?",
+    "I'm looking for a gift for my sister, any ideas?",
+    "What's the cheapest phone case you sell?",
+    "Can you compare the two wireless earbuds for me?",
+    "This is so frustrating, my order still hasn't arrived!",
+    "I love your store, the last dress I bought was perfect",
+    "Do you ship to Dubai and how long does it take?",
+    "What payment methods do you accept?",
+    "Can I get a discount if I buy three shirts?",
+    "I'm not sure which size to pick, I'm usually a medium",
+    "Are your bags made of real leather?",
+    "Can someone call me? My number is 0300 1234567",
+    "What is your return policy?",
+    "Do you have anything similar but in blue?",
+    "I need a laptop bag that fits a 15 inch laptop",
+    "Thanks, I'll take the white sneakers. How do I order?",
+]
+
+def load_corpus(path):
+    """One message per line; .jsonl lines may be {"message": ...} objects"""
+    if not path:
+        return DEFAULT_CORPUS
+    messages = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if path.endswith(".jsonl"):
+                line = json.loads(line).get("message", "")
+            if line:
+                messages.append(line[:1000])
+    return messages
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return round(sorted_values[index], 4)
+
+def latency_summary(values):
+    values = sorted(values)
+    return {
+        "count": len(values),
+        "mean": round(sum(values) / len(values), 4) if values else None,
+        "p50": percentile(values, 50),
+        "p90": percentile(values, 90),
+        "p99": percentile(values, 99),
+        "max": round(values[-1], 4) if values else None,
+    }
+
+def mint_token(email):
+    """Sign an access token with the app's SECRET_KEY, as the login route would"""
+    from utils.token_logic import create_access_token
+    return create_access_token({"sub": email})
+
+class LoadTest:
+    def __init__(self, args, corpus, token):
+        self.args = args
+        self.corpus = corpus
+        self.url = args.base_url.rstrip("/") + ("/api/chat/stream" if args.stream else "/api/chat/")
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self.latencies = []
+        self.first_token = []
+        self.statuses = Counter()
+        self.errors = Counter()
+        self.sent = 0
+        self.dropped = 0
+        self.in_flight = 0
+
+    async def one(self, client):
+        body = {"message": random.choice(self.corpus), "demo_mode": self.args.demo}
+        params = {"business_id": self.args.business_id}
+        start = time.perf_counter()
+        self.in_flight += 1
+        try:
+            if self.args.stream:
+                error = await self._stream(client, body, params, start)
+            else:
+                r = await client.post(self.url, json=body, params=params, headers=self.headers)
+                self.statuses[str(r.status_code)] += 1
+                error = f"http_{r.status_code}" if r.status_code >= 400 else None
+            if error:
+                self.errors[error] += 1
+            else:
+                self.latencies.append(time.perf_counter() - start)
+        except httpx.HTTPError as e:
+            self.errors[type(e).__name__] += 1
+        finally:
+            self.in_flight -= 1
+
+    async def _stream(self, client, body, params, start):
+        """Read the SSE reply to the end; returns an error label or None"""
+        async with client.stream("POST", self.url, json=body, params=params, headers=self.headers) as r:
+            self.statuses[str(r.status_code)] += 1
+            if r.status_code >= 400:
+                return f"http_{r.status_code}"
+            event = None
+            first = True
+            async for line in r.aiter_lines():
+                if line.startswith("event:"):
+                    event = line[len("event:"):].strip()
+                elif line.startswith("data:"):
+                    if event == "token" and first:
+                        first = False
+                        self.first_token.append(time.perf_counter() - start)
+                    elif event == "error":
+                        return f"sse_{json.loads(line[len('data:'):]).get('status_code')}"
+                    elif event == "done":
+                        return None
+            return "stream_incomplete"
+
+    async def run(self):
+        limits = httpx.Limits(max_connections=self.args.max_in_flight, max_keepalive_connections=self.args.max_in_flight)
+        timeout = httpx.Timeout(self.args.timeout)
+        tasks = set()
+        async with httpx.AsyncClient(limits=limits, timeout=timeout) as client:
+            started = time.perf_counter()
+            next_at = started
+            deadline = started + self.args.duration
+            while next_at < deadline:
+                await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+                self.sent += 1
+                if self.in_flight >= self.args.max_in_flight:
+                    # The client is saturated; count it rather than queue and skew the rate
+                    self.dropped += 1
+                else:
+                    task = asyncio.create_task(self.one(client))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                next_at += random.expovariate(self.args.rps) if self.args.arrivals == "poisson" else 1.0 / self.args.rps
+            if tasks:
+                await asyncio.wait(tasks)
+            elapsed = time.perf_counter() - started
+        return self.report(elapsed)
+
+    def report(self, elapsed):
+        completed = len(self.latencies)
+        failed = sum(self.errors.values())
+        attempted = completed + failed
+        result = {
+            "target": self.url,
+            "mode": "stream" if self.args.stream else "json",
+            "target_rps": self.args.rps,
+            "duration_seconds": round(elapsed, 3),
+            "sent": self.sent,
+            "dropped_client_saturated": self.dropped,
+            "completed": completed,
+            "failed": failed,
+            "throughput_rps": round(completed / elapsed, 3) if elapsed else 0,
+            "error_rate": round(failed / attempted, 4) if attempted else 0,
+            "latency_seconds": latency_summary(self.latencies),
+            "status_codes": dict(self.statuses),
+            "errors": dict(self.errors),
+        }
+        if self.args.stream:
+            result["first_token_seconds"] = latency_summary(self.first_token)
+        return result
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the chat endpoint")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--rps", type=float, default=10, help="Target request rate")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to keep sending")
+    parser.add_argument("--arrivals", choices=("poisson", "uniform"), default="poisson")
+    parser.add_argument("--max-in-flight", type=int, default=200)
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--business-id", type=int, default=1)
+    parser.add_argument("--stream", action="store_true", help="Use /api/chat/stream and time the first token")
+    parser.add_argument("--demo", action="store_true", help="Send demo_mode requests, which are not charged")
+    parser.add_argument("--corpus", help="Text file with one message per line, or .jsonl with a message field")
+    parser.add_argument("--token", default=os.getenv("LOAD_TEST_TOKEN"), help="Bearer token for the test user")
+    parser.add_argument("--email", help="Mint a token for this user with the app's SECRET_KEY instead of --token")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    parser.add_argument("--seed", type=int, default=None)
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.seed is not None:
+        random.seed(args.seed)
+    token = args.token or (mint_token(args.email) if args.email else None)
+    if not token:
+        sys.exit("Pass --token, --email or set LOAD_TEST_TOKEN")
+    report = asyncio.run(LoadTest(args, load_corpus(args.corpus), token).run())
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
@@ -0,0 +1,74 @@
+import logging
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_TABLE = "schema_migrations"
+
+class Migration:
+    """One schema version: a set of indexes to build, named as in models.py"""
+
+    def __init__(self, version: int, description: str, indexes):
+        self.version = version
+        self.description = description
+        self.indexes = indexes
+
+    def statements(self, dialect: str):
+        # Postgres builds without blocking writes; SQLite has no online
+        # build, but IF NOT EXISTS keeps every statement idempotent
+        concurrently = "CONCURRENTLY " if dialect == "postgresql" else ""
+        return [
+            f"CREATE INDEX {concurrently}IF NOT EXISTS {name} ON {table} ({', '.join(columns)})"
+            for name, table, columns in self.indexes
+        ]
+
+# Append only; never renumber or edit an applied migration
+MIGRATIONS = [
+    Migration(1, "Indexes for the chat, lead, token, product and integration hot queries", [
+        ("ix_chats_business_id_created_at", "chats", ("business_id", "created_at")),
+        ("ix_leads_business_id_created_at", "leads", ("business_id", "created_at")),
+        ("ix_token_transactions_user_id_created_at", "token_transactions", ("user_id", "created_at")),
+        ("ix_products_business_id", "products", ("business_id",)),
+        ("ix_social_media_tokens_user_id_platform", "social_media_tokens", ("user_id", "platform")),
+    ]),
+]
+
+def applied_versions(engine):
+    with engine.begin() as conn:
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {SCHEMA_TABLE} ("
+            "version INTEGER PRIMARY KEY, "
+            "description VARCHAR(256), "
+            "applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+        ))
+        return {row[0] for row in conn.execute(text(f"SELECT version FROM {SCHEMA_TABLE}"))}
+
+def run_migrations(engine):
+    """
+    Apply pending migrations in version order and record each one.
+    Safe to run from several workers at startup. Returns the versions
+    applied by this call.
+    """
+    dialect = engine.dialect.name
+    done = applied_versions(engine)
+    applied = []
+    for migration in sorted(MIGRATIONS, key=lambda m: m.version):
+        if migration.version in done:
+            continue
+        logger.info(f"Applying migration {migration.version}: {migration.description}")
+        # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            for statement in migration.statements(dialect):
+                conn.execute(text(statement))
+        try:
+            with engine.begin() as conn:
+                conn.execute(
+                    text(f"INSERT INTO {SCHEMA_TABLE} (version, description) VALUES (:version, :description)"),
+                    {"version": migration.version, "description": migration.description}
+                )
+        except IntegrityError:
+            # Another worker recorded it first
+            pass
+        applied.append(migration.version)
+    return applied
@@ -0,0 +1,181 @@
+"""
+Local stand-in for the OpenRouter / OpenAI chat completions API, for load
+tests that must not touch the real upstream.
+
+    python mock_llm_server.py --port 9000 --latency lognormal:0.8,0.5 --error-rate 0.02
+    OPENROUTER_URL=http://127.0.0.1:9000/api/v1/chat/completions python app.py
+
+Distributions are written as name:params -
+fixed:s, uniform:lo,hi, normal:mean,sd, lognormal:median,sigma, exponential:mean.
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+import uuid
+import uvicorn
+from collections import Counter
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+WORDS = (
+    "great choice our collection includes premium options that fit your style and budget "
+    "this item is available in several sizes and colors with fast delivery and easy returns "
+    "many customers love it for everyday use let me know if you would like more details "
+    "or a recommendation based on what you are looking for"
+).split()
+
+def parse_distribution(spec: str):
+    """Turn 'name:a,b' into a zero-argument sampler returning a non-negative float"""
+    name, _, raw = spec.partition(":")
+    params = [float(p) for p in raw.split(",") if p]
+    samplers = {
+        "fixed": lambda: params[0],
+        "uniform": lambda: random.uniform(params[0], params[1]),
+        "normal": lambda: random.gauss(params[0], params[1]),
+        "lognormal": lambda: random.lognormvariate(math.log(params[0]), params[1]),
+        "exponential": lambda: random.expovariate(1.0 / params[0]),
+    }
+    if name not in samplers:
+        raise ValueError(f"Unknown distribution '{name}', expected one of {', '.join(samplers)}")
+    sampler = samplers[name]
+    try:
+        sampler()  # Fail on missing parameters at startup, not per request
+    except IndexError:
+        raise ValueError(f"Distribution '{spec}' is missing parameters")
+    return lambda: max(0.0, sampler())
+
+class MockBehaviour:
+    """Latency, output size, pacing and failure knobs shared by both endpoints"""
+
+    def __init__(self, args):
+        self.latency = parse_distribution(args.latency)
+        self.response_tokens = parse_distribution(args.response_tokens)
+        self.tokens_per_second = args.tokens_per_second
+        self.error_rate = args.error_rate
+        self.error_statuses = [int(s) for s in args.error_statuses.split(",") if s]
+        self.stream_drop_rate = args.stream_drop_rate
+        self.stats = Counter()
+
+    def pick_error(self):
+        if self.error_statuses and random.random() < self.error_rate:
+            return random.choice(self.error_statuses)
+        return None
+
+    def answer(self, messages):
+        count = max(1, int(self.response_tokens()))
+        last = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+        words = [random.choice(WORDS) for _ in range(count)]
+        if last:
+            # Echo a little of the prompt so answers differ per message
+            words[:0] = last.split()[:3]
+        return words
+
+def error_response(status):
+    headers = {"Retry-After": "1"} if status == 429 else {}
+    body = {"error": {"code": status, "message": "Injected failure from mock LLM server"}}
+    return JSONResponse(body, status_code=status, headers=headers)
+
+def create_app(behaviour: MockBehaviour):
+    app = FastAPI()
+
+    @app.post("/api/v1/chat/completions")
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        payload = await request.json()
+        behaviour.stats["requests"] += 1
+        await asyncio.sleep(behaviour.latency())
+        status = behaviour.pick_error()
+        if status is not None:
+            behaviour.stats[f"error_{status}"] += 1
+            return error_response(status)
+
+        model = payload.get("model", "mock/model")
+        words = behaviour.answer(payload.get("messages") or [])
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        if payload.get("stream"):
+            behaviour.stats["streams"] += 1
+            return StreamingResponse(
+                stream_words(behaviour, completion_id, model, words),
+                media_type="text/event-stream"
+            )
+
+        if behaviour.tokens_per_second > 0:
+            await asyncio.sleep(len(words) / behaviour.tokens_per_second)
+        behaviour.stats["completions"] += 1
+        prompt_tokens = sum(len(str(m.get("content", "")).split()) for m in payload.get("messages") or [])
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": " ".join(words)},
+                "finish_reason": "stop"
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": len(words),
+                "total_tokens": prompt_tokens + len(words)
+            }
+        }
+
+    @app.get("/stats")
+    def stats():
+        return dict(behaviour.stats)
+
+    return app
+
+async def stream_words(behaviour: MockBehaviour, completion_id, model, words):
+    def chunk(delta, finish_reason=None):
+        data = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+        }
+        return f"data: {json.dumps(data)}\n\n"
+
+    # OpenRouter sends keep-alive comments while the model warms up
+    yield ": OPENROUTER PROCESSING\n\n"
+    yield chunk({"role": "assistant"})
+    drop_at = random.randrange(len(words)) if random.random() < behaviour.stream_drop_rate else None
+    delay = 1.0 / behaviour.tokens_per_second if behaviour.tokens_per_second > 0 else 0
+    for i, word in enumerate(words):
+        if i == drop_at:
+            behaviour.stats["stream_drops"] += 1
+            raise ConnectionError("Injected mid-stream disconnect")
+        if delay:
+            await asyncio.sleep(delay)
+        yield chunk({"content": word if i == 0 else f" {word}"})
+    yield chunk({}, finish_reason="stop")
+    yield "data: [DONE]\n\n"
+    behaviour.stats["completions"] += 1
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Mock OpenRouter-compatible chat completions server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency", default="lognormal:0.6,0.4",
+                        help="Delay before the first byte, e.g. fixed:0.5 or lognormal:0.8,0.5")
+    parser.add_argument("--response-tokens", default="uniform:30,150",
+                        help="Words per answer, same distribution syntax")
+    parser.add_argument("--tokens-per-second", type=float, default=50,
+                        help="Generation speed; 0 answers instantly after the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="Fraction of requests answered with an injected error status")
+    parser.add_argument("--error-statuses", default="429,500,502,503")
+    parser.add_argument("--stream-drop-rate", type=float, default=0.0,
+                        help="Fraction of streams cut off part way through")
+    parser.add_argument("--seed", type=int, default=None)
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.seed is not None:
+        random.seed(args.seed)
+    uvicorn.run(create_app(MockBehaviour(args)), host=args.host, port=args.port, log_level="warning")
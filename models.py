@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Text, Float
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Text, Float, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from utils.database import Base
@@ -43,6 +43,7 @@ class Lead(Base):
     created_at = Column(DateTime, server_default=func.now())
     user = relationship("User", back_populates="leads")
     business = relationship("Business", back_populates="leads")
+    __table_args__ = (Index("ix_leads_business_id_created_at", "business_id", "created_at"),)
 
 class Chat(Base):
     __tablename__ = "chats"
@@ -57,6 +58,7 @@ class Chat(Base):
     created_at = Column(DateTime, server_default=func.now())
     user = relationship("User", back_populates="chats")
     business = relationship("Business", back_populates="chats")
+    __table_args__ = (Index("ix_chats_business_id_created_at", "business_id", "created_at"),)
 
 class Product(Base):
     __tablename__ = "products"
@@ -69,6 +71,7 @@ class Product(Base):
     tags = Column(String(256))  # "black,sporty,shoes"
     created_at = Column(DateTime, server_default=func.now())
     business = relationship("Business", back_populates="products")
+    __table_args__ = (Index("ix_products_business_id", "business_id"),)
 
 class TokenTransaction(Base):
     __tablename__ = "token_transactions"
@@ -78,6 +81,7 @@ class TokenTransaction(Base):
     type = Column(String(32))  # "message", "sale", "purchase"
     detail = Column(String(256))
     created_at = Column(DateTime, server_default=func.now())
+    __table_args__ = (Index("ix_token_transactions_user_id_created_at", "user_id", "created_at"),)
 
 class SocialMediaToken(Base):
     __tablename__ = "social_media_tokens"
@@ -89,3 +93,4 @@ class SocialMediaToken(Base):
     expires_in = Column(Integer)
     created_at = Column(DateTime, server_default=func.now())
     user = relationship("User")
+    __table_args__ = (Index("ix_social_media_tokens_user_id_platform", "user_id", "platform"),)
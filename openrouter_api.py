@@ -1,20 +1,170 @@
 import httpx
+import json
+import logging
+import time
 from config import settings
+from utils.response_cache import llm_responses
+from utils.metrics import OUTBOUND_SECONDS
+from utils.llm_router import llm_router, is_retryable, outcome_of
+from utils.llm_scheduler import llm_scheduler
 
-OPENROUTER_URL = "https://openrouter.ai/api/v1/chat/completions"
+OPENROUTER_URL = settings.OPENROUTER_URL
+# First entry of OPENROUTER_MODELS; prompt budgets and cache keys use it
+OPENROUTER_MODEL = llm_router.primary
 
-async def query_openrouter(messages, system_prompt=None):
-    headers = {
+logger = logging.getLogger(__name__)
+
+# App-lifetime client, owned by the FastAPI lifespan in app.py
+_client = None
+
+def _headers():
+    return {
         "Authorization": f"Bearer {settings.OPENROUTER_API_KEY}",
         "Content-Type": "application/json"
     }
-    payload = {
-        "model": "deepseek/deepseek-chat-v3-0324:free",
-        "messages": []
-    }
-    # The system prompt is already included in messages[0] by the route
-    payload["messages"].extend(messages)
-    async with httpx.AsyncClient() as client:
-        r = await client.post(OPENROUTER_URL, headers=headers, json=payload, timeout=30)
+
+def create_http_client():
+    """Build a pooled keep-alive client configured from settings"""
+    http2 = settings.OPENROUTER_HTTP2
+    if http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            logger.warning("OPENROUTER_HTTP2 is enabled but the 'h2' package is not installed; using HTTP/1.1")
+            http2 = False
+
+    return httpx.AsyncClient(
+        http2=http2,
+        headers=_headers(),
+        limits=httpx.Limits(
+            max_connections=settings.OPENROUTER_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.OPENROUTER_MAX_KEEPALIVE,
+            keepalive_expiry=settings.OPENROUTER_KEEPALIVE_EXPIRY
+        ),
+        timeout=httpx.Timeout(
+            connect=settings.OPENROUTER_CONNECT_TIMEOUT,
+            read=settings.OPENROUTER_READ_TIMEOUT,
+            write=settings.OPENROUTER_WRITE_TIMEOUT,
+            pool=settings.OPENROUTER_POOL_TIMEOUT
+        )
+    )
+
+async def init_http_client():
+    global _client
+    if _client is None:
+        _client = create_http_client()
+    return _client
+
+async def close_http_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+def get_http_client():
+    """Return the shared client, creating it on first use outside the app lifespan"""
+    global _client
+    if _client is None:
+        _client = create_http_client()
+    return _client
+
+async def _complete(model, messages):
+    """One completion attempt against one model"""
+    start = time.perf_counter()
+    error = None
+    try:
+        r = await get_http_client().post(OPENROUTER_URL, json={"model": model, "messages": messages})
         r.raise_for_status()
         return r.json()["choices"][0]["message"]["content"]
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        OUTBOUND_SECONDS.observe(time.perf_counter() - start, "openrouter", outcome_of(error))
+
+async def query_openrouter(messages, system_prompt=None, business_id=None, tier=None, cache_key=None):
+    # The system prompt is already included in messages[0] by the route
+    messages = list(messages)
+
+    async def complete():
+        # Fair share of the upstream concurrency, then retries, hedging and model fallback
+        async with llm_scheduler.slot(business_id, tier):
+            return await llm_router.call(lambda model: _complete(model, messages))
+
+    if cache_key is None or not settings.RESPONSE_CACHE_ENABLED:
+        return await complete()
+    # Identical openers within the TTL share one answer and one upstream call
+    return await llm_responses.get_or_fetch(cache_key, complete)
+
+async def stream_openrouter(messages, business_id=None, tier=None):
+    """
+    Stream the completion from OpenRouter, yielding content deltas as they arrive.
+    The read timeout applies between chunks, so long answers are not cut off.
+    Until the first delta arrives, retryable failures fall back to the next
+    model; after that, errors propagate to the caller. The scheduler slot is
+    held until the stream ends.
+    """
+    async with llm_scheduler.slot(business_id, tier):
+        async for delta in _stream_with_fallback(messages):
+            yield delta
+
+async def _stream_with_fallback(messages):
+    error = None
+    for model in llm_router.open_stream_models():
+        health = llm_router.health[model]
+        health.acquire()
+        started = False
+        start = time.perf_counter()
+        try:
+            async for delta in _stream_model(model, list(messages), start):
+                if not started:
+                    started = True
+                    health.success()
+                yield delta
+            if not started:
+                health.success()
+            return
+        except Exception as e:
+            if started or not is_retryable(e):
+                raise
+            health.failure()
+            error = e
+            logger.warning(f"Stream from {model} failed before first token ({outcome_of(e)}); trying next model")
+        finally:
+            # A cancelled half-open trial must not keep the circuit shut
+            health.trial_in_flight = False
+    if error is not None:
+        raise error
+    raise RuntimeError("No LLM model available for streaming")
+
+async def _stream_model(model, messages, start):
+    payload = {
+        "model": model,
+        "messages": messages,
+        "stream": True
+    }
+    async with get_http_client().stream("POST", OPENROUTER_URL, json=payload) as r:
+        try:
+            r.raise_for_status()
+        except httpx.HTTPStatusError as e:
+            OUTBOUND_SECONDS.observe(time.perf_counter() - start, "openrouter_stream", outcome_of(e))
+            raise
+        # Time to first byte; the stream itself is paced by the model
+        OUTBOUND_SECONDS.observe(time.perf_counter() - start, "openrouter_stream", "ok")
+        async for line in r.aiter_lines():
+            # OpenRouter interleaves ": OPENROUTER PROCESSING" comments with data lines
+            if not line.startswith("data:"):
+                continue
+            data = line[len("data:"):].strip()
+            if data == "[DONE]":
+                break
+            try:
+                chunk = json.loads(data)
+            except json.JSONDecodeError:
+                continue
+            choices = chunk.get("choices") or []
+            if not choices:
+                continue
+            delta = choices[0].get("delta", {}).get("content")
+            if delta:
+                yield delta
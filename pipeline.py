@@ -0,0 +1,37 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from config import settings
+
+# Bounded pools so blocking work never runs on the event loop. DB calls get
+# their own pool so a slow query cannot starve CPU-bound stages and vice versa.
+DB_EXECUTOR = ThreadPoolExecutor(max_workers=settings.DB_THREADPOOL_SIZE, thread_name_prefix="db")
+CPU_EXECUTOR = ThreadPoolExecutor(max_workers=settings.CPU_THREADPOOL_SIZE, thread_name_prefix="cpu")
+# bcrypt is slow by design; a login storm queues here instead of starving other CPU work
+HASH_EXECUTOR = ThreadPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+
+async def run_cpu(fn, *args):
+    """Run a pure-CPU function on the CPU pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(CPU_EXECUTOR, fn, *args)
+
+async def run_hash(fn, *args):
+    """Run a password hashing function on the bcrypt pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(HASH_EXECUTOR, fn, *args)
+
+class StageTimer:
+    """Collects wall-clock durations in milliseconds for named pipeline stages"""
+
+    def __init__(self):
+        self.timings = {}
+
+    async def run(self, name, awaitable):
+        start = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            self.record(name, start)
+
+    def record(self, name, start):
+        self.timings[name] = round((time.perf_counter() - start) * 1000, 3)
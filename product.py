@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from models import Product, User
 from utils.token_logic import get_db, get_current_user
+from utils.product_index import product_indexes
 import schemas
 from typing import List
 
@@ -19,6 +20,7 @@ def create_product(
     db.add(db_product)
     db.commit()
     db.refresh(db_product)
+    product_indexes.product_saved(db_product)
     return db_product
 
 @router.get("/", response_model=List[schemas.Product])
@@ -40,11 +42,15 @@ def update_product(
     if db_product.business_id != current_user.business_id:
         raise HTTPException(status_code=403, detail="Not authorized to update this product")
     
+    previous_business_id = db_product.business_id
     for key, value in product.dict().items():
         setattr(db_product, key, value)
     
     db.commit()
     db.refresh(db_product)
+    if db_product.business_id != previous_business_id:
+        product_indexes.product_deleted(previous_business_id, db_product.id)
+    product_indexes.product_saved(db_product)
     return db_product
 
 @router.delete("/{product_id}", response_model=schemas.Product)
@@ -59,6 +65,8 @@ def delete_product(
     if db_product.business_id != current_user.business_id:
         raise HTTPException(status_code=403, detail="Not authorized to delete this product")
     
+    business_id, deleted_id = db_product.business_id, db_product.id
     db.delete(db_product)
     db.commit()
+    product_indexes.product_deleted(business_id, deleted_id)
     return db_product
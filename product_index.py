@@ -0,0 +1,274 @@
+import re
+import threading
+import time
+from collections import defaultdict
+from sqlalchemy import select
+from config import settings
+from models import Product
+from utils.business_cache import business_configs
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+# Scoring weights, kept in line with the original substring matcher
+NAME_PHRASE_SCORE = 20
+NAME_WORD_SCORE = 10
+TAG_SCORE = 8
+DESCRIPTION_WORD_SCORE = 5
+BUYING_INTENT_BOOST = 3
+MIN_MATCH_SCORE = 5
+
+BUYING_WORDS = ["buy", "purchase", "get", "want", "need", "order", "looking for"]
+
+def tokenize(text):
+    """Lowercase and split text into normalized terms"""
+    return TOKEN_PATTERN.findall((text or "").lower())
+
+def db_product_to_dict(p: Product):
+    return {
+        "name": p.name,
+        "description": p.description or "",
+        "price": p.price,
+        "image_url": p.image_url or "",
+        "tags": p.tags or "",
+        "source": "database"
+    }
+
+def config_product_to_dict(p: dict):
+    return {
+        "name": p.get("name", ""),
+        "description": p.get("description", ""),
+        "price": p.get("price", 0),
+        "image_url": p.get("image_url", ""),
+        "video_url": p.get("video_url", ""),
+        "tags": p.get("tags", ""),
+        "url": p.get("url", ""),
+        "source": "config"
+    }
+
+class BusinessProductIndex:
+    """
+    Inverted index from normalized terms to product postings for one business.
+    Single-term features live in `postings`; multi-word names and tags are
+    keyed on their first term in `phrases` and verified against the message.
+
+    Like the original matcher, a product term matches when it occurs anywhere
+    in the message, so "shoe" matches "shoes". Lookups enumerate the
+    substrings of each message word up to the longest indexed term.
+    """
+
+    def __init__(self, source: str):
+        self.source = source
+        self.built_at = time.monotonic()
+        self.products = {}
+        self.order = {}
+        self.postings = defaultdict(dict)
+        self.phrases = defaultdict(list)
+        self.keys_by_term = {}
+        self.max_term_len = 0
+        self._next_order = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.products)
+
+    def add(self, key, product: dict):
+        with self._lock:
+            self._remove(key, keep_order=True)
+            if key not in self.order:
+                self.order[key] = self._next_order
+                self._next_order += 1
+            self.products[key] = product
+            self.keys_by_term[key] = self._index(key, product)
+
+    def remove(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def _remove(self, key, keep_order=False):
+        for term in self.keys_by_term.pop(key, ()):
+            self.postings[term].pop(key, None)
+            if not self.postings[term]:
+                del self.postings[term]
+            if term in self.phrases:
+                self.phrases[term] = [entry for entry in self.phrases[term] if entry[1] != key]
+                if not self.phrases[term]:
+                    del self.phrases[term]
+        self.products.pop(key, None)
+        if not keep_order:
+            self.order.pop(key, None)
+
+    def _add_posting(self, key, term, weight, terms):
+        self.postings[term][key] = self.postings[term].get(key, 0) + weight
+        self.max_term_len = max(self.max_term_len, len(term))
+        terms.add(term)
+
+    def _add_phrase(self, key, words, weight, terms):
+        self.phrases[words[0]].append((" ".join(words), key, weight))
+        self.max_term_len = max(self.max_term_len, len(words[0]))
+        terms.add(words[0])
+
+    def _index(self, key, product: dict):
+        terms = set()
+
+        name_words = tokenize(product["name"])
+        if name_words:
+            self._add_phrase(key, name_words, NAME_PHRASE_SCORE, terms)
+        for word in name_words:
+            if len(word) > 2:
+                self._add_posting(key, word, NAME_WORD_SCORE, terms)
+
+        for word in tokenize(product["description"]):
+            if len(word) > 3:
+                self._add_posting(key, word, DESCRIPTION_WORD_SCORE, terms)
+
+        for tag in (product["tags"] or "").split(","):
+            tag_words = tokenize(tag)
+            if len(tag_words) == 1:
+                self._add_posting(key, tag_words[0], TAG_SCORE, terms)
+            elif tag_words:
+                self._add_phrase(key, tag_words, TAG_SCORE, terms)
+
+        return terms
+
+    def match(self, message: str):
+        """Return the best scoring product for the message, or None"""
+        words = tokenize(message)
+        if not words:
+            return None
+        normalized = " ".join(words)
+        msg = message.lower()
+
+        with self._lock:
+            longest = self.max_term_len
+            candidates = set()
+            for word in set(words):
+                for start in range(len(word)):
+                    for end in range(start + 1, min(len(word), start + longest) + 1):
+                        candidates.add(word[start:end])
+
+            scores = defaultdict(int)
+            for term in candidates:
+                for key, weight in self.postings.get(term, {}).items():
+                    scores[key] += weight
+                for phrase, key, weight in self.phrases.get(term, ()):
+                    if phrase in normalized:
+                        scores[key] += weight
+
+            if not scores:
+                return None
+
+            boost = BUYING_INTENT_BOOST if any(word in msg for word in BUYING_WORDS) else 0
+            best_key = None
+            best_score = 0
+            for key, score in scores.items():
+                score += boost
+                if score < MIN_MATCH_SCORE:
+                    continue
+                if score > best_score or (score == best_score and self.order[key] < self.order[best_key]):
+                    best_key = key
+                    best_score = score
+
+            return dict(self.products[best_key]) if best_key is not None else None
+
+class ProductIndexRegistry:
+    """Process-wide, lazily built product indexes keyed by business id"""
+
+    def __init__(self, max_age_seconds: float):
+        # Bounds staleness when another worker process edits the catalog
+        self.max_age_seconds = max_age_seconds
+        self._indexes = {}
+        # Bumped on every catalog change in this process, so answers cached
+        # against an older catalog are never served again
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def version(self, business_id: int):
+        return self._versions.get(business_id, 0)
+
+    def _changed(self, business_id: int):
+        with self._lock:
+            self._versions[business_id] = self._versions.get(business_id, 0) + 1
+
+    def fresh(self, business_id: int):
+        index = self._indexes.get(business_id)
+        if index is not None and time.monotonic() - index.built_at < self.max_age_seconds:
+            return index
+        return None
+
+    def get(self, db, business_id: int):
+        index = self.fresh(business_id)
+        if index is not None:
+            return index
+
+        index = build_business_index(db, business_id)
+        with self._lock:
+            self._indexes[business_id] = index
+        return index
+
+    async def get_async(self, db, business_id: int):
+        """get() on an async session"""
+        index = self.fresh(business_id)
+        if index is not None:
+            return index
+
+        index = await build_business_index_async(db, business_id)
+        with self._lock:
+            self._indexes[business_id] = index
+        return index
+
+    def invalidate(self, business_id: int):
+        self._changed(business_id)
+        with self._lock:
+            self._indexes.pop(business_id, None)
+
+    def product_saved(self, product: Product):
+        """Incrementally index a created or updated database product"""
+        self._changed(product.business_id)
+        index = self._indexes.get(product.business_id)
+        if index is None:
+            return
+        if index.source != "database":
+            # First DB product replaces the config fallback catalog
+            self.invalidate(product.business_id)
+            return
+        index.add(product.id, db_product_to_dict(product))
+
+    def product_deleted(self, business_id: int, product_id: int):
+        self._changed(business_id)
+        index = self._indexes.get(business_id)
+        if index is None:
+            return
+        index.remove(product_id)
+        if not len(index):
+            # Falls back to the business config catalog on next use
+            self.invalidate(business_id)
+
+def build_business_index(db, business_id: int):
+    """Build an index from DB products, falling back to the business config"""
+    index = BusinessProductIndex(source="database")
+    for p in db.query(Product).filter(Product.business_id == business_id).all():
+        index.add(p.id, db_product_to_dict(p))
+    if len(index):
+        return index
+
+    index = BusinessProductIndex(source="config")
+    for position, p in enumerate(business_configs.get(db, business_id).products):
+        index.add(position, config_product_to_dict(p))
+    return index
+
+async def build_business_index_async(db, business_id: int):
+    """build_business_index on an async session"""
+    index = BusinessProductIndex(source="database")
+    result = await db.execute(select(Product).where(Product.business_id == business_id))
+    for p in result.scalars().all():
+        index.add(p.id, db_product_to_dict(p))
+    if len(index):
+        return index
+
+    index = BusinessProductIndex(source="config")
+    entry = await business_configs.get_async(db, business_id)
+    for position, p in enumerate(entry.products):
+        index.add(position, config_product_to_dict(p))
+    return index
+
+product_indexes = ProductIndexRegistry(max_age_seconds=settings.PRODUCT_INDEX_MAX_AGE)
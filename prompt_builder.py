@@ -0,0 +1,102 @@
+import json
+import logging
+import re
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Rough BPE approximation: letter runs split every 6 chars, digits in
+# groups of 3, every punctuation mark on its own
+TOKEN_PATTERN = re.compile(r"[^\W\d_]{1,6}|\d{1,3}|[^\w\s]|_")
+MESSAGE_OVERHEAD_TOKENS = 4  # Role and separators per chat message
+
+def estimate_tokens(text):
+    """Fast local estimate of the LLM token count of text"""
+    if not text:
+        return 0
+    return len(TOKEN_PATTERN.findall(text))
+
+def _load_model_budgets():
+    try:
+        return json.loads(settings.PROMPT_TOKEN_BUDGETS or "{}")
+    except json.JSONDecodeError:
+        logger.warning("PROMPT_TOKEN_BUDGETS is not valid JSON; using the default budget")
+        return {}
+
+MODEL_BUDGETS = _load_model_budgets()
+
+def budget_for_model(model):
+    """Prompt token budget for a model, falling back to the default"""
+    return int(MODEL_BUDGETS.get(model, settings.PROMPT_TOKEN_BUDGET))
+
+def assemble_prompt(system_prompt, user_message, memory, context_sections, budget):
+    """
+    Build the messages for the LLM within a token budget.
+
+    The system prompt and user message are always sent. Context sections
+    (product and intent hints) are kept in priority order while they fit,
+    and the remaining budget goes to the most recent memory entries. Older
+    memory is dropped first. `memory` is a MemoryWindow from the chat memory
+    manager, whose per-entry token estimates are computed once on append.
+
+    Returns the messages and a report with the final token count.
+    """
+    used = (
+        estimate_tokens(system_prompt) + estimate_tokens(user_message)
+        + 3 * MESSAGE_OVERHEAD_TOKENS + estimate_tokens("[Context: ]")
+    )
+
+    kept_sections = []
+    for section in context_sections:
+        if not section:
+            continue
+        tokens = estimate_tokens(section)
+        if used + tokens > budget:
+            continue
+        kept_sections.append(section)
+        used += tokens
+
+    memory_block = ""
+    kept_entries = 0
+    total_entries = len(memory.entries) if memory else 0
+    if total_entries:
+        header_tokens = memory.header_tokens
+        available = budget - used - header_tokens
+        if sum(memory.entry_tokens) <= available:
+            # Common case: the whole cached block fits
+            memory_block = memory.block
+            kept_entries = total_entries
+            used += header_tokens + sum(memory.entry_tokens)
+        else:
+            for tokens in reversed(memory.entry_tokens):
+                if tokens > available:
+                    break
+                available -= tokens
+                kept_entries += 1
+            if kept_entries:
+                kept = memory.entry_tokens[-kept_entries:]
+                memory_block = memory.render(memory.entries[-kept_entries:])
+                used += header_tokens + sum(kept)
+
+    context = ""
+    if memory_block:
+        context += memory_block + "\n"
+    context += "".join(kept_sections)
+
+    messages = [{"role": "system", "content": system_prompt}]
+    # Add context as assistant message if exists
+    if context:
+        messages.append({"role": "assistant", "content": f"[Context: {context}]"})
+    # Add the actual user message
+    messages.append({"role": "user", "content": user_message})
+
+    report = {
+        "prompt_tokens": used,
+        "budget": budget,
+        "memory_entries_kept": kept_entries,
+        "memory_entries_dropped": total_entries - kept_entries,
+        "context_sections_dropped": len([s for s in context_sections if s]) - len(kept_sections),
+    }
+    if used > budget:
+        logger.warning(f"Prompt exceeds token budget even after trimming: {report}")
+    return messages, report
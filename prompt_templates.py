@@ -0,0 +1,46 @@
+from string import Formatter
+from business_config import SYSTEM_PROMPT
+
+# Placeholders that change per request; everything else is business-static
+DYNAMIC_FIELDS = {"user_name", "emotion_primary", "emotion_all", "tone"}
+
+DYNAMIC_HEADER = "\n\nCurrent customer:\n"
+
+def _split_template(template):
+    """Split template lines into business-static and per-request parts"""
+    static_lines, dynamic_lines = [], []
+    for line in template.splitlines(keepends=True):
+        fields = {name for _, name, _, _ in Formatter().parse(line) if name}
+        if fields & DYNAMIC_FIELDS:
+            dynamic_lines.append(line)
+        else:
+            static_lines.append(line)
+    return "".join(static_lines), "".join(dynamic_lines)
+
+STATIC_TEMPLATE, DYNAMIC_TEMPLATE = _split_template(SYSTEM_PROMPT)
+
+class CompiledSystemPrompt:
+    """
+    SYSTEM_PROMPT pre-rendered for one business config. The static
+    instructions and product block form a byte-stable prefix, so provider
+    prompt caching can hit; only the short dynamic suffix (user name,
+    emotion, tone) is filled per request.
+    """
+
+    def __init__(self, config, product_block=""):
+        self.static_values = {
+            "business_name": config.get("name", "Business"),
+            "business_whatsapp": config.get("whatsapp", ""),
+            "business_phone": config.get("phone", ""),
+        }
+        self.prefix = STATIC_TEMPLATE.format(**self.static_values) + product_block
+
+    def render(self, user_name, emotion_data, tone):
+        suffix = DYNAMIC_TEMPLATE.format(
+            user_name=user_name or "valued customer",
+            emotion_primary=emotion_data.get("primary", "neutral"),
+            emotion_all=", ".join(emotion_data.get("all_emotions", [])) or "neutral",
+            tone=tone or "neutral",
+            **self.static_values
+        )
+        return self.prefix + DYNAMIC_HEADER + suffix.strip("\n")
@@ -0,0 +1,200 @@
+"""
+Re-drive captured chat traffic against a local app and diff the results.
+
+    TRAFFIC_CAPTURE_ENABLED=true python app.py              # in production
+    python replay_traffic.py captures/requests.jsonl* --speed 2 --email owner@example.com
+
+Requests keep their original spacing divided by --speed (0 sends them
+back to back, --concurrency at a time). The report compares status codes,
+latency and answers with the captured ones.
+"""
+import argparse
+import asyncio
+import difflib
+import glob
+import json
+import os
+import sys
+import time
+from collections import Counter
+import httpx
+
+# Make the backend importable when run as a script (this file lives in backend/)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from config import settings
+from load_test import latency_summary, mint_token, percentile
+from utils.traffic_capture import scrub_text
+
+def load_envelopes(patterns, routes=None, limit=None):
+    """Read capture files (rotated backups included) in timestamp order"""
+    paths = sorted({p for pattern in patterns for p in glob.glob(pattern)})
+    envelopes = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    envelope = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # Partial line from a rotation or crash
+                if routes and envelope.get("route") not in routes:
+                    continue
+                envelopes.append(envelope)
+    envelopes.sort(key=lambda e: e["ts"])
+    return envelopes[:limit] if limit else envelopes
+
+def extract_answer(text: str):
+    """The assistant's reply from a JSON chat response or an SSE stream"""
+    if not text:
+        return ""
+    try:
+        return json.loads(text).get("response", "")
+    except (ValueError, AttributeError):
+        pass
+    event = None
+    for line in text.splitlines():
+        if line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:") and event == "done":
+            try:
+                return json.loads(line[len("data:"):]).get("response", "")
+            except (ValueError, AttributeError):
+                break
+    # Stream cut off by the capture size limit: join the token deltas
+    deltas = []
+    event = None
+    for line in text.splitlines():
+        if line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:") and event == "token":
+            try:
+                deltas.append(json.loads(line[len("data:"):]).get("delta", ""))
+            except ValueError:
+                pass
+    return "".join(deltas)
+
+class Replay:
+    def __init__(self, args, envelopes, token):
+        self.args = args
+        self.envelopes = envelopes
+        self.base_url = args.base_url.rstrip("/")
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self.results = []
+        self.errors = Counter()
+
+    async def one(self, client, envelope):
+        start = time.perf_counter()
+        try:
+            async with client.stream(
+                envelope["method"], self.base_url + envelope["route"],
+                params=envelope.get("query") or None, json=envelope.get("body"), headers=self.headers
+            ) as r:
+                text = (await r.aread()).decode("utf-8", errors="replace")
+        except httpx.HTTPError as e:
+            self.errors[type(e).__name__] += 1
+            return
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        original = extract_answer(envelope.get("response", ""))
+        replayed = scrub_text(extract_answer(text))
+        self.results.append({
+            "request_id": envelope.get("request_id"),
+            "route": envelope["route"],
+            "message": (envelope.get("body") or {}).get("message"),
+            "original_status": envelope.get("status"),
+            "replay_status": r.status_code,
+            "original_ms": envelope.get("duration_ms"),
+            "replay_ms": round(elapsed_ms, 3),
+            "similarity": round(difflib.SequenceMatcher(None, original, replayed).ratio(), 4),
+            "original_answer": original[:300],
+            "replay_answer": replayed[:300],
+        })
+
+    async def run(self):
+        limits = httpx.Limits(max_connections=self.args.concurrency, max_keepalive_connections=self.args.concurrency)
+        semaphore = asyncio.Semaphore(self.args.concurrency)
+
+        async def gated(client, envelope):
+            async with semaphore:
+                await self.one(client, envelope)
+
+        async with httpx.AsyncClient(limits=limits, timeout=httpx.Timeout(self.args.timeout)) as client:
+            started = time.perf_counter()
+            first_ts = self.envelopes[0]["ts"] if self.envelopes else 0
+            tasks = []
+            for envelope in self.envelopes:
+                if self.args.speed > 0:
+                    due = started + (envelope["ts"] - first_ts) / self.args.speed
+                    await asyncio.sleep(max(0.0, due - time.perf_counter()))
+                tasks.append(asyncio.create_task(gated(client, envelope)))
+            await asyncio.gather(*tasks)
+            elapsed = time.perf_counter() - started
+        return self.report(elapsed)
+
+    def report(self, elapsed):
+        results = self.results
+        status_pairs = Counter(
+            f"{r['original_status']}->{r['replay_status']}" for r in results
+            if r["original_status"] != r["replay_status"]
+        )
+        ratios = sorted(
+            r["replay_ms"] / r["original_ms"] for r in results if r["original_ms"]
+        )
+        similarities = sorted(r["similarity"] for r in results)
+        worst = sorted(results, key=lambda r: r["similarity"])[:self.args.examples]
+        slowest = sorted(results, key=lambda r: r["replay_ms"] - (r["original_ms"] or 0), reverse=True)[:self.args.examples]
+        return {
+            "target": self.base_url,
+            "speed": self.args.speed,
+            "captured": len(self.envelopes),
+            "replayed": len(results),
+            "transport_errors": dict(self.errors),
+            "duration_seconds": round(elapsed, 3),
+            "throughput_rps": round(len(results) / elapsed, 3) if elapsed else 0,
+            "status_mismatches": sum(status_pairs.values()),
+            "status_changes": dict(status_pairs),
+            # Seconds, to match load_test.py reports
+            "original_latency_seconds": latency_summary([r["original_ms"] / 1000 for r in results if r["original_ms"]]),
+            "replay_latency_seconds": latency_summary([r["replay_ms"] / 1000 for r in results]),
+            "latency_ratio": {"p50": percentile(ratios, 50), "p90": percentile(ratios, 90), "p99": percentile(ratios, 99)},
+            "answer_similarity": {
+                "mean": round(sum(similarities) / len(similarities), 4) if similarities else None,
+                "p10": percentile(similarities, 10),
+                "identical": sum(1 for s in similarities if s == 1.0),
+            },
+            "least_similar": worst,
+            "most_slowed": slowest,
+        }
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Replay captured chat traffic and diff the results")
+    parser.add_argument("captures", nargs="*", help="Capture files or globs (default: TRAFFIC_CAPTURE_PATH and its backups)")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--speed", type=float, default=1.0, help="1 = original pacing, 2 = twice as fast, 0 = no pacing")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--routes", help="Comma-separated routes to replay (default: all captured)")
+    parser.add_argument("--limit", type=int, help="Replay only the first N requests")
+    parser.add_argument("--examples", type=int, default=5, help="Worst cases to include in the report")
+    parser.add_argument("--token", default=os.getenv("LOAD_TEST_TOKEN"), help="Bearer token for the replay user")
+    parser.add_argument("--email", help="Mint a token for this user with the app's SECRET_KEY instead of --token")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    args = parse_args()
+    captures = args.captures
+    if not captures:
+        captures = [settings.TRAFFIC_CAPTURE_PATH, settings.TRAFFIC_CAPTURE_PATH + ".*"]
+    routes = {r.strip() for r in args.routes.split(",")} if args.routes else None
+    envelopes = load_envelopes(captures, routes, args.limit)
+    if not envelopes:
+        sys.exit("No captured requests found")
+    token = args.token or (mint_token(args.email) if args.email else None)
+    if not token:
+        sys.exit("Pass --token, --email or set LOAD_TEST_TOKEN")
+    report = asyncio.run(Replay(args, envelopes, token).run())
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
@@ -0,0 +1,107 @@
+import json
+import logging
+import queue
+import random
+import sys
+import time
+import uuid
+from logging.handlers import QueueHandler, QueueListener
+from urllib.parse import parse_qsl, urlencode
+from config import settings
+
+access_logger = logging.getLogger("access")
+
+REQUEST_ID_HEADER = "X-Request-ID"
+
+class JsonAccessFormatter(logging.Formatter):
+    """One JSON object per line; runs on the listener thread"""
+
+    def format(self, record):
+        entry = getattr(record, "access", None)
+        if entry is None:
+            entry = {"message": record.getMessage()}
+        return json.dumps(entry, separators=(",", ":"), default=str)
+
+class AccessLog:
+    """
+    Structured access log written through a QueueHandler, so the request
+    path only enqueues a dict; JSON encoding and I/O happen on the
+    QueueListener thread.
+    """
+
+    def __init__(self, sample_rate: float, include_headers: bool, redact_headers, redact_query=()):
+        self.sample_rate = sample_rate
+        self.include_headers = include_headers
+        self.redact_headers = {h.strip().lower() for h in redact_headers if h.strip()}
+        self.redact_query = {k.strip().lower() for k in redact_query if k.strip()}
+        self._listener = None
+
+    def start(self, handler=None):
+        if self._listener is not None:
+            return
+        if handler is None:
+            handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(JsonAccessFormatter())
+        log_queue = queue.SimpleQueue()
+        access_logger.addHandler(QueueHandler(log_queue))
+        access_logger.setLevel(logging.INFO)
+        access_logger.propagate = False
+        self._listener = QueueListener(log_queue, handler, respect_handler_level=True)
+        self._listener.start()
+
+    def stop(self):
+        """Flush queued entries and stop the listener thread"""
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+
+    def sampled(self, status_code: int):
+        # Server errors are always logged
+        return status_code >= 500 or self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def headers(self, headers):
+        return {
+            name: "[REDACTED]" if name.lower() in self.redact_headers else value
+            for name, value in headers.items()
+        }
+
+    def query(self, query_string: str):
+        """Query string with sensitive parameters (OAuth codes, tokens) redacted"""
+        if not query_string:
+            return None
+        if not self.redact_query:
+            return query_string
+        pairs = parse_qsl(query_string, keep_blank_values=True)
+        return urlencode([
+            (name, "[REDACTED]" if name.lower() in self.redact_query else value)
+            for name, value in pairs
+        ], safe="[]")
+
+    def record(self, request, request_id: str, status_code: int, start_ns: int):
+        duration_us = (time.perf_counter_ns() - start_ns) // 1000
+        if not self.sampled(status_code):
+            return
+        entry = {
+            "ts": time.time(),
+            "request_id": request_id,
+            "method": request.method,
+            "path": request.url.path,
+            "query": self.query(request.url.query),
+            "status": status_code,
+            "duration_us": duration_us,
+            "client": request.client.host if request.client else None,
+        }
+        if self.include_headers:
+            entry["headers"] = self.headers(request.headers)
+        access_logger.info("access", extra={"access": entry})
+
+def request_id_for(request):
+    """Propagate the caller's request id, or mint a new one"""
+    return request.headers.get(REQUEST_ID_HEADER) or uuid.uuid4().hex
+
+access_log = AccessLog(
+    sample_rate=settings.ACCESS_LOG_SAMPLE_RATE,
+    include_headers=settings.ACCESS_LOG_INCLUDE_HEADERS,
+    redact_headers=settings.ACCESS_LOG_REDACT_HEADERS.split(","),
+    redact_query=settings.ACCESS_LOG_REDACT_QUERY.split(",")
+)
@@ -0,0 +1,119 @@
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from config import settings
+from utils.metrics import registry
+
+def prompt_key(business_id, catalog_version: int, model: str, messages):
+    """
+    Cache key for an assembled prompt: its messages with whitespace
+    collapsed and case folded, plus the model, the business and the
+    version of its product catalog (product edits don't change the config).
+    """
+    normalized = [[m["role"], " ".join(str(m["content"]).split()).casefold()] for m in messages]
+    raw = json.dumps([business_id, catalog_version, model, normalized], ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+class CachedResponse:
+    def __init__(self, value: str, size_bytes: int, ttl_seconds: float):
+        self.value = value
+        self.size_bytes = size_bytes
+        self.expires_at = time.monotonic() + ttl_seconds
+
+class ResponseCache:
+    """
+    TTL + LRU cache of LLM answers bounded by total size in bytes.
+
+    Concurrent misses for the same key are coalesced: the first caller starts
+    the upstream request and later callers await the same task. Failed
+    requests are not cached. Lives on the event loop, so no locking.
+    """
+
+    def __init__(self, ttl_seconds: float, max_bytes: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._entries = OrderedDict()
+        self._inflight = {}
+
+    async def get_or_fetch(self, key: str, fetch):
+        """Return the cached answer for key, or await fetch() once for all callers"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry.expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.value
+            self._remove(key)
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            # Run as its own task so a cancelled caller doesn't cancel the others
+            task = asyncio.ensure_future(fetch())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._settle(key, t))
+        return await asyncio.shield(task)
+
+    def _settle(self, key: str, task):
+        self._inflight.pop(key, None)
+        if task.cancelled() or task.exception() is not None:
+            return
+        value = task.result()
+        if isinstance(value, str):
+            self._store(key, value)
+
+    def _store(self, key: str, value: str):
+        size = len(key) + len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        self._remove(key)
+        self._entries[key] = CachedResponse(value, size, self.ttl_seconds)
+        self.size_bytes += size
+        while self.size_bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size_bytes -= evicted.size_bytes
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size_bytes -= entry.size_bytes
+
+    def clear(self):
+        self._entries.clear()
+        self.size_bytes = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_ratio": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+            "entries": len(self._entries),
+            "size_bytes": self.size_bytes,
+            "max_bytes": self.max_bytes,
+            "inflight": len(self._inflight),
+        }
+
+llm_responses = ResponseCache(
+    ttl_seconds=settings.RESPONSE_CACHE_TTL,
+    max_bytes=settings.RESPONSE_CACHE_MAX_BYTES
+)
+
+registry.callback(
+    "llm_response_cache_lookups_total", "LLM response cache lookups by result", ("result",),
+    lambda: {("hit",): llm_responses.hits, ("miss",): llm_responses.misses, ("coalesced",): llm_responses.coalesced},
+    kind="counter"
+)
+registry.callback(
+    "llm_response_cache_bytes", "Size of cached LLM answers", (),
+    lambda: {(): llm_responses.size_bytes}
+)
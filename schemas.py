@@ -26,6 +26,8 @@ class BusinessConfig(BaseModel):
     products: List[Dict[str, Any]] = []
     enable_lead_capture: bool = True
     custom_prompt: Optional[str] = None
+    catalog_fast_path: bool = False  # Answer catalog questions locally, without the LLM
+    catalog_page_size: Optional[int] = None
 
 # User schemas
 class UserBase(BaseModel):
@@ -120,6 +122,7 @@ class ChatRequest(BaseModel):
     message: str = Field(..., min_length=1, max_length=1000)
     history: Optional[List[Dict[str, str]]] = []
     demo_mode: bool = False
+    catalog_page: int = Field(1, ge=1)
 
 class ChatResponse(BaseModel):
     response: str
@@ -130,6 +133,10 @@ class ChatResponse(BaseModel):
     contact_phone: Optional[str] = None
     cleanup_performed: bool = False
     tokens_remaining: Optional[int] = None
+    prompt_tokens: Optional[int] = None  # Estimated tokens sent to the LLM
+    timings: Optional[Dict[str, float]] = None  # Per-stage latency breakdown in ms
+    catalog_page: Optional[int] = None  # Set when the catalog fast path answered
+    catalog_pages: Optional[int] = None
 
 class ChatBase(BaseModel):
     message: str
@@ -2,6 +2,7 @@ from fastapi import APIRouter, Request, HTTPException , Depends
 from config import settings
 from models import User, TokenTransaction
 from utils.token_logic import get_db
+from utils.user_cache import authenticated_users
 import stripe
 
 router = APIRouter()
@@ -29,4 +30,5 @@ async def stripe_webhook(request: Request, db=Depends(get_db)):
                 tx = TokenTransaction(user_id=user.id, amount=tokens_bought, type="purchase", detail="Stripe")
                 db.add(tx)
                 db.commit()
+                authenticated_users.invalidate_user(user.id)
     return {"status": "success"}
\ No newline at end of file
@@ -0,0 +1,55 @@
+import asyncio
+import sys
+import sqlalchemy.ext.asyncio
+from utils import async_database
+from utils.async_database import ThreadedAsyncSession, create_async_session_factory, to_async_url
+
+def test_to_async_url_swaps_drivers():
+    assert to_async_url("sqlite:///app.db") == "sqlite+aiosqlite:///app.db"
+    assert to_async_url("postgresql://u@h/db") == "postgresql+asyncpg://u@h/db"
+    assert to_async_url("postgres://u@h/db") == "postgresql+asyncpg://u@h/db"
+
+def test_missing_greenlet_falls_back_to_threaded_sessions(monkeypatch):
+    # A None entry makes "import greenlet" raise ImportError
+    monkeypatch.setitem(sys.modules, "greenlet", None)
+    async_engine, factory = create_async_session_factory()
+    assert async_engine is None
+    assert isinstance(factory(), ThreadedAsyncSession)
+
+def test_runtime_value_error_falls_back_to_threaded_sessions(monkeypatch):
+    def greenlet_missing(*args, **kwargs):
+        raise ValueError("the greenlet library is required to use this function")
+
+    monkeypatch.setattr(sqlalchemy.ext.asyncio, "create_async_engine", greenlet_missing)
+    async_engine, factory = create_async_session_factory()
+    assert async_engine is None
+    assert isinstance(factory(), ThreadedAsyncSession)
+
+def test_async_engine_is_used_when_available():
+    async_engine, factory = create_async_session_factory()
+    assert async_engine is not None
+    assert not isinstance(factory(), async_database.ThreadedAsyncSession)
+    async_engine.sync_engine.dispose()
+
+def test_threaded_session_buffers_orm_returning_rows():
+    from sqlalchemy import create_engine, update
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+    from models import Business
+    from utils.database import Base
+
+    # One shared connection, so the worker thread sees the same database
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    db.add(Business(id=1, name="Shop"))
+    db.commit()
+
+    async def rename():
+        session = ThreadedAsyncSession(db)
+        result = await session.execute(
+            update(Business).where(Business.id == 1).values(name="Store").returning(Business.name)
+        )
+        return result.scalar_one_or_none()
+
+    assert asyncio.run(rename()) == "Store"
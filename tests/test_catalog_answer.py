@@ -0,0 +1,110 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from pydantic import ValidationError
+import schemas
+from routes import chat
+from utils.async_database import get_async_db
+from utils.catalog_answer import clamp_page_size, render_catalog_answer
+from utils.pipeline import StageTimer
+from utils.token_logic import get_current_user_async
+
+PRODUCTS = [{"name": f"Item {i}", "price": 10 + i, "description": ""} for i in range(20)]
+
+def test_pages_through_the_catalog():
+    text, page, pages = render_catalog_answer(PRODUCTS, "Shop", "neutral", page=2, page_size=8)
+    assert (page, pages) == (2, 3)
+    assert "Item 8" in text and "Item 7" not in text
+
+def test_page_past_the_end_shows_the_last_page():
+    _, page, pages = render_catalog_answer(PRODUCTS, "Shop", "neutral", page=99, page_size=8)
+    assert page == pages == 3
+
+@pytest.mark.parametrize("value", [None, "", "abc", "8x", 0, -3, float("inf")])
+def test_invalid_page_size_falls_back_to_the_default(value):
+    assert clamp_page_size(value, 6) == 6
+    text, page, pages = render_catalog_answer(PRODUCTS, "Shop", "neutral", page=1, page_size=value)
+    assert (page, pages) == (1, 3)
+
+def test_page_size_is_clamped():
+    assert clamp_page_size("12", 6) == 12
+    assert clamp_page_size(10 ** 6, 6) == 50
+
+@pytest.mark.parametrize("page", ["abc", 0, -1])
+def test_request_rejects_invalid_catalog_page(page):
+    with pytest.raises(ValidationError):
+        schemas.ChatRequest(message="what do you sell?", catalog_page=page)
+
+def test_chat_endpoint_answers_422_for_invalid_catalog_page():
+    async def no_db():
+        yield None
+
+    app = FastAPI()
+    app.include_router(chat.router, prefix="/api/chat")
+    app.dependency_overrides[get_current_user_async] = lambda: object()
+    app.dependency_overrides[get_async_db] = no_db
+    response = TestClient(app).post(
+        "/api/chat/", params={"business_id": 1},
+        json={"message": "what do you sell?", "catalog_page": "abc"}
+    )
+    assert response.status_code == 422
+
+class LowBalanceUser:
+    id = 1
+    business_id = 1
+    tokens = 2
+    fullname = "Sam"
+
+class RecordingUnitOfWork:
+    def __init__(self, db, user):
+        self.user = user
+        self.debits = []
+
+    def debit(self, amount, tx_type, detail):
+        self.debits.append(amount)
+
+    def add(self, record):
+        pass
+
+    def capture_lead(self, *args):
+        pass
+
+    def compensate(self):
+        self.debits = []
+
+    async def commit_async(self):
+        return self.user.tokens - sum(self.debits)
+
+def low_balance_client(monkeypatch, config):
+    async def fake_turn(current_user, message, demo_mode):
+        return {
+            "business_id": 1, "tier": "default", "business_config": config, "emotion_data": {"primary": "neutral"},
+            "tone": "neutral", "matched_product": None, "products": PRODUCTS, "visual_url": None,
+            "show_contact": False, "contact_info": None, "cleanup_performed": False,
+            "messages": [{"role": "user", "content": message}], "prompt_tokens": 10,
+            "cache_key": None, "timer": StageTimer(),
+        }
+
+    async def no_db():
+        yield None
+
+    monkeypatch.setattr(chat, "prepare_chat_turn", fake_turn)
+    monkeypatch.setattr(chat, "ChatTurnUnitOfWork", RecordingUnitOfWork)
+    monkeypatch.setattr(chat.settings, "CATALOG_FAST_PATH_TOKEN_COST", 1)
+    app = FastAPI()
+    app.include_router(chat.router, prefix="/api/chat")
+    app.dependency_overrides[get_current_user_async] = lambda: LowBalanceUser()
+    app.dependency_overrides[get_async_db] = no_db
+    return TestClient(app)
+
+def test_low_balance_user_can_take_the_cheaper_fast_path(monkeypatch):
+    client = low_balance_client(monkeypatch, {"name": "Shop", "catalog_fast_path": True, "catalog_page_size": "oops"})
+    response = client.post("/api/chat/", params={"business_id": 1}, json={"message": "what do you sell?"})
+    assert response.status_code == 200
+    assert response.json()["tokens_remaining"] == 1
+    assert response.json()["catalog_pages"] == 3
+
+def test_low_balance_user_is_refused_the_llm_path(monkeypatch):
+    client = low_balance_client(monkeypatch, {"name": "Shop"})
+    response = client.post("/api/chat/", params={"business_id": 1}, json={"message": "what do you sell?"})
+    assert response.status_code == 402
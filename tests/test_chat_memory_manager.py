@@ -0,0 +1,26 @@
+import utils.chat_memory_manager as chat_memory_manager
+from utils.chat_memory_manager import ConversationMemory
+
+def test_formatted_window_is_cached_until_append():
+    memory = ConversationMemory(capacity=10)
+    memory.append("hi", "hello")
+    first = memory.formatted(10)
+    assert memory.formatted(10) is first
+    memory.append("price?", "$10")
+    assert "Customer: price?" in memory.formatted(10).entries
+
+def test_append_during_rendering_does_not_cache_a_stale_window(monkeypatch):
+    memory = ConversationMemory(capacity=10)
+    memory.append("hi", "hello")
+    render = chat_memory_manager.render_memory
+
+    def render_while_appending(entries):
+        # Another request records a chat while this one is rendering
+        monkeypatch.setattr(chat_memory_manager, "render_memory", render)
+        memory.append("do you ship?", "yes")
+        return render(entries)
+
+    monkeypatch.setattr(chat_memory_manager, "render_memory", render_while_appending)
+    stale = memory.formatted(10)
+    assert "Customer: do you ship?" not in stale.entries
+    assert "Customer: do you ship?" in memory.formatted(10).entries
@@ -0,0 +1,124 @@
+import asyncio
+import time
+import httpx
+import pytest
+from utils.llm_router import LLMRouter, UpstreamUnavailable
+
+def make_router(models, hedge=False, hedge_min_delay=0.05, max_retries=2, failure_threshold=5, reset_seconds=30):
+    return LLMRouter(
+        models, max_retries=max_retries, base_delay=0, max_delay=0, hedge=hedge,
+        hedge_min_delay=hedge_min_delay, slow_seconds=15, window=100,
+        failure_threshold=failure_threshold, reset_seconds=reset_seconds
+    )
+
+def status_error(status):
+    request = httpx.Request("POST", "http://llm.test")
+    return httpx.HTTPStatusError("upstream", request=request, response=httpx.Response(status, request=request))
+
+def test_retryable_failure_falls_back_to_next_model():
+    router = make_router(["a", "b"])
+    calls = []
+
+    async def send(model):
+        calls.append(model)
+        if model == "a":
+            raise status_error(503)
+        return "from b"
+
+    assert asyncio.run(router.call(send)) == "from b"
+    assert calls == ["a", "b"]
+
+def test_non_retryable_failure_is_raised_immediately():
+    router = make_router(["a", "b"])
+    calls = []
+
+    async def send(model):
+        calls.append(model)
+        raise status_error(400)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(router.call(send))
+    assert calls == ["a"]
+
+def test_breaker_opens_after_consecutive_failures():
+    router = make_router(["a"], max_retries=0, failure_threshold=2)
+
+    async def send(model):
+        raise status_error(503)
+
+    async def main():
+        for _ in range(2):
+            with pytest.raises(httpx.HTTPStatusError):
+                await router.call(send)
+        with pytest.raises(UpstreamUnavailable):
+            await router.call(send)
+
+    asyncio.run(main())
+    assert router.health["a"].state == "open"
+
+def test_single_model_is_never_hedged():
+    router = make_router(["a"], hedge=True, hedge_min_delay=0.01)
+    calls = []
+
+    async def send(model):
+        calls.append(model)
+        await asyncio.sleep(0.05)
+        return "ok"
+
+    assert asyncio.run(router.call(send)) == "ok"
+    assert calls == ["a"]
+
+def test_slow_primary_is_hedged_on_backup():
+    router = make_router(["a", "b"], hedge=True, hedge_min_delay=0.01)
+    cancelled = []
+
+    async def send(model):
+        try:
+            await asyncio.sleep(1 if model == "a" else 0.01)
+        except asyncio.CancelledError:
+            cancelled.append(model)
+            raise
+        return model
+
+    assert asyncio.run(router.call(send)) == "b"
+    assert cancelled == ["a"]
+
+def test_cancelled_caller_does_not_orphan_the_primary():
+    router = make_router(["a", "b"], hedge=True, hedge_min_delay=5)
+    cancelled = []
+
+    async def send(model):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(model)
+            raise
+
+    async def main():
+        caller = asyncio.create_task(router.call(send))
+        await asyncio.sleep(0.01)
+        caller.cancel()
+        await asyncio.gather(caller, return_exceptions=True)
+        await asyncio.sleep(0.01)
+        # Checked before asyncio.run() cancels leftovers on shutdown
+        assert cancelled == ["a"]
+
+    asyncio.run(main())
+
+def test_concurrent_callers_share_one_half_open_trial():
+    router = make_router(["a", "b"], hedge=True, hedge_min_delay=5, reset_seconds=1)
+    health = router.health["a"]
+    health.opened_at = time.monotonic() - 2
+    calls = []
+
+    async def send(model):
+        calls.append(model)
+        await asyncio.sleep(0.01)
+        return model
+
+    async def main():
+        return await asyncio.gather(router.call(send), router.call(send))
+
+    assert sorted(asyncio.run(main())) == ["a", "b"]
+    assert calls.count("a") == 1
+    assert health.state == "closed"
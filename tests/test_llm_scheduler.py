@@ -0,0 +1,104 @@
+import asyncio
+import pytest
+from utils.llm_scheduler import FairScheduler, SchedulerRejected
+
+def make_scheduler(max_concurrency=1, per_business=10, total=100, timeout=1.0, weights=None):
+    return FairScheduler(max_concurrency, per_business, total, timeout, weights or {})
+
+def test_paid_tier_gets_larger_share():
+    scheduler = make_scheduler(max_concurrency=1, weights={"free": 1, "paid": 4})
+    order = []
+
+    async def job(business_id, tier):
+        async with scheduler.slot(business_id, tier):
+            order.append(business_id)
+            await asyncio.sleep(0)
+
+    async def main():
+        blocker = asyncio.create_task(job("warmup", "free"))
+        await asyncio.sleep(0)
+        tasks = [asyncio.create_task(job("free", "free")) for _ in range(5)]
+        tasks += [asyncio.create_task(job("paid", "paid")) for _ in range(5)]
+        await asyncio.gather(blocker, *tasks)
+
+    asyncio.run(main())
+    # Paid calls queued after the free ones still take most early slots
+    assert order[1:7].count("paid") >= 4
+    assert scheduler.active == 0 and scheduler.queued == 0
+
+def test_business_queue_limit_rejects_immediately():
+    scheduler = make_scheduler(per_business=1)
+
+    async def main():
+        await scheduler.acquire(1, "free")
+        waiter = asyncio.create_task(scheduler.acquire(1, "free"))
+        await asyncio.sleep(0)
+        with pytest.raises(SchedulerRejected) as excinfo:
+            await scheduler.acquire(1, "free")
+        assert excinfo.value.reason == "business_queue_full"
+        # Another business still gets in line
+        other = asyncio.create_task(scheduler.acquire(2, "free"))
+        await asyncio.sleep(0)
+        assert scheduler.queued == 2
+        scheduler.release()
+        done, _ = await asyncio.wait({waiter, other}, return_when=asyncio.FIRST_COMPLETED)
+        # Business 2's first call goes ahead of business 1's second
+        assert done == {other}
+        scheduler.release()
+        await waiter
+        scheduler.release()
+
+    asyncio.run(main())
+    assert scheduler.active == 0 and scheduler.queued == 0
+
+def test_queue_timeout_rejects_and_keeps_counts():
+    scheduler = make_scheduler(timeout=0.01)
+
+    async def main():
+        await scheduler.acquire(1, "free")
+        with pytest.raises(SchedulerRejected) as excinfo:
+            await scheduler.acquire(2, "free")
+        assert excinfo.value.reason == "queue_timeout"
+        assert scheduler.queued == 0
+        scheduler.release()
+
+    asyncio.run(main())
+    assert scheduler.active == 0
+
+def test_release_racing_timeout_returns_slot(monkeypatch):
+    scheduler = make_scheduler()
+
+    async def granted_then_timed_out(future, timeout):
+        # release() resolves the waiter in the same tick the timeout fires
+        scheduler.release()
+        assert future.done() and not future.cancelled()
+        raise asyncio.TimeoutError
+
+    async def main():
+        await scheduler.acquire(1, "free")
+        monkeypatch.setattr(asyncio, "wait_for", granted_then_timed_out)
+        with pytest.raises(SchedulerRejected):
+            await scheduler.acquire(2, "free")
+        monkeypatch.undo()
+        assert scheduler.active == 0 and scheduler.queued == 0
+        # The slot is usable again rather than leaked
+        await asyncio.wait_for(scheduler.acquire(3, "free"), 0.5)
+        scheduler.release()
+
+    asyncio.run(main())
+    assert scheduler.active == 0
+
+def test_cancelled_waiter_leaves_no_trace():
+    scheduler = make_scheduler()
+
+    async def main():
+        await scheduler.acquire(1, "free")
+        waiter = asyncio.create_task(scheduler.acquire(2, "free"))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        assert scheduler.queued == 0
+        scheduler.release()
+
+    asyncio.run(main())
+    assert scheduler.active == 0
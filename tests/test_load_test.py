@@ -0,0 +1,61 @@
+import asyncio
+import httpx
+from fastapi import FastAPI
+from jose import jwt
+import load_test
+from config import settings
+from routes import chat
+from utils.async_database import get_async_db
+from utils.pipeline import StageTimer
+from utils.token_logic import get_current_user_async
+
+class FakeUser:
+    id = 1
+    business_id = 1
+    tokens = 100
+    fullname = "Load Test"
+
+def chat_app(monkeypatch):
+    async def fake_turn(current_user, message, demo_mode):
+        return {
+            "business_id": 1, "tier": "demo", "business_config": {}, "emotion_data": {"primary": "neutral"},
+            "tone": "friendly", "matched_product": None, "products": None, "visual_url": None,
+            "show_contact": False, "contact_info": None, "cleanup_performed": False,
+            "messages": [{"role": "user", "content": message}], "prompt_tokens": 10,
+            "cache_key": None, "timer": StageTimer(),
+        }
+
+    async def fake_llm(messages, **kwargs):
+        return "Here is what we have."
+
+    async def no_db():
+        yield None
+
+    monkeypatch.setattr(chat, "prepare_chat_turn", fake_turn)
+    monkeypatch.setattr(chat, "query_openrouter", fake_llm)
+    app = FastAPI()
+    app.include_router(chat.router, prefix="/api/chat")
+    app.dependency_overrides[get_current_user_async] = lambda: FakeUser()
+    app.dependency_overrides[get_async_db] = no_db
+    return app
+
+def test_harness_body_is_accepted_by_chat_endpoint(monkeypatch):
+    app = chat_app(monkeypatch)
+    client_class = httpx.AsyncClient
+    monkeypatch.setattr(
+        load_test.httpx, "AsyncClient",
+        lambda **kwargs: client_class(transport=httpx.ASGITransport(app=app), **kwargs)
+    )
+    args = load_test.parse_args(["--rps", "50", "--duration", "0.2", "--token", "t", "--demo", "--seed", "1"])
+
+    report = asyncio.run(load_test.LoadTest(args, load_test.DEFAULT_CORPUS, "t").run())
+
+    assert report["completed"] > 0
+    assert report["errors"] == {}
+    assert set(report["status_codes"]) == {"200"}
+    assert report["latency_seconds"]["p50"] is not None
+
+def test_mint_token_signs_with_app_secret():
+    token = load_test.mint_token("owner@example.com")
+    payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    assert payload["sub"] == "owner@example.com"
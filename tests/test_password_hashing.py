@@ -0,0 +1,67 @@
+import asyncio
+import bcrypt
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from config import settings
+from models import Business, User
+from utils.async_database import ThreadedAsyncSession
+from utils.database import Base
+from utils.token_logic import (
+    get_password_hash_async, pwd_context, verify_and_rehash, verify_and_rehash_async, verify_password_async
+)
+
+PASSWORD = "correct horse battery"
+
+def rounds_of(password_hash):
+    return int(password_hash.split("$")[2])
+
+def user_with_cheap_hash():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine, expire_on_commit=False)
+    db = factory()
+    cheap = bcrypt.hashpw(PASSWORD.encode(), bcrypt.gensalt(4)).decode()
+    db.add(Business(id=1, name="Shop"))
+    db.add(User(id=1, business_id=1, fullname="Owner", email="owner@example.com", password_hash=cheap))
+    db.commit()
+    return factory, db, db.get(User, 1)
+
+def stored_hash(factory):
+    fresh = factory()
+    try:
+        return fresh.get(User, 1).password_hash
+    finally:
+        fresh.close()
+
+def test_hash_with_other_cost_needs_update():
+    cheap = bcrypt.hashpw(PASSWORD.encode(), bcrypt.gensalt(4)).decode()
+    assert pwd_context.needs_update(cheap)
+    assert not pwd_context.needs_update(pwd_context.hash(PASSWORD))
+
+def test_login_rehashes_with_configured_cost_and_persists():
+    factory, db, user = user_with_cheap_hash()
+    assert verify_and_rehash(db, user, PASSWORD)
+    assert rounds_of(user.password_hash) == settings.BCRYPT_ROUNDS
+    assert stored_hash(factory) == user.password_hash
+    assert pwd_context.verify(PASSWORD, user.password_hash)
+
+def test_wrong_password_keeps_the_old_hash():
+    factory, db, user = user_with_cheap_hash()
+    before = user.password_hash
+    assert not verify_and_rehash(db, user, "wrong password")
+    assert stored_hash(factory) == before
+
+def test_async_login_rehashes_off_the_event_loop():
+    factory, db, user = user_with_cheap_hash()
+    assert asyncio.run(verify_and_rehash_async(ThreadedAsyncSession(db), user, PASSWORD))
+    assert rounds_of(stored_hash(factory)) == settings.BCRYPT_ROUNDS
+
+def test_async_hash_and_verify_round_trip():
+    async def main():
+        password_hash = await get_password_hash_async(PASSWORD)
+        return password_hash, await verify_password_async(PASSWORD, password_hash), await verify_password_async("nope", password_hash)
+
+    password_hash, ok, wrong = asyncio.run(main())
+    assert rounds_of(password_hash) == settings.BCRYPT_ROUNDS
+    assert ok and not wrong
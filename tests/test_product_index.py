@@ -0,0 +1,61 @@
+import pytest
+from utils.product_index import BusinessProductIndex, config_product_to_dict
+
+CATALOG = [
+    {"name": "Running Shoe", "description": "Lightweight trainers for daily jogging", "price": 80, "tags": "sport, sneakers"},
+    {"name": "Leather Jacket", "description": "Genuine leather biker jacket", "price": 200, "tags": "outerwear"},
+    {"name": "Black Hoodie", "description": "Cotton fleece hoodie with pocket", "price": 45, "tags": "casual, winter wear"},
+    {"name": "Phone Case", "description": "Slim silicone case for phones", "price": 15, "tags": "accessories"},
+]
+
+def build_index():
+    index = BusinessProductIndex(source="config")
+    for position, product in enumerate(CATALOG):
+        index.add(position, config_product_to_dict(product))
+    return index
+
+def substring_match(message):
+    """The original per-request matcher, kept as the reference for parity"""
+    msg = message.lower().strip()
+    best_match, best_score = None, 0
+    for product in map(config_product_to_dict, CATALOG):
+        score = 0
+        name, desc, tags = product["name"].lower(), product["description"].lower(), product["tags"].lower()
+        if name in msg:
+            score += 20
+        score += sum(10 for word in name.split() if len(word) > 2 and word in msg)
+        score += sum(5 for word in desc.split() if len(word) > 3 and word in msg)
+        score += sum(8 for tag in (t.strip() for t in tags.split(",")) if tag and tag in msg)
+        if any(word in msg for word in ["buy", "purchase", "get", "want", "need", "order", "looking for"]):
+            score += 3
+        if score > best_score and score >= 5:
+            best_score, best_match = score, product
+    return best_match
+
+@pytest.mark.parametrize("message", [
+    "do you have running shoes",
+    "I want a shoe for jogging",
+    "show me jackets",
+    "any leather stuff?",
+    "need a hoodie for winter wear",
+    "phone cases please",
+    "something for my phones",
+    "sneakers",
+    "hello there",
+    "I want to buy something",
+])
+def test_matches_the_substring_matcher(message):
+    assert build_index().match(message) == substring_match(message)
+
+def test_product_word_matches_inside_longer_message_word():
+    assert build_index().match("shoes")["name"] == "Running Shoe"
+    assert build_index().match("jackets")["name"] == "Leather Jacket"
+
+def test_longer_product_word_does_not_match_shorter_message_word():
+    # "trainers" is in a description; "trainer" alone is not enough
+    assert build_index().match("trainer") is None
+
+def test_removed_product_stops_matching():
+    index = build_index()
+    index.remove(0)
+    assert index.match("running shoes") is None
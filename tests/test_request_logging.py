@@ -0,0 +1,41 @@
+import logging
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from utils.request_logging import AccessLog
+
+class Collect(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.entries = []
+
+    def emit(self, record):
+        self.entries.append(record.access)
+
+def test_query_redacts_sensitive_keys_only():
+    log = AccessLog(1.0, False, [], redact_query=["code", "state"])
+    redacted = log.query("code=abc123&state=xyz&platform=facebook")
+    assert redacted == "code=[REDACTED]&state=[REDACTED]&platform=facebook"
+    assert log.query("") is None
+
+def test_access_log_never_writes_oauth_codes():
+    log = AccessLog(1.0, False, ["authorization"], redact_query=["code", "state"])
+    handler = Collect()
+    log.start(handler)
+    app = FastAPI()
+
+    @app.get("/api/integrations/callback")
+    def callback():
+        return {}
+
+    @app.middleware("http")
+    async def record(request, call_next):
+        response = await call_next(request)
+        log.record(request, "rid", response.status_code, 0)
+        return response
+
+    TestClient(app).get("/api/integrations/callback", params={"code": "secret-code", "state": "s1", "platform": "tiktok"})
+    log.stop()
+    assert len(handler.entries) == 1
+    query = handler.entries[0]["query"]
+    assert "secret-code" not in query and "s1" not in query
+    assert "platform=tiktok" in query
@@ -0,0 +1,155 @@
+import asyncio
+import json
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+import openrouter_api
+from models import Business, Chat, User
+from routes import chat
+from utils import async_database
+from utils.async_database import ThreadedAsyncSession, get_async_db
+from utils.business_cache import business_configs
+from utils.chat_memory_manager import conversation_memory
+from utils.database import Base
+from utils.product_index import product_indexes
+from utils.response_cache import ResponseCache, prompt_key, llm_responses
+from utils.token_logic import get_current_user_async
+
+def prompt(message, system="You are a sales assistant."):
+    return [{"role": "system", "content": system}, {"role": "user", "content": message}]
+
+def test_prompt_key_normalizes_whitespace_and_case():
+    assert prompt_key(1, 0, "m", prompt("Hi!  What do you   SELL?")) == prompt_key(1, 0, "m", prompt("hi! what do you sell?"))
+
+def test_prompt_key_separates_business_catalog_model_and_prompt():
+    base = prompt_key(1, 0, "m", prompt("hello"))
+    assert prompt_key(2, 0, "m", prompt("hello")) != base
+    assert prompt_key(1, 1, "m", prompt("hello")) != base
+    assert prompt_key(1, 0, "other", prompt("hello")) != base
+    assert prompt_key(1, 0, "m", prompt("hello", system="You sell bikes.")) != base
+
+def test_repeated_key_hits_and_concurrent_misses_coalesce():
+    cache = ResponseCache(ttl_seconds=60, max_bytes=1024 * 1024)
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "answer"
+
+    async def main():
+        first = await asyncio.gather(cache.get_or_fetch("k", fetch), cache.get_or_fetch("k", fetch))
+        second = await cache.get_or_fetch("k", fetch)
+        return first, second
+
+    first, second = asyncio.run(main())
+    assert first == ["answer", "answer"] and second == "answer"
+    assert len(calls) == 1
+    assert (cache.misses, cache.coalesced, cache.hits) == (1, 1, 1)
+
+def test_failed_fetch_is_not_cached():
+    cache = ResponseCache(ttl_seconds=60, max_bytes=1024)
+
+    async def boom():
+        raise RuntimeError("upstream down")
+
+    async def main():
+        for _ in range(2):
+            try:
+                await cache.get_or_fetch("k", boom)
+            except RuntimeError:
+                pass
+
+    asyncio.run(main())
+    assert cache.misses == 2 and cache.hits == 0
+
+def test_repeated_openers_share_one_upstream_call(monkeypatch):
+    calls = []
+
+    async def fake_complete(model, messages):
+        calls.append(messages)
+        return "We sell shoes and bags."
+
+    monkeypatch.setattr(openrouter_api, "_complete", fake_complete)
+    monkeypatch.setattr(openrouter_api.settings, "RESPONSE_CACHE_ENABLED", True)
+    llm_responses.clear()
+    key = prompt_key(7, 0, openrouter_api.OPENROUTER_MODEL, prompt("What do you sell?"))
+
+    async def main():
+        first = await openrouter_api.query_openrouter(prompt("What do you sell?"), business_id=7, cache_key=key)
+        second = await openrouter_api.query_openrouter(prompt("what do you  sell?"), business_id=7, cache_key=key)
+        # Turns with conversation memory pass no key and always go upstream
+        third = await openrouter_api.query_openrouter(prompt("What do you sell?"), business_id=7)
+        return first, second, third
+
+    answers = asyncio.run(main())
+    llm_responses.clear()
+    assert set(answers) == {"We sell shoes and bags."}
+    assert len(calls) == 2
+
+def shop_with_history(monkeypatch):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine, expire_on_commit=False)
+    db = factory()
+    config = {"name": "Shop", "products": [{"name": "Sneakers", "description": "Running shoes", "price": 80}]}
+    db.add(Business(id=1, name="Shop", config=json.dumps(config)))
+    for user_id, name in [(1, "Regular Customer"), (2, "Ana Lopez"), (3, "Ben Okafor")]:
+        db.add(User(id=user_id, business_id=1, fullname=name, email=f"u{user_id}@example.com", password_hash="x", tokens=100))
+    db.add(Chat(user_id=1, business_id=1, message="Do you have sneakers?", response="Yes, Sneakers for $80."))
+    db.commit()
+    users = {u.id: u for u in db.query(User).all()}
+    db.close()
+
+    monkeypatch.setattr(async_database, "_async_session_factory", lambda: ThreadedAsyncSession(factory()))
+    business_configs.invalidate(1)
+    product_indexes.invalidate(1)
+    conversation_memory.invalidate(1)
+    return users
+
+def test_same_opener_from_new_customers_hits_cache_despite_business_history(monkeypatch):
+    users = shop_with_history(monkeypatch)
+    calls = []
+
+    async def fake_complete(model, messages):
+        calls.append(messages)
+        return "We sell running shoes."
+
+    monkeypatch.setattr(openrouter_api, "_complete", fake_complete)
+    monkeypatch.setattr(chat.settings, "RESPONSE_CACHE_ENABLED", True)
+    llm_responses.clear()
+    current = {}
+    app = FastAPI()
+    app.include_router(chat.router, prefix="/api/chat")
+    app.dependency_overrides[get_current_user_async] = lambda: current["user"]
+    client = TestClient(app)
+
+    def send(user_id, message):
+        current["user"] = users[user_id]
+        response = client.post("/api/chat/", params={"business_id": 1}, json={"message": message})
+        assert response.status_code == 200
+        return response.json()["response"]
+
+    hits = llm_responses.hits
+    try:
+        # Two first-time customers of a business that already has chats
+        assert send(2, "Hi, what do you sell?") == "We sell running shoes."
+        assert send(3, "hi,  what do you SELL?") == "We sell running shoes."
+        assert len(calls) == 1
+        assert llm_responses.hits == hits + 1
+        # A customer with their own history always goes upstream
+        send(1, "Hi, what do you sell?")
+        assert len(calls) == 2
+        assert any("Do you have sneakers?" in m["content"] for m in calls[1])
+    finally:
+        llm_responses.clear()
+        business_configs.invalidate(1)
+        product_indexes.invalidate(1)
+        conversation_memory.invalidate(1)
+
+def test_product_edit_changes_the_cache_key():
+    before = product_indexes.version(5)
+    product_indexes.product_deleted(5, 42)
+    assert product_indexes.version(5) == before + 1
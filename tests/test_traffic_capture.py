@@ -0,0 +1,43 @@
+import pytest
+from utils.traffic_capture import scrub, scrub_text
+
+@pytest.mark.parametrize("text, expected", [
+    ("my name is ahmad khan", "my name is Alex"),
+    ("Name: Sara Ali", "Name: Alex"),
+    ("name:sara", "name:Alex"),
+    ("im sara, need shoes", "im Alex, need shoes"),
+    ("I'm Bilal from Lahore", "I'm Alex from Lahore"),
+    ("This is Sara Khan here", "This is Alex here"),
+    ("My name is Sara and I want a bag", "My name is Alex and I want a bag"),
+    # Names that end like verbs or participles are still names
+    ("I'm Mohammed", "I'm Alex"),
+    ("i'm jared, any discounts?", "i'm Alex, any discounts?"),
+    ("this is Sterling", "this is Alex"),
+    ("I am Reed Hastings", "I am Alex"),
+    ("call me Ming", "call me Alex"),
+    ("I'm Mohammed Looking for shoes", "I'm Alex Looking for shoes"),
+])
+def test_names_are_scrubbed(text, expected):
+    assert scrub_text(text) == expected
+
+@pytest.mark.parametrize("text", [
+    "I am Looking for shoes",
+    "I'm interested in the black hoodie",
+    "I'm excited about the sale",
+    "I am still waiting for my order",
+    "This is amazing",
+    "I am so happy with my order",
+    "I am a teacher",
+    "This is great",
+    "Can you send me an image of the bag?",
+])
+def test_ordinary_phrases_are_kept(text):
+    assert scrub_text(text) == text
+
+def test_contact_details_keep_their_shape():
+    text = "Call me tomorrow at 0300 1234567 or sara.ali@mail.com"
+    assert scrub_text(text) == "Call me tomorrow at 0000 0000000 or redacted@example.com"
+
+def test_scrub_walks_nested_bodies():
+    body = {"message": "my name is ahmad", "history": [{"content": "im sara"}], "demo_mode": True}
+    assert scrub(body) == {"message": "my name is Alex", "history": [{"content": "im Alex"}], "demo_mode": True}
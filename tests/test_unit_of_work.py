@@ -0,0 +1,56 @@
+import asyncio
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from models import Business, Chat, Lead, User
+from utils.async_database import ThreadedAsyncSession
+from utils.database import Base
+from utils.lead_capture import LEAD_CAPTURE_COST
+from utils.unit_of_work import ChatTurnUnitOfWork
+import utils.unit_of_work as unit_of_work
+
+def make_session(tokens=100):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    db.add(Business(id=1, name="Shop"))
+    db.add(User(id=1, business_id=1, fullname="Owner", email="owner@example.com", password_hash="x", tokens=tokens))
+    db.commit()
+    return db
+
+def lead_only_turn(db, user):
+    # A demo or skipped chat: nothing debited but the captured lead
+    uow = ChatTurnUnitOfWork(db, user)
+    uow.capture_lead(1, "Alex", "alex@example.com", "555", "call me")
+    uow.add(Chat(user_id=1, business_id=1, message="hi", response="hello"))
+    return uow
+
+def test_lead_only_commit_returns_post_debit_balance(monkeypatch):
+    changed = []
+    monkeypatch.setattr(unit_of_work.authenticated_users, "balance_changed", lambda *args: changed.append(args))
+    db = make_session()
+    assert lead_only_turn(db, db.get(User, 1)).commit() == 100 - LEAD_CAPTURE_COST
+    assert db.query(Lead).count() == 1
+    assert changed == [(1, 100 - LEAD_CAPTURE_COST)]
+
+def test_lead_only_commit_async_returns_post_debit_balance(monkeypatch):
+    monkeypatch.setattr(unit_of_work.authenticated_users, "balance_changed", lambda *args: None)
+    db = make_session()
+    uow = lead_only_turn(ThreadedAsyncSession(db), db.get(User, 1))
+    assert asyncio.run(uow.commit_async()) == 100 - LEAD_CAPTURE_COST
+
+def test_chat_and_lead_debits_return_final_balance(monkeypatch):
+    monkeypatch.setattr(unit_of_work.authenticated_users, "balance_changed", lambda *args: None)
+    db = make_session()
+    uow = lead_only_turn(db, db.get(User, 1))
+    uow.debit(5, "chat", "Chat message: hi")
+    assert uow.commit() == 100 - 5 - LEAD_CAPTURE_COST
+
+def test_no_debit_returns_none(monkeypatch):
+    changed = []
+    monkeypatch.setattr(unit_of_work.authenticated_users, "balance_changed", lambda *args: changed.append(args))
+    db = make_session()
+    uow = ChatTurnUnitOfWork(db, db.get(User, 1))
+    uow.add(Chat(user_id=1, business_id=1, message="hi", response="hello"))
+    assert uow.commit() is None
+    assert changed == []
@@ -0,0 +1,41 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from models import Business, User
+from utils.database import Base
+from utils.user_cache import AuthenticatedUserCache
+
+def loaded_user():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    db.add(Business(id=1, name="Shop"))
+    db.add(User(id=1, business_id=1, fullname="Owner", email="owner@example.com", password_hash="x", tokens=100))
+    db.commit()
+    user = db.get(User, 1)
+    user.business
+    return user
+
+def test_balance_change_replaces_the_snapshot():
+    cache = AuthenticatedUserCache(ttl_seconds=60, max_entries=10)
+    cache.put("token", loaded_user())
+    shared = cache.get("token")
+    cache.balance_changed(1, 85)
+    fresh = cache.get("token")
+    # A request still merging the old snapshot never sees it change underneath it
+    assert shared.tokens == 100
+    assert fresh is not shared
+    assert fresh.tokens == 85
+    assert fresh.business.name == "Shop"
+
+def test_unknown_balance_drops_the_entry():
+    cache = AuthenticatedUserCache(ttl_seconds=60, max_entries=10)
+    cache.put("token", loaded_user())
+    cache.balance_changed(1)
+    assert cache.get("token") is None
+
+def test_other_users_are_untouched():
+    cache = AuthenticatedUserCache(ttl_seconds=60, max_entries=10)
+    cache.put("token", loaded_user())
+    snapshot = cache.get("token")
+    cache.balance_changed(2, 0)
+    assert cache.get("token") is snapshot
@@ -0,0 +1,76 @@
+import zlib
+import numpy as np
+import pytest
+from utils.vector_store import EMBEDDING_DIM, INITIAL_CAPACITY, SimpleVectorStore
+
+def embedding(text):
+    """Deterministic stand-in for get_embedding, seeded by the text"""
+    return np.random.default_rng(zlib.crc32(text.encode())).standard_normal(EMBEDDING_DIM)
+
+@pytest.fixture
+def store():
+    # A private instance, not the process-wide singleton
+    store = object.__new__(SimpleVectorStore)
+    store.__init__()
+    store.get_embedding = embedding
+    return store
+
+def turns(start, count):
+    return [{"sender": "user", "text": f"message {i}"} for i in range(start, start + count)]
+
+def brute_force_top_k(scores, top_k):
+    return np.argsort(-scores, axis=-1, kind="stable")[..., :top_k]
+
+@pytest.mark.parametrize("shape", [(1,), (7,), (50,), (4, 50), (3, 1000)])
+@pytest.mark.parametrize("top_k", [1, 3, 7, 50, 2000])
+def test_top_k_matches_a_full_sort(store, shape, top_k):
+    scores = np.random.default_rng(sum(shape) + top_k).standard_normal(shape).astype(np.float32)
+    assert np.array_equal(store._top_k(scores, top_k), brute_force_top_k(scores, top_k))
+
+def test_top_k_with_ties_picks_the_best_scores(store):
+    scores = np.array([[0.5, 0.9, 0.5, 0.9, 0.1, 0.5]], dtype=np.float32)
+    picked = store._top_k(scores, 3)
+    assert np.array_equal(np.take_along_axis(scores, picked, axis=-1), scores[:, [1, 3, 0]])
+
+def test_rows_survive_growing_past_the_initial_capacity(store):
+    store.add_conversation("t", turns(0, INITIAL_CAPACITY - 1))
+    assert store.vectors["t"].shape[0] == INITIAL_CAPACITY
+    store.add_conversation("t", turns(INITIAL_CAPACITY - 1, 3))
+    assert store.vectors["t"].shape[0] == 2 * INITIAL_CAPACITY
+    store.add_conversation("t", turns(INITIAL_CAPACITY + 2, 600))
+    assert store.vectors["t"].shape[0] == 4 * INITIAL_CAPACITY
+
+    size = INITIAL_CAPACITY + 602
+    texts = [f"user: message {i}" for i in range(size)]
+    assert store.sizes["t"] == size and store.texts["t"] == texts
+    expected = store._normalize(np.stack([embedding(text) for text in texts]))
+    assert np.allclose(store.vectors["t"][:size], expected)
+    assert not store.vectors["t"][size:].any()
+    # Turns written before each doubling are still found exactly
+    for i in (0, INITIAL_CAPACITY - 1, INITIAL_CAPACITY + 1, size - 1):
+        assert store.find_similar_conversations("t", texts[i], top_k=1) == [texts[i]]
+
+def test_batch_matches_single_queries(store):
+    store.add_conversation("t", turns(0, 300))
+    queries = ["user: message 5", "user: message 250", "something else entirely", "user: message 5"]
+    for top_k in (1, 3, 10):
+        batch = store.find_similar_conversations_batch("t", queries, top_k)
+        assert batch == [store.find_similar_conversations("t", query, top_k) for query in queries]
+        assert all(len(result) == top_k for result in batch)
+
+def test_matches_brute_force_cosine_ranking(store):
+    store.add_conversation("t", turns(0, 120))
+    texts = store.texts["t"]
+    query = embedding("what do you sell")
+    stored = np.stack([embedding(text) for text in texts])
+    cosine = stored @ query / (np.linalg.norm(stored, axis=1) * np.linalg.norm(query))
+    expected = [texts[i] for i in np.argsort(-cosine)[:5]]
+    assert store.find_similar_conversations("t", "what do you sell", top_k=5) == expected
+
+def test_unknown_tenant_and_empty_requests(store):
+    assert store.find_similar_conversations("missing", "hi") == []
+    assert store.find_similar_conversations_batch("missing", ["a", "b"]) == [[], []]
+    store.add_conversation("t", turns(0, 2))
+    assert store.find_similar_conversations("t", "hi", top_k=0) == []
+    assert store.find_similar_conversations_batch("t", []) == []
+    assert len(store.find_similar_conversations("t", "hi", top_k=5)) == 2
@@ -1,11 +1,12 @@
+import asyncio
 import os
 import requests
 from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.responses import RedirectResponse
-from sqlalchemy.orm import Session
+from sqlalchemy import select
 from models import User, SocialMediaToken
-from utils.database import get_db
-from utils.token_logic import get_current_user
+from utils.async_database import get_async_db
+from utils.token_logic import get_current_user_async
 
 router = APIRouter()
 
@@ -14,7 +15,7 @@ TIKTOK_APP_SECRET = os.environ.get('TIKTOK_APP_SECRET')
 TIKTOK_REDIRECT_URI = os.environ.get('TIKTOK_REDIRECT_URI')
 
 @router.get('/connect/tiktok')
-async def connect_tiktok(current_user: User = Depends(get_current_user)):
+async def connect_tiktok(current_user: User = Depends(get_current_user_async)):
     """
     Redirects the user to TikTok's OAuth consent page.
     """
@@ -23,7 +24,7 @@ async def connect_tiktok(current_user: User = Depends(get_current_user)):
     return RedirectResponse(url=auth_url)
 
 @router.get('/callback/tiktok')
-async def callback_tiktok(code: str = Query(...), state: str = Query(...), db: Session = Depends(get_db)):
+async def callback_tiktok(code: str = Query(...), state: str = Query(...), db=Depends(get_async_db)):
     """
     Handles the callback from TikTok's OAuth.
     """
@@ -40,7 +41,7 @@ async def callback_tiktok(code: str = Query(...), state: str = Query(...), db: S
         'redirect_uri': TIKTOK_REDIRECT_URI,
         'code': code
     }
-    response = requests.post(token_url, data=token_data)
+    response = await asyncio.to_thread(requests.post, token_url, data=token_data)
     data = response.json()
     access_token = data.get('access_token')
 
@@ -48,7 +49,8 @@ async def callback_tiktok(code: str = Query(...), state: str = Query(...), db: S
         raise HTTPException(status_code=400, detail="Could not retrieve access token")
 
     # Check if a token already exists and update it, or create a new one
-    token = db.query(SocialMediaToken).filter_by(user_id=user_id, platform='tiktok').first()
+    result = await db.execute(select(SocialMediaToken).where(SocialMediaToken.user_id == user_id, SocialMediaToken.platform == 'tiktok'))
+    token = result.scalars().first()
     if not token:
         token = SocialMediaToken(user_id=user_id, platform='tiktok')
 
@@ -56,17 +58,18 @@ async def callback_tiktok(code: str = Query(...), state: str = Query(...), db: S
     token.refresh_token = data.get('refresh_token')
     token.expires_in = data.get('expires_in')
     db.add(token)
-    db.commit()
+    await db.commit()
 
     return RedirectResponse(url='/settings/integrations')
 
 @router.post('/disconnect/tiktok')
-async def disconnect_tiktok(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def disconnect_tiktok(current_user: User = Depends(get_current_user_async), db=Depends(get_async_db)):
     """
     Disconnects the user's TikTok account.
     """
-    token = db.query(SocialMediaToken).filter_by(user_id=current_user.id, platform='tiktok').first()
+    result = await db.execute(select(SocialMediaToken).where(SocialMediaToken.user_id == current_user.id, SocialMediaToken.platform == 'tiktok'))
+    token = result.scalars().first()
     if token:
-        db.delete(token)
-        db.commit()
+        await db.delete(token)
+        await db.commit()
     return {'message': 'TikTok account disconnected successfully'}
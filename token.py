@@ -27,6 +27,11 @@ def deduct_tokens_endpoint(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
+    if request.amount <= 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Amount must be positive"
+        )
     try:
         new_balance = deduct_tokens(
             db,
@@ -1,24 +1,47 @@
 from config import settings
 from models import User, TokenTransaction, Business
+from sqlalchemy import select, update
 from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.orm.attributes import set_committed_value
 from .database import get_db
+from .async_database import get_async_db
+from .user_cache import authenticated_users
+from .pipeline import run_hash
+from .metrics import AUTH_SECONDS
 from jose import jwt, JWTError
 from passlib.context import CryptContext
 from fastapi.security import OAuth2PasswordBearer
 from fastapi import Depends, HTTPException, status
 import logging
+import time
 from datetime import datetime, timedelta
 from pathlib import Path
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Pinning min/max to the configured cost makes needs_update() flag any
+# hash made with a different work factor, so it is upgraded on next login
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
+)
 logger = logging.getLogger(__name__)
 
+BYPASS_FILE = Path(__file__).parent.parent / 'temporary_verification_off'
+_bypass_checked = (0.0, False)
+
 def verification_bypass_enabled():
-    """Check if verification bypass is enabled"""
-    bypass_file = Path(__file__).parent.parent / 'temporary_verification_off'
-    return bypass_file.exists()
+    """Check if verification bypass is enabled (re-checked every AUTH_CACHE_TTL seconds)"""
+    global _bypass_checked
+    checked_at, enabled = _bypass_checked
+    now = time.monotonic()
+    if now - checked_at >= settings.AUTH_CACHE_TTL:
+        enabled = BYPASS_FILE.exists()
+        _bypass_checked = (now, enabled)
+    return enabled
 
 def get_password_hash(password):
     return pwd_context.hash(password)
@@ -26,6 +49,38 @@ def get_password_hash(password):
 def verify_password(plain, hashed):
     return pwd_context.verify(plain, hashed)
 
+async def get_password_hash_async(password):
+    """get_password_hash off the event loop, for async routes"""
+    return await run_hash(pwd_context.hash, password)
+
+async def verify_password_async(plain, hashed):
+    """verify_password off the event loop, for async routes"""
+    return await run_hash(pwd_context.verify, plain, hashed)
+
+def rehash_statement(user_id: int, new_hash: str):
+    return update(User).where(User.id == user_id).values(password_hash=new_hash).execution_options(synchronize_session=False)
+
+def verify_and_rehash(db: Session, user: User, plain: str):
+    """
+    Check a login password; on success, transparently store a new hash if
+    the stored one was made with a different bcrypt cost.
+    """
+    verified, new_hash = pwd_context.verify_and_update(plain, user.password_hash)
+    if verified and new_hash:
+        db.execute(rehash_statement(user.id, new_hash))
+        db.commit()
+        set_committed_value(user, "password_hash", new_hash)
+    return verified
+
+async def verify_and_rehash_async(db, user: User, plain: str):
+    """verify_and_rehash on an async session, hashing on the bcrypt pool"""
+    verified, new_hash = await run_hash(pwd_context.verify_and_update, plain, user.password_hash)
+    if verified and new_hash:
+        await db.execute(rehash_statement(user.id, new_hash))
+        await db.commit()
+        set_committed_value(user, "password_hash", new_hash)
+    return verified
+
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
     if expires_delta:
@@ -36,13 +91,24 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    credentials_exception = HTTPException(
+def credentials_error():
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
 
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    start = time.perf_counter()
+    snapshot = authenticated_users.get(token)
+    if snapshot is not None:
+        # Attach the cached snapshot to this session without a SELECT
+        user = db.merge(snapshot, load=False)
+        AUTH_SECONDS.observe(time.perf_counter() - start, "hit")
+        return user
+
+    credentials_exception = credentials_error()
+
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         email: str = payload.get("sub")
@@ -60,27 +126,83 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     user = db.query(User).options(joinedload(User.business)).filter(User.email == email).first()
     if user is None:
         raise credentials_exception
+    authenticated_users.put(token, user, payload.get("exp"))
+    AUTH_SECONDS.observe(time.perf_counter() - start, "miss")
     return user
 
-def deduct_tokens(db: Session, user: User, amount: int, tx_type: str, detail: str):
+async def get_current_user_async(token: str = Depends(oauth2_scheme), db=Depends(get_async_db)):
+    """get_current_user on an async session, for routes that use get_async_db"""
+    start = time.perf_counter()
+    snapshot = authenticated_users.get(token)
+    if snapshot is not None:
+        user = await db.merge(snapshot, load=False)
+        AUTH_SECONDS.observe(time.perf_counter() - start, "hit")
+        return user
+
+    credentials_exception = credentials_error()
+
     try:
-        if user.tokens < amount:
-            raise HTTPException(
-                status_code=status.HTTP_402_PAYMENT_REQUIRED,
-                detail="Insufficient tokens"
-            )
-            
-        user.tokens -= amount
-        tx = TokenTransaction(
-            user_id=user.id,
-            amount=-amount,
-            type=tx_type,
-            detail=detail
-        )
-        db.add(tx)
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        email: str = payload.get("sub")
+        if email is None:
+            raise credentials_exception
+    except JWTError:
+        if verification_bypass_enabled():
+            logger.warning("JWT verification failed, but bypass is enabled. Returning first user.")
+            result = await db.execute(select(User).options(joinedload(User.business)).limit(1))
+            user = result.scalars().first()
+            if not user:
+                raise HTTPException(status_code=404, detail="No users found in bypass mode")
+            return user
+        raise credentials_exception
+
+    result = await db.execute(select(User).options(joinedload(User.business)).where(User.email == email))
+    user = result.scalars().first()
+    if user is None:
+        raise credentials_exception
+    authenticated_users.put(token, user, payload.get("exp"))
+    AUTH_SECONDS.observe(time.perf_counter() - start, "miss")
+    return user
+
+def logout_token(token: str):
+    """Forget the cached identity of a token the client has logged out of"""
+    authenticated_users.invalidate_token(token)
+
+def debit_statement(user_id: int, amount: int):
+    """Conditional decrement that only matches when the balance covers `amount`"""
+    return (
+        update(User)
+        .where(User.id == user_id, User.tokens >= amount)
+        .values(tokens=User.tokens - amount)
+        .returning(User.tokens)
+        .execution_options(synchronize_session=False)
+    )
+
+def debit_tokens(db: Session, user_id: int, amount: int, tx_type: str, detail: str, commit: bool = True):
+    """
+    Atomically take `amount` tokens from a user and record the transaction.
+
+    The balance check and the decrement are one conditional UPDATE, so
+    concurrent debits can never overdraw or lose an update. Returns the new
+    balance, or None if the user does not have enough tokens.
+    """
+    new_balance = db.execute(debit_statement(user_id, amount)).scalar_one_or_none()
+    if new_balance is None:
+        return None
+
+    db.add(TokenTransaction(
+        user_id=user_id,
+        amount=-amount,
+        type=tx_type,
+        detail=detail
+    ))
+    if commit:
         db.commit()
-        db.refresh(user)
-        return user.tokens
+    return new_balance
+
+def deduct_tokens(db: Session, user: User, amount: int, tx_type: str, detail: str, commit: bool = True):
+    try:
+        new_balance = debit_tokens(db, user.id, amount, tx_type, detail, commit=commit)
     except Exception as e:
         db.rollback()
         logger.error(f"Token deduction failed: {str(e)}")
@@ -88,3 +210,59 @@ def deduct_tokens(db: Session, user: User, amount: int, tx_type: str, detail: st
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Token deduction failed: {str(e)}"
         )
+
+    if new_balance is None:
+        if commit:
+            db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_402_PAYMENT_REQUIRED,
+            detail="Insufficient tokens"
+        )
+
+    # Keep the in-memory user in sync without another SELECT
+    set_committed_value(user, "tokens", new_balance)
+    if commit:
+        authenticated_users.balance_changed(user.id, new_balance)
+    return new_balance
+
+async def debit_tokens_async(db, user_id: int, amount: int, tx_type: str, detail: str, commit: bool = True):
+    """debit_tokens on an async session"""
+    result = await db.execute(debit_statement(user_id, amount))
+    new_balance = result.scalar_one_or_none()
+    if new_balance is None:
+        return None
+
+    db.add(TokenTransaction(
+        user_id=user_id,
+        amount=-amount,
+        type=tx_type,
+        detail=detail
+    ))
+    if commit:
+        await db.commit()
+    return new_balance
+
+async def deduct_tokens_async(db, user: User, amount: int, tx_type: str, detail: str, commit: bool = True):
+    """deduct_tokens on an async session"""
+    try:
+        new_balance = await debit_tokens_async(db, user.id, amount, tx_type, detail, commit=commit)
+    except Exception as e:
+        await db.rollback()
+        logger.error(f"Token deduction failed: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Token deduction failed: {str(e)}"
+        )
+
+    if new_balance is None:
+        if commit:
+            await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_402_PAYMENT_REQUIRED,
+            detail="Insufficient tokens"
+        )
+
+    set_committed_value(user, "tokens", new_balance)
+    if commit:
+        authenticated_users.balance_changed(user.id, new_balance)
+    return new_balance
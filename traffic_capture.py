@@ -0,0 +1,218 @@
+import json
+import logging
+import queue
+import random
+import re
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from pathlib import Path
+from urllib.parse import parse_qsl
+from config import settings
+from utils.user_cache import authenticated_users
+
+capture_logger = logging.getLogger("traffic_capture")
+
+EMAIL_PATTERN = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}")
+# Seven or more digits, allowing the separators people type in phone and card numbers
+LONG_NUMBER_PATTERN = re.compile(r"\+?\d[\d\s().-]{5,}\d")
+# "my name is" / "name:" always introduce a name; "i am", "this is" and
+# "call me" do unless the next word is on the NOT_NAMES allowlist
+NAME_PATTERN = re.compile(
+    r"\b(?:(?P<explicit>(?:my\s+name\s+is|my\s+name's|name\s+is)\s+|name\s*:\s*)"
+    r"|(?P<implicit>(?:i\s+am|i['\u2019]m|im|this\s+is|call\s+me)\s+))"
+    r"(?P<first>[^\W\d_]+)(?:(?P<gap>\s+)(?P<second>[^\W\d_]+))?",
+    re.IGNORECASE
+)
+# Words that commonly follow "i am" / "this is" / "call me" and are not
+# names. Anything else is scrubbed: a missed name leaks PII, a scrubbed
+# word only costs replay realism.
+NOT_NAMES = frozenset("""
+    a an the and or but not no so too very just also still really only here there now today tomorrow
+    later soon back from in at on with for to of about after before by into out up down over this that
+    it its my your our their his her me you we they he she who what when where which why how
+    sure fine good great happy glad sorry ok okay ready new interested curious unable able available
+    busy free done home away online open close looking going trying buying wondering calling asking
+    planning thinking hoping waiting getting having making writing confused disappointed
+    one two three some any all more less most much many again please thanks thank yes
+    coming leaving ordering paying selling shopping browsing searching checking reaching following
+    returning contacting messaging texting emailing using sending telling wanting needing
+    excited pleased satisfied worried concerned scared surprised impressed annoyed frustrated upset
+    tired bored married located based stuck lost finished sold shipped interesting amazing
+    definitely probably actually currently literally totally kind sort bit little big
+    right wrong sad mad angry late early first last same different nice cool awesome perfect
+    correct serious kidding joking confident certain unsure
+""".split())
+
+def _is_name(word: str):
+    return word.casefold() not in NOT_NAMES
+
+def _replace_name(match):
+    explicit = match.group("explicit") is not None
+    lead = match.group("explicit") or match.group("implicit")
+    if not explicit and not _is_name(match.group("first")):
+        return match.group(0)
+    second = match.group("second")
+    # A surname is dropped too; implicit forms only take a capitalized one
+    if second and _is_name(second) and (explicit or second[0].isupper()):
+        return lead + "Alex"
+    return lead + "Alex" + (match.group("gap") + second if second else "")
+
+def scrub_text(text: str):
+    """
+    Replace emails, phone/card numbers and self-introduced names with
+    same-shaped placeholders, so replayed messages still take the lead
+    capture path without carrying the original values.
+    """
+    text = EMAIL_PATTERN.sub("redacted@example.com", text)
+    text = LONG_NUMBER_PATTERN.sub(lambda m: re.sub(r"\d", "0", m.group(0)), text)
+    return NAME_PATTERN.sub(_replace_name, text)
+
+def scrub(value):
+    if isinstance(value, str):
+        return scrub_text(value)
+    if isinstance(value, list):
+        return [scrub(v) for v in value]
+    if isinstance(value, dict):
+        return {k: scrub(v) for k, v in value.items()}
+    return value
+
+class JsonCaptureFormatter(logging.Formatter):
+    """Decodes and scrubs bodies into one JSON envelope per line; runs on the listener thread"""
+
+    def format(self, record):
+        entry = dict(record.capture)
+        raw = entry.pop("raw_body")
+        try:
+            entry["body"] = scrub(json.loads(raw)) if raw else None
+        except (ValueError, UnicodeDecodeError):
+            entry["body"] = None
+            entry["body_bytes"] = len(raw)
+        entry["response"] = scrub_text(entry.pop("raw_response").decode("utf-8", errors="replace"))
+        return json.dumps(entry, separators=(",", ":"), default=str)
+
+class TrafficCapture:
+    """
+    Opt-in sampled capture of request envelopes to rotating JSONL files,
+    for replay_traffic.py. Like the access log, the request path only
+    enqueues raw bytes; decoding, scrubbing and I/O happen on the
+    QueueListener thread. Credentials are never captured.
+    """
+
+    def __init__(self, enabled: bool, sample_rate: float, routes, path: str,
+                 max_bytes: int, backups: int, max_body: int):
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.routes = {r.strip() for r in routes if r.strip()}
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.max_body = max_body
+        self._listener = None
+
+    def start(self, handler=None):
+        if not self.enabled or self._listener is not None:
+            return
+        if handler is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            handler = RotatingFileHandler(
+                self.path, maxBytes=self.max_bytes, backupCount=self.backups, encoding="utf-8"
+            )
+        handler.setFormatter(JsonCaptureFormatter())
+        log_queue = queue.SimpleQueue()
+        capture_logger.addHandler(QueueHandler(log_queue))
+        capture_logger.setLevel(logging.INFO)
+        capture_logger.propagate = False
+        self._listener = QueueListener(log_queue, handler, respect_handler_level=True)
+        self._listener.start()
+
+    def stop(self):
+        """Flush queued envelopes and stop the listener thread"""
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+
+    def wants(self, scope):
+        """Sampling is decided up front, so unsampled requests pay nothing"""
+        return (self._listener is not None and scope["path"] in self.routes
+                and (self.sample_rate >= 1 or random.random() < self.sample_rate))
+
+    def business_id(self, headers, query):
+        # Resolved from the auth cache only; capture never touches the database
+        auth = headers.get(b"authorization", b"").decode("latin-1")
+        if auth.lower().startswith("bearer "):
+            user = authenticated_users.get(auth[7:])
+            if user is not None:
+                return user.business_id
+        value = query.get("business_id")
+        return int(value) if value and value.isdigit() else None
+
+    def record(self, scope, body: bytes, status: int, response: bytes, start_ns: int, first_byte_ns, request_id=None):
+        headers = dict(scope.get("headers") or [])
+        query = dict(parse_qsl(scope.get("query_string", b"").decode("latin-1")))
+        entry = {
+            "ts": time.time() - (time.perf_counter_ns() - start_ns) / 1e9,
+            "request_id": request_id,
+            "method": scope["method"],
+            "route": scope["path"],
+            "query": query,
+            "business_id": self.business_id(headers, query),
+            "status": status,
+            "duration_ms": round((time.perf_counter_ns() - start_ns) / 1e6, 3),
+            "first_byte_ms": round((first_byte_ns - start_ns) / 1e6, 3) if first_byte_ns else None,
+            "raw_body": body,
+            "raw_response": response,
+        }
+        capture_logger.info("capture", extra={"capture": entry})
+
+class TrafficCaptureMiddleware:
+    """ASGI middleware that tees sampled request and response bodies into traffic_capture"""
+
+    def __init__(self, app, capture=None):
+        self.app = app
+        self.capture = capture or traffic_capture
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.capture.wants(scope):
+            await self.app(scope, receive, send)
+            return
+
+        limit = self.capture.max_body
+        start_ns = time.perf_counter_ns()
+        body = bytearray()
+        response = bytearray()
+        state = {"status": 500, "first_byte_ns": None, "request_id": None}
+
+        async def capture_receive():
+            message = await receive()
+            if message["type"] == "http.request" and len(body) < limit:
+                body.extend(message.get("body", b"")[:limit - len(body)])
+            return message
+
+        async def capture_send(message):
+            if message["type"] == "http.response.start":
+                state["status"] = message["status"]
+                state["request_id"] = dict(message.get("headers") or []).get(b"x-request-id", b"").decode("latin-1") or None
+            elif message["type"] == "http.response.body":
+                if state["first_byte_ns"] is None:
+                    state["first_byte_ns"] = time.perf_counter_ns()
+                if len(response) < limit:
+                    response.extend(message.get("body", b"")[:limit - len(response)])
+            await send(message)
+
+        try:
+            await self.app(scope, capture_receive, capture_send)
+        finally:
+            self.capture.record(
+                scope, bytes(body), state["status"], bytes(response), start_ns,
+                state["first_byte_ns"], state["request_id"]
+            )
+
+traffic_capture = TrafficCapture(
+    enabled=settings.TRAFFIC_CAPTURE_ENABLED,
+    sample_rate=settings.TRAFFIC_CAPTURE_SAMPLE_RATE,
+    routes=settings.TRAFFIC_CAPTURE_ROUTES.split(","),
+    path=settings.TRAFFIC_CAPTURE_PATH,
+    max_bytes=settings.TRAFFIC_CAPTURE_MAX_BYTES,
+    backups=settings.TRAFFIC_CAPTURE_BACKUPS,
+    max_body=settings.TRAFFIC_CAPTURE_MAX_BODY
+)
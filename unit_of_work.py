@@ -0,0 +1,122 @@
+import logging
+from sqlalchemy.orm import Session
+from models import User, Chat
+from utils.token_logic import deduct_tokens, deduct_tokens_async
+from utils.lead_capture import stage_lead, stage_lead_async
+from utils.chat_memory_manager import conversation_memory
+from utils.user_cache import authenticated_users
+
+logger = logging.getLogger(__name__)
+
+class ChatTurnUnitOfWork:
+    """
+    Collects the writes of one chat turn (token debit, captured lead and the
+    chat record) and flushes them in a single commit after the LLM reply.
+
+    Nothing touches the database before commit(), so no write transaction is
+    held open across the LLM call. If the call fails, compensate() drops the
+    pending debit and the fallback reply is not charged.
+    """
+
+    def __init__(self, db: Session, user: User):
+        self.db = db
+        self.user = user
+        self.debits = []
+        self.lead = None
+        self.records = []
+        self.tokens_remaining = None
+
+    def debit(self, amount: int, tx_type: str, detail: str):
+        self.debits.append((amount, tx_type, detail))
+
+    def capture_lead(self, business_id: int, name: str, email: str, phone: str, message: str):
+        self.lead = dict(business_id=business_id, name=name, email=email, phone=phone, message=message)
+
+    def add(self, record):
+        self.records.append(record)
+
+    def compensate(self):
+        """Drop pending charges after a failed LLM call"""
+        self.debits = []
+
+    def _chat_rows(self):
+        return [
+            (record.business_id, record.user_id, record.message, record.response)
+            for record in self.records if isinstance(record, Chat)
+        ]
+
+    def _after_commit(self, written_chats):
+        # Keep the in-process conversation memory in step with the DB
+        for business_id, user_id, message, response in written_chats:
+            conversation_memory.record(business_id, user_id, message, response)
+        # ...and the cached balance of the authenticated user
+        if self.tokens_remaining is not None:
+            authenticated_users.balance_changed(self.user.id, self.tokens_remaining)
+
+    def commit(self):
+        db = self.db
+        try:
+            # 1. Conditional debits; raises 402 if the balance ran out meanwhile
+            for amount, tx_type, detail in self.debits:
+                self.tokens_remaining = deduct_tokens(db, self.user, amount, tx_type, detail, commit=False)
+
+            # 2. Lead capture, charged in the same transaction
+            if self.lead:
+                try:
+                    # Balance after the lead debit, even when no chat debit ran
+                    _, self.tokens_remaining = stage_lead(
+                        db,
+                        self.user.id,
+                        self.lead["business_id"],
+                        self.lead["name"],
+                        self.lead["email"],
+                        self.lead["phone"],
+                        self.lead["message"],
+                        True
+                    )
+                except ValueError as e:
+                    logger.error(f"Lead capture failed: {str(e)}")
+
+            # 3. Chat record(s)
+            db.add_all(self.records)
+            written_chats = self._chat_rows()
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+        # 4. In-process conversation memory and auth cache
+        self._after_commit(written_chats)
+        return self.tokens_remaining
+
+    async def commit_async(self):
+        """commit() for a unit of work opened on an async session"""
+        db = self.db
+        try:
+            for amount, tx_type, detail in self.debits:
+                self.tokens_remaining = await deduct_tokens_async(db, self.user, amount, tx_type, detail, commit=False)
+
+            if self.lead:
+                try:
+                    _, self.tokens_remaining = await stage_lead_async(
+                        db,
+                        self.user.id,
+                        self.lead["business_id"],
+                        self.lead["name"],
+                        self.lead["email"],
+                        self.lead["phone"],
+                        self.lead["message"],
+                        True
+                    )
+                except ValueError as e:
+                    logger.error(f"Lead capture failed: {str(e)}")
+
+            db.add_all(self.records)
+            written_chats = self._chat_rows()
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+
+        self._after_commit(written_chats)
+        return self.tokens_remaining
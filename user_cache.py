@@ -0,0 +1,116 @@
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy import inspect
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+from config import settings
+
+def detached_copy(instance):
+    """Session-free copy of a loaded row with its column attributes only"""
+    mapper = inspect(instance).mapper
+    copy = mapper.class_()
+    for attr in mapper.column_attrs:
+        set_committed_value(copy, attr.key, getattr(instance, attr.key))
+    make_transient_to_detached(copy)
+    return copy
+
+def snapshot_user(user):
+    """Detached user with its business, safe to share between requests"""
+    user_copy = detached_copy(user)
+    if user.business is not None:
+        set_committed_value(user_copy, "business", detached_copy(user.business))
+    return user_copy
+
+class CachedUser:
+    def __init__(self, snapshot, expires_at: float):
+        self.snapshot = snapshot
+        self.expires_at = expires_at
+
+class AuthenticatedUserCache:
+    """
+    Short-lived map from bearer token to a detached user/business snapshot,
+    so bursts of requests skip jwt.decode and the user query.
+
+    Callers attach the snapshot to their own session with
+    merge(load=False), which needs no SELECT. Token balance changes,
+    business edits and logout invalidate entries in this process; the TTL
+    bounds staleness for writes made by other worker processes.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token: str):
+        if self.ttl_seconds <= 0:
+            return None
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            if entry.expires_at <= time.monotonic():
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return entry.snapshot
+
+    def put(self, token: str, user, token_exp=None):
+        """Cache a freshly loaded user; never beyond the JWT's own expiry"""
+        if self.ttl_seconds <= 0:
+            return
+        ttl = self.ttl_seconds
+        if token_exp is not None:
+            ttl = min(ttl, token_exp - time.time())
+            if ttl <= 0:
+                return
+        entry = CachedUser(snapshot_user(user), time.monotonic() + ttl)
+        with self._lock:
+            self._entries[token] = entry
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def balance_changed(self, user_id: int, new_balance=None):
+        """
+        Call after committing a token balance change. A known new balance
+        goes into fresh snapshots, otherwise the entries are dropped.
+        Cached snapshots are never mutated: other requests may be merging
+        them into their sessions at the same time.
+        """
+        with self._lock:
+            for token, entry in list(self._entries.items()):
+                if entry.snapshot.id != user_id:
+                    continue
+                if new_balance is None:
+                    del self._entries[token]
+                else:
+                    snapshot = snapshot_user(entry.snapshot)
+                    set_committed_value(snapshot, "tokens", new_balance)
+                    self._entries[token] = CachedUser(snapshot, entry.expires_at)
+
+    def invalidate_user(self, user_id: int):
+        self.balance_changed(user_id)
+
+    def invalidate_business(self, business_id: int):
+        """Call after editing a business; drops its users' snapshots"""
+        with self._lock:
+            for token, entry in list(self._entries.items()):
+                if entry.snapshot.business_id == business_id:
+                    del self._entries[token]
+
+    def invalidate_token(self, token: str):
+        """Call on logout"""
+        with self._lock:
+            self._entries.pop(token, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+authenticated_users = AuthenticatedUserCache(
+    ttl_seconds=settings.AUTH_CACHE_TTL,
+    max_entries=settings.AUTH_CACHE_MAX_ENTRIES
+)
@@ -1,51 +1,108 @@
+import threading
 import numpy as np
 from typing import List, Dict, Optional
 from utils.singleton import Singleton
 
+EMBEDDING_DIM = 100
+INITIAL_CAPACITY = 256
+
 class SimpleVectorStore(metaclass=Singleton):
+    """
+    Per-tenant conversation vectors kept as one contiguous float32 matrix of
+    L2-normalized rows, grown by doubling. Cosine similarity against every
+    stored turn is then a single matrix-vector product.
+    """
+
     def __init__(self):
-        self.vectors = {}
+        self.vectors = {}  # tenant_id -> (capacity, EMBEDDING_DIM) float32 matrix
+        self.sizes = {}    # tenant_id -> number of rows in use
         self.texts = {}
+        self._lock = threading.Lock()
 
     def get_embedding(self, text: str) -> np.ndarray:
         # In a real application, you would use a pre-trained model like Sentence-BERT
         # For this demo, we'll use a simple average of word embeddings
         words = text.lower().split()
         if not words:
-            return np.zeros(100)
-        
+            return np.zeros(EMBEDDING_DIM)
+
         # Create a dummy embedding for each word
-        embeddings = [np.random.rand(100) for _ in words]
+        embeddings = [np.random.rand(EMBEDDING_DIM) for _ in words]
         return np.mean(embeddings, axis=0)
 
+    @staticmethod
+    def _normalize(matrix: np.ndarray) -> np.ndarray:
+        """L2-normalize rows; all-zero rows stay zero so they never match"""
+        matrix = np.asarray(matrix, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def _reserve(self, tenant_id: str, extra: int) -> np.ndarray:
+        matrix = self.vectors.get(tenant_id)
+        size = self.sizes.get(tenant_id, 0)
+        needed = size + extra
+        if matrix is None or needed > matrix.shape[0]:
+            capacity = max(INITIAL_CAPACITY, matrix.shape[0] if matrix is not None else 0)
+            while capacity < needed:
+                capacity *= 2
+            grown = np.zeros((capacity, EMBEDDING_DIM), dtype=np.float32)
+            if matrix is not None:
+                grown[:size] = matrix[:size]
+            self.vectors[tenant_id] = matrix = grown
+            self.sizes[tenant_id] = size
+            self.texts.setdefault(tenant_id, [])
+        return matrix
+
     def add_conversation(self, tenant_id: str, conversation: List[Dict]):
-        if tenant_id not in self.vectors:
-            self.vectors[tenant_id] = []
-            self.texts[tenant_id] = []
+        if not conversation:
+            return
+
+        texts = [f"{message['sender']}: {message['text']}" for message in conversation]
+        rows = self._normalize(np.stack([self.get_embedding(text) for text in texts]))
+
+        with self._lock:
+            matrix = self._reserve(tenant_id, len(texts))
+            size = self.sizes[tenant_id]
+            matrix[size:size + len(texts)] = rows
+            self.sizes[tenant_id] = size + len(texts)
+            self.texts[tenant_id].extend(texts)
 
-        for message in conversation:
-            text = f"{message['sender']}: {message['text']}"
-            vector = self.get_embedding(text)
-            self.vectors[tenant_id].append(vector)
-            self.texts[tenant_id].append(text)
+    def _top_k(self, scores: np.ndarray, top_k: int) -> np.ndarray:
+        """Indices of the top_k scores along the last axis, best first"""
+        n = scores.shape[-1]
+        k = min(top_k, n)
+        if k < n:
+            candidates = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+        else:
+            candidates = np.broadcast_to(np.arange(n), scores.shape).copy()
+        order = np.argsort(-np.take_along_axis(scores, candidates, axis=-1), axis=-1, kind="stable")
+        return np.take_along_axis(candidates, order, axis=-1)
 
     def find_similar_conversations(self, tenant_id: str, query: str, top_k: int = 3) -> List[str]:
-        if tenant_id not in self.vectors:
-            return []
-
-        query_vector = self.get_embedding(query)
-        
-        # Calculate cosine similarity
-        similarities = []
-        for i, vector in enumerate(self.vectors[tenant_id]):
-            similarity = np.dot(query_vector, vector) / (np.linalg.norm(query_vector) * np.linalg.norm(vector))
-            similarities.append((similarity, i))
-
-        # Sort by similarity and get the top-k results
-        similarities.sort(key=lambda x: x[0], reverse=True)
-        top_indices = [i for _, i in similarities[:top_k]]
-        
-        return [self.texts[tenant_id][i] for i in top_indices]
+        results = self.find_similar_conversations_batch(tenant_id, [query], top_k)
+        return results[0] if results else []
+
+    def find_similar_conversations_batch(self, tenant_id: str, queries: List[str], top_k: int = 3) -> List[List[str]]:
+        """Top-k most similar stored turns for each of many queries at once"""
+        if tenant_id not in self.vectors or not queries:
+            return [[] for _ in queries]
+
+        with self._lock:
+            size = self.sizes[tenant_id]
+            matrix = self.vectors[tenant_id][:size]
+            texts = self.texts[tenant_id][:size]
+
+        if not size or top_k <= 0:
+            return [[] for _ in queries]
+
+        query_matrix = self._normalize(np.stack([self.get_embedding(query) for query in queries]))
+
+        # Rows are pre-normalized, so the dot product is the cosine similarity
+        scores = query_matrix @ matrix.T
+        top_indices = self._top_k(scores, top_k)
+
+        return [[texts[i] for i in row] for row in top_indices]
 
 # Create a global instance of the vector store
 vector_store = SimpleVectorStore()